@@ -0,0 +1,206 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and Retry-After seconds"""
+
+    def __init__(self, message: str, status: int, retry_after: float):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimiter:
+    """Per-client token buckets: ``rate`` tokens per second up to ``burst``
+
+    Buckets live in an LRU bounded by ``max_clients``; an evicted client
+    simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> (tokens, last refill)
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, client: str) -> None:
+        """Take one token for client or raise AdmissionRejected (429)"""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                self.allowed += 1
+                retry_after = None
+            else:
+                self.limited += 1
+                retry_after = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if retry_after is not None:
+            raise AdmissionRejected('Too many requests, please slow down', 429, retry_after)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'rate_per_second': self.rate,
+                'burst': self.burst,
+                'clients': len(self._buckets),
+                'allowed': self.allowed,
+                'limited': self.limited,
+            }
+
+
+class _AsyncWaiter:
+    """Queue entry for a coroutine; ``set`` may be called from any thread"""
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+        self._set = False
+
+    def set(self) -> None:
+        self._set = True
+        self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+    def is_set(self) -> bool:
+        return self._set
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` requests at once, with a bounded FIFO wait queue
+
+    A request arriving with ``max_queue`` others already waiting is rejected
+    at once; one that waits longer than ``max_wait`` seconds is rejected
+    too. Both get 503 with a Retry-After estimated from recent service times.
+    A finishing request hands its slot straight to the oldest waiter.
+    Threads wait with ``acquire`` and coroutines with ``acquire_async``;
+    both share the same slots and queue.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queue = deque()          # threading.Event or _AsyncWaiter per waiting request
+        self._service_time = 1.0       # EWMA seconds a request holds a slot
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _reject(self) -> AdmissionRejected:
+        retry_after = self._service_time * (len(self._queue) + 1) / self.limit
+        return AdmissionRejected('Server is busy, please retry shortly', 503, retry_after)
+
+    def _enter(self, make_waiter):
+        """Take a free slot (returns None) or join the queue (returns the waiter)"""
+        with self._lock:
+            if self._active < self.limit and not self._queue:
+                self._active += 1
+                self.admitted += 1
+                return None
+            if len(self._queue) >= self.max_queue:
+                self.rejected_full += 1
+                raise self._reject()
+            waiter = make_waiter()
+            self._queue.append(waiter)
+            self.queued += 1
+            return waiter
+
+    def acquire(self) -> float:
+        """Take a slot, waiting in line if needed; returns when the slot was taken"""
+        started = time.monotonic()
+        waiter = self._enter(threading.Event)
+        if waiter is None:
+            return started
+        waiter.wait(self.max_wait)
+        return self._admit(waiter, started)
+
+    async def acquire_async(self) -> float:
+        """``acquire`` for coroutines: waits on the event loop instead of blocking it"""
+        started = time.monotonic()
+        waiter = self._enter(_AsyncWaiter)
+        if waiter is None:
+            return started
+        try:
+            await waiter.wait(self.max_wait)
+        except asyncio.CancelledError:
+            # Client went away while queued: give up the place, or the slot if handed over
+            with self._lock:
+                if not waiter.is_set():
+                    self._queue.remove(waiter)
+                    waiter = None
+            if waiter is not None:
+                self.release(started)
+            raise
+        return self._admit(waiter, started)
+
+    def _admit(self, waiter, started: float) -> float:
+        with self._lock:
+            # The slot may have been handed over between the timeout and here
+            if not waiter.is_set():
+                self._queue.remove(waiter)
+                self.rejected_timeout += 1
+                raise self._reject()
+            now = time.monotonic()
+            self.admitted += 1
+            self.wait_total += now - started
+            self.wait_max = max(self.wait_max, now - started)
+            return now
+
+    def release(self, acquired_at: float) -> None:
+        with self._lock:
+            self._service_time += 0.2 * ((time.monotonic() - acquired_at) - self._service_time)
+            if self._queue:
+                self._queue.popleft().set()
+            else:
+                self._active -= 1
+
+    def idle(self) -> bool:
+        """No request holds a slot or waits for one"""
+        with self._lock:
+            return self._active == 0 and not self._queue
+
+    def stats(self) -> dict:
+        with self._lock:
+            waited = self.queued - self.rejected_timeout - len(self._queue)
+            return {
+                'limit': self.limit,
+                'active': self._active,
+                'queue_depth': len(self._queue),
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected_queue_full': self.rejected_full,
+                'rejected_timeout': self.rejected_timeout,
+                'wait_avg_ms': round(self.wait_total / waited * 1000, 1) if waited > 0 else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 1),
+                'service_time_ms': round(self._service_time * 1000, 1),
+            }
@@ -0,0 +1,233 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import FrozenSet, Optional
+
+from retrieval import STOPWORDS, TOKEN_RE
+
+SIMHASH_BITS = 64
+_MASK = (1 << SIMHASH_BITS) - 1
+ENTRY_OVERHEAD = 200  # rough bytes per entry beyond the question and answer text
+
+# Ways of asking for the same thing about a video, folded to one feature each
+SYNONYMS = {
+    **dict.fromkeys(('summarize', 'summarise', 'summary', 'overview', 'gist', 'tldr', 'recap',
+                     'about', 'regarding', 'topic', 'idea'), 'summary'),
+    **dict.fromkeys(('takeaway', 'point', 'highlight', 'key', 'main', 'lesson', 'important'), 'keypoint'),
+    **dict.fromkeys(('say', 'said', 'talk', 'discuss', 'mention', 'cover', 'explain'), 'say'),
+    **dict.fromkeys(('who', 'speaker', 'presenter', 'presenting', 'narrator', 'host', 'creator', 'channel'),
+                    'speaker'),
+    **dict.fromkeys(('end', 'ending', 'conclusion', 'conclude', 'final', 'outro'), 'ending'),
+}
+INTENTS = frozenset(SYNONYMS.values())
+# Words that add nothing to what is being asked in a chat about one video
+FILLER = frozenset("""
+video clip please tell give quick quickly short brief briefly basically really us ok okay hey hi
+just some thing things kind sort whole describe list most how actually here
+""".split())
+# Words that tie a question to the conversation so far ("tell me more", "is that true")
+FOLLOW_UP = frozenset("""
+more that it those these again else previous earlier above another elaborate continue expand
+""".split())
+
+
+def _stem(token: str) -> str:
+    """Plural to singular, roughly: batteries -> battery, points -> point"""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def question_features(question: str) -> Optional[FrozenSet[str]]:
+    """Normalized content words of a standalone question, or None if it depends on context"""
+    words = TOKEN_RE.findall(question.lower())
+    if not words or any(word in FOLLOW_UP for word in words):
+        return None
+    features = set()
+    for word in words:
+        if len(word) < 2:
+            continue
+        # Synonyms first: some ("about", "who") are retrieval stopwords
+        synonym = SYNONYMS.get(word) or SYNONYMS.get(_stem(word))
+        if synonym:
+            features.add(synonym)
+        elif word not in STOPWORDS and word not in FILLER:
+            features.add(_stem(word))
+    return frozenset(features) or None
+
+
+def topic_words(features: FrozenSet[str]) -> FrozenSet[str]:
+    """The features that are not folded synonyms, i.e. what the question is about"""
+    return features - INTENTS
+
+
+def _feature_hash(feature: str) -> int:
+    # Stable across processes, unlike the salted built-in hash()
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(features: FrozenSet[str]) -> int:
+    """64-bit SimHash: similar feature sets give fingerprints a few bits apart"""
+    counts = [0] * SIMHASH_BITS
+    for feature in features:
+        h = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            counts[bit] += 1 if h >> bit & 1 else -1
+    fingerprint = 0
+    for bit, count in enumerate(counts):
+        if count > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def similarity(a: int, b: int) -> float:
+    """Share of matching fingerprint bits, 0.5 for unrelated and 1.0 for identical"""
+    return 1 - (a ^ b).bit_count() / SIMHASH_BITS
+
+
+class _Entry:
+    __slots__ = ('video_id', 'fingerprint', 'features', 'topic', 'answer', 'size', 'expires_at', 'latency', 'used_at')
+
+    def __init__(self, video_id, fingerprint, features, answer, size, expires_at, latency):
+        self.video_id = video_id
+        self.fingerprint = fingerprint
+        self.features = features
+        self.topic = topic_words(features)
+        self.answer = answer
+        self.size = size
+        self.expires_at = expires_at
+        self.latency = latency
+        self.used_at = time.monotonic()
+
+
+class AnswerCache:
+    """Chat answers per video, reused for later questions that ask the same thing
+
+    A question is reduced to its content words (stopwords and filler dropped,
+    plurals and common synonyms folded) and fingerprinted with SimHash. A
+    lookup only considers stored questions about the same video with exactly
+    the same topic words (those that are not folded synonyms, e.g. "engine"
+    in "what does he say about engines"). Of those it returns the answer whose
+    fingerprint is closest, if at least ``threshold`` of the bits match.
+    Questions that point back into the conversation ("tell me more", "is
+    that true") are never stored or answered from the cache. Entries are
+    evicted LRU across all videos when ``max_entries`` or ``max_bytes`` is
+    exceeded, and expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 4 * 1024 * 1024,
+                 ttl: float = 24 * 3600, threshold: float = 0.9, max_per_video: int = 64):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_per_video = max_per_video
+        self._entries = OrderedDict()   # (video_id, features) -> entry, least recently used first
+        self._videos = {}               # video_id -> {features: entry}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+        self.latency_saved = 0.0
+        self.similarity_total = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, video_id: str, question: str) -> Optional[str]:
+        """A stored answer to a matching question about this video, or None"""
+        features = question_features(question)
+        if features is None:
+            with self._lock:
+                self.skipped += 1
+            return None
+        fingerprint = simhash(features)
+        topic = topic_words(features)
+        now = time.monotonic()
+        with self._lock:
+            best, best_score = None, self.threshold
+            for entry in list(self._videos.get(video_id, {}).values()):
+                if entry.expires_at <= now:
+                    self._remove(entry)
+                    continue
+                if entry.topic != topic:
+                    continue
+                score = 1.0 if entry.features == features else similarity(fingerprint, entry.fingerprint)
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((video_id, best.features))
+            best.used_at = now
+            self.hits += 1
+            self.latency_saved += best.latency
+            self.similarity_total += best_score
+            return best.answer
+
+    def put(self, video_id: str, question: str, answer: str, latency: float) -> bool:
+        """Store an answer that took ``latency`` seconds to produce; False if not cacheable"""
+        features = question_features(question)
+        if features is None or not answer:
+            return False
+        size = ENTRY_OVERHEAD + len(question.encode('utf-8')) + len(answer.encode('utf-8'))
+        if size > self.max_bytes:
+            return False
+        entry = _Entry(video_id, simhash(features), features, answer, size, time.monotonic() + self.ttl, latency)
+        with self._lock:
+            video = self._videos.get(video_id, {})
+            if features in video:
+                self._remove(video[features])
+            elif len(video) >= self.max_per_video:
+                self._remove(min(video.values(), key=lambda e: e.used_at))
+            self._videos.setdefault(video_id, {})[features] = entry
+            self._entries[(video_id, features)] = entry
+            self._bytes += size
+            self.stores += 1
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries.values())))
+                self.evictions += 1
+        return True
+
+    def invalidate(self, video_id: str) -> None:
+        """Drop every answer for a video, e.g. after its transcript changed"""
+        with self._lock:
+            for entry in list(self._videos.get(video_id, {}).values()):
+                self._remove(entry)
+
+    def _remove(self, entry: _Entry) -> None:
+        if self._entries.pop((entry.video_id, entry.features), None) is None:
+            return
+        self._bytes -= entry.size
+        video = self._videos.get(entry.video_id)
+        if video is not None:
+            video.pop(entry.features, None)
+            if not video:
+                del self._videos[entry.video_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'videos': len(self._videos),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'skipped': self.skipped,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'latency_saved_seconds': round(self.latency_saved, 3),
+                'hit_similarity_avg': round(self.similarity_total / self.hits, 3) if self.hits else None,
+            }
@@ -1,18 +1,134 @@
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, request, jsonify, Response, g, abort
 import requests
 import re
 import json
+import logging
+import random
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 import google.generativeai as genai
 import os
+import tempfile
+import threading
+import time
 
-app = Flask(__name__)
+from summary_cache import SummaryCache
+from summary_store import SummaryStore
+from single_flight import SingleFlight, SingleFlightTimeout
+from jobs import JobManager, QueueFullError
+from http_client import WebhookClient
+from resilience import CircuitBreaker, CircuitOpenError
+from admission import AdmissionRejected, ConcurrencyLimiter, RateLimiter
+from metrics import SIZE_BUCKETS, NullRegistry, Registry
+from structured_logging import LogPipeline, add_stage_timing, request_id, sampled, stage_timings
+from batch import map_unordered
+from concurrent.futures import ThreadPoolExecutor
+from session_store import Session, SessionStore
+from gemini_chat import ChatConversation, ModelPool
+from retrieval import IndexCache
+from answer_cache import AnswerCache
+from frontend import FrontendAssets
+from extractive import summarize_locally
+from timestamps import format_time, generate_timestamps
+from captions import CaptionError, TranscriptCache, parse_captions
+from map_reduce import FakeBackend, MapReduceSummarizer
+from llm_router import FakeProvider, GeminiProvider, LLMRouter, OpenAICompatibleProvider
+from video_id import VideoRef, extract_video_id, is_video_id, parse_many, parse_video_url
+from watchlist import WatchlistScheduler
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Static files are served by the precompressed asset routes below
+app = Flask(__name__, static_folder=None)
 
 # Constants
-WEBHOOK_URL = "https://sushiiel7890.app.n8n.cloud/webhook/ytube"
-YOUTUBE_REGEX = re.compile(r"(https?://)?(www\.)?(youtube\.com|youtu\.be)/.+")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "https://sushiiel7890.app.n8n.cloud/webhook/ytube")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", f"gemini:{GEMINI_MODEL}")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_MAX_ERROR_RATE = float(os.getenv("LLM_MAX_ERROR_RATE", 0.5))
+LLM_COOLDOWN = float(os.getenv("LLM_COOLDOWN", 30))
+CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 256))
+CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", 6 * 3600))
+SUMMARY_DB_PATH = os.getenv("SUMMARY_DB_PATH", os.path.join(tempfile.gettempdir(), "youtube_summarizer.db"))
+SUMMARY_DB_TTL = float(os.getenv("SUMMARY_DB_TTL", 7 * 24 * 3600))
+SUMMARY_DB_MAX_ROWS = int(os.getenv("SUMMARY_DB_MAX_ROWS", 10000))
+SUMMARY_DB_STALE_GRACE = float(os.getenv("SUMMARY_DB_STALE_GRACE", 7 * 24 * 3600))
+SUMMARY_WARM_START = int(os.getenv("SUMMARY_WARM_START", 100))
+SINGLE_FLIGHT_WAIT = float(os.getenv("SINGLE_FLIGHT_WAIT", 120))
+SINGLE_FLIGHT_CROSS_WORKER = os.getenv("SINGLE_FLIGHT_CROSS_WORKER", "1") == "1"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", 32))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", 900))
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", 25))
+WEBHOOK_POOL_SIZE = int(os.getenv("WEBHOOK_POOL_SIZE", 10))
+WEBHOOK_CONNECT_TIMEOUT = float(os.getenv("WEBHOOK_CONNECT_TIMEOUT", 5))
+WEBHOOK_READ_TIMEOUT = float(os.getenv("WEBHOOK_READ_TIMEOUT", 85))
+WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", 2))
+WEBHOOK_DEADLINE = float(os.getenv("WEBHOOK_DEADLINE", 90))
+WEBHOOK_BREAKER = os.getenv("WEBHOOK_BREAKER", "1") == "1"
+WEBHOOK_BREAKER_FAILURE_RATE = float(os.getenv("WEBHOOK_BREAKER_FAILURE_RATE", 0.5))
+WEBHOOK_BREAKER_MIN_CALLS = int(os.getenv("WEBHOOK_BREAKER_MIN_CALLS", 5))
+WEBHOOK_BREAKER_WINDOW = float(os.getenv("WEBHOOK_BREAKER_WINDOW", 60))
+WEBHOOK_BREAKER_OPEN_SECONDS = float(os.getenv("WEBHOOK_BREAKER_OPEN_SECONDS", 30))
+WEBHOOK_HEDGE = os.getenv("WEBHOOK_HEDGE", "0") == "1"
+WEBHOOK_HEDGE_MIN_DELAY = float(os.getenv("WEBHOOK_HEDGE_MIN_DELAY", 2))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 4))
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", 1000))
+VALIDATE_MAX_URLS = int(os.getenv("VALIDATE_MAX_URLS", 10000))
+WATCHLIST = os.getenv("WATCHLIST", "")
+WATCHLIST_FILE = os.getenv("WATCHLIST_FILE", "")
+WATCHLIST_INTERVAL = float(os.getenv("WATCHLIST_INTERVAL", 300))
+WATCHLIST_CONCURRENCY = int(os.getenv("WATCHLIST_CONCURRENCY", 1))
+WATCHLIST_QUOTA = int(os.getenv("WATCHLIST_QUOTA", 60))
+WATCHLIST_QUOTA_WINDOW = float(os.getenv("WATCHLIST_QUOTA_WINDOW", 3600))
+SESSION_COOKIE = "yt_session"
+SESSION_MAX_HISTORY = int(os.getenv("SESSION_MAX_HISTORY", 20))
+SESSION_MEMORY_BUDGET = int(os.getenv("SESSION_MEMORY_BUDGET", 16 * 1024 * 1024))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 3600))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 4))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", 600))
+RETRIEVAL_MAX_INDEXES = int(os.getenv("RETRIEVAL_MAX_INDEXES", 128))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", 2048))
+CHAT_CACHE_MAX_BYTES = int(os.getenv("CHAT_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", 24 * 3600))
+CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", 0.9))
+LOCAL_KEY_POINTS = os.getenv("LOCAL_KEY_POINTS", "0") == "1"
+CAPTIONS_DIR = os.getenv("CAPTIONS_DIR", "")
+CAPTIONS_MAX_BYTES = int(os.getenv("CAPTIONS_MAX_BYTES", 50 * 1024 * 1024))
+TRANSCRIPT_CACHE_BYTES = int(os.getenv("TRANSCRIPT_CACHE_BYTES", 64 * 1024 * 1024))
+MAP_REDUCE_BACKEND = os.getenv("MAP_REDUCE_BACKEND", "router")
+MAP_REDUCE_WORKERS = int(os.getenv("MAP_REDUCE_WORKERS", 4))
+MAP_REDUCE_CHUNK_TOKENS = int(os.getenv("MAP_REDUCE_CHUNK_TOKENS", 3000))
+MAP_REDUCE_OVERLAP_TOKENS = int(os.getenv("MAP_REDUCE_OVERLAP_TOKENS", 200))
+# Admission control. With gunicorn's 10 threads, concurrency + queue of the summarize
+# and chat groups (3 + 3), batch slots (1) and job waits (1) leave threads free for
+# /, /assets and /healthz.
+SUMMARIZE_CONCURRENCY = int(os.getenv("SUMMARIZE_CONCURRENCY", 2))
+SUMMARIZE_QUEUE = int(os.getenv("SUMMARIZE_QUEUE", 1))
+SUMMARIZE_RATE = float(os.getenv("SUMMARIZE_RATE", 0.2))
+SUMMARIZE_BURST = float(os.getenv("SUMMARIZE_BURST", 5))
+CHAT_CONCURRENCY = int(os.getenv("CHAT_CONCURRENCY", 2))
+CHAT_QUEUE = int(os.getenv("CHAT_QUEUE", 1))
+CHAT_RATE = float(os.getenv("CHAT_RATE", 1))
+CHAT_BURST = float(os.getenv("CHAT_BURST", 10))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 1))
+BATCH_QUEUE = int(os.getenv("BATCH_QUEUE", 0))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", 5))
+JOB_WAIT_CONCURRENCY = int(os.getenv("JOB_WAIT_CONCURRENCY", 1))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
 
 # Initialize Gemini
 if GEMINI_API_KEY:
@@ -21,776 +137,501 @@ if GEMINI_API_KEY:
     except:
         pass
 
-# Store data in memory
-app.summary_data = {}
-app.chat_history = []
-
-def extract_video_id(url: str) -> Optional[str]:
-    """Extract YouTube video ID from URL"""
-    patterns = [
-        r"(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\n?#]+)",
-        r"youtube\.com\/embed\/([^&\n?#]+)",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
+# JSON log lines on stdout, written by a background thread; never blocks a request
+log_pipeline = LogPipeline(level=LOG_LEVEL, fmt=LOG_FORMAT, queue_size=LOG_QUEUE_SIZE)
+log = logging.getLogger('app')
+
+# Prometheus metrics for /metrics, aggregated per thread without locks
+metrics = Registry() if METRICS_ENABLED else NullRegistry()
+REQUEST_LATENCY = metrics.histogram('http_request_duration_seconds', 'Request latency by route, until the body is sent',
+                                    ('route', 'method', 'status'))
+REQUESTS_IN_FLIGHT = metrics.gauge('http_requests_in_flight', 'Requests being processed or streamed', ('route',))
+REQUEST_BYTES = metrics.histogram('http_request_size_bytes', 'Request body size', ('route',), SIZE_BUCKETS)
+RESPONSE_BYTES = metrics.histogram('http_response_size_bytes', 'Response body size (unstreamed responses)',
+                                   ('route',), SIZE_BUCKETS)
+STAGE_LATENCY = metrics.histogram('stage_duration_seconds', 'Time spent in each processing stage', ('stage',))
+SUMMARY_LOOKUPS = metrics.counter('summary_lookups_total', 'Summary lookups by where they were answered', ('result',))
+ERRORS = metrics.counter('errors_total', 'Failures by stage and exception class', ('stage', 'exception'))
+WEBHOOK_RESPONSES = metrics.counter('webhook_responses_total', 'n8n webhook responses by HTTP status', ('status',))
+WEBHOOK_BYTES = metrics.histogram('webhook_response_size_bytes', 'n8n webhook response body size', (), SIZE_BUCKETS)
+
+def record_stage(name: str, seconds: float) -> None:
+    STAGE_LATENCY.observe(seconds, name)
+    add_stage_timing(name, seconds)
+
+@contextmanager
+def stage(name: str):
+    """Time a processing stage for the metrics histogram and the request log line"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+# Per-client conversation state, bounded in history length and total memory
+session_store = SessionStore(
+    max_history=SESSION_MAX_HISTORY,
+    memory_budget=SESSION_MEMORY_BUDGET,
+    idle_ttl=SESSION_IDLE_TTL
+)
+# Per-video passage indexes used to pick chat context
+retrieval_indexes = IndexCache(max_entries=RETRIEVAL_MAX_INDEXES)
+# Chat answers per video, reused for paraphrased questions; CHAT_CACHE_MAX_ENTRIES=0 disables
+answer_cache = AnswerCache(
+    max_entries=CHAT_CACHE_MAX_ENTRIES,
+    max_bytes=CHAT_CACHE_MAX_BYTES,
+    ttl=CHAT_CACHE_TTL,
+    threshold=CHAT_CACHE_THRESHOLD
+)
+# Parsed caption files, kept as compact segment arrays per video
+transcripts = TranscriptCache(max_bytes=TRANSCRIPT_CACHE_BYTES)
+summary_cache = SummaryCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+    ttl=CACHE_TTL
+)
+
+# Disk-backed store shared by all gunicorn workers; SUMMARY_DB_PATH="" disables it
+summary_store = None
+if SUMMARY_DB_PATH:
+    try:
+        summary_store = SummaryStore(
+            SUMMARY_DB_PATH,
+            ttl=SUMMARY_DB_TTL,
+            max_rows=SUMMARY_DB_MAX_ROWS,
+            stale_grace=SUMMARY_DB_STALE_GRACE
+        )
+        # Warm start: a fresh worker answers recently seen videos without the webhook
+        for stored_id, stored_data in summary_store.recent(SUMMARY_WARM_START):
+            summary_cache.put(stored_id, stored_data)
+    except Exception as e:
+        log.warning('summary store disabled', extra={'error': str(e)})
+        summary_store = None
+
+# Concurrent requests for the same video share one webhook call
+single_flight = SingleFlight(
+    wait_timeout=SINGLE_FLIGHT_WAIT,
+    lock_store=summary_store if SINGLE_FLIGHT_CROSS_WORKER else None
+)
+
+# Shared keep-alive connection pool to n8n with retry on transient failures,
+# an overall deadline per call and a circuit breaker that fails fast during outages
+webhook_client = WebhookClient(
+    pool_size=WEBHOOK_POOL_SIZE,
+    connect_timeout=WEBHOOK_CONNECT_TIMEOUT,
+    read_timeout=WEBHOOK_READ_TIMEOUT,
+    max_retries=WEBHOOK_MAX_RETRIES,
+    deadline=WEBHOOK_DEADLINE,
+    breaker=CircuitBreaker(
+        name='The n8n webhook',
+        failure_rate=WEBHOOK_BREAKER_FAILURE_RATE,
+        min_calls=WEBHOOK_BREAKER_MIN_CALLS,
+        window=WEBHOOK_BREAKER_WINDOW,
+        open_seconds=WEBHOOK_BREAKER_OPEN_SECONDS
+    ) if WEBHOOK_BREAKER else None,
+    hedge=WEBHOOK_HEDGE,
+    hedge_min_delay=WEBHOOK_HEDGE_MIN_DELAY
+)
+
+class WebhookError(Exception):
+    """Raised when the n8n webhook returns an unusable response"""
+
+# Model instances are built once per worker and shared by all conversations
+model_pool = ModelPool(lambda model_name: genai.GenerativeModel(model_name))
+
+def build_llm_backends(spec: str) -> list:
+    """Backends from LLM_BACKENDS, e.g. "gemini:gemini-2.5-flash*8,groq:llama-3.1-8b-instant,fake:0.2"
+
+    ``*N`` caps concurrent calls to that backend. Backends whose API key is
+    not set are skipped. ``fake:<seconds>[~<jitter>][:<error rate>[:<reply tokens>]]``
+    is a local stand-in with that median latency, e.g. "fake:0.3~0.5:0.01:200".
+    """
+    backends = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        item, _, limit = item.partition('*')
+        kind, _, arg = item.partition(':')
+        concurrency = int(limit) if limit else LLM_MAX_CONCURRENCY
+        if kind == 'gemini' and GEMINI_API_KEY:
+            backends.append(GeminiProvider(model_pool, arg or GEMINI_MODEL, concurrency))
+        elif kind == 'groq' and GROQ_API_KEY and arg:
+            backends.append(OpenAICompatibleProvider('groq', GROQ_BASE_URL, GROQ_API_KEY, arg, concurrency))
+        elif kind == 'fake':
+            latency, error_rate, reply_tokens = (arg.split(':') + ['', '', ''])[:3]
+            latency, _, jitter = latency.partition('~')
+            latency = float(latency or 0.05)
+            backends.append(FakeProvider(
+                f'fake:{latency:g}', latency=latency, jitter=float(jitter or 0),
+                error_rate=float(error_rate or 0), reply_tokens=int(reply_tokens or 40),
+                max_concurrency=concurrency
+            ))
+    return backends
+
+# Chat and transcript summaries go to the fastest healthy LLM backend
+llm_router = LLMRouter(
+    build_llm_backends(LLM_BACKENDS),
+    max_error_rate=LLM_MAX_ERROR_RATE,
+    cooldown=LLM_COOLDOWN
+)
 
-def chat_with_gemini(user_message: str) -> str:
+# Transcript summaries: map over chunks in parallel, reduce hierarchically.
+# "router" uses the LLM backends above; "fake" is a deterministic local stand-in.
+summary_backend = None
+if MAP_REDUCE_BACKEND == "fake":
+    summary_backend = FakeBackend()
+elif MAP_REDUCE_BACKEND in ("router", "gemini") and llm_router.backends:
+    summary_backend = llm_router
+long_summarizer = None
+if summary_backend is not None:
+    long_summarizer = MapReduceSummarizer(
+        summary_backend,
+        max_workers=MAP_REDUCE_WORKERS,
+        chunk_tokens=MAP_REDUCE_CHUNK_TOKENS,
+        overlap_tokens=MAP_REDUCE_OVERLAP_TOKENS
+    )
+
+def get_chat_model():
+    """Return the model used by the chatbot: the router over all LLM backends"""
+    return llm_router
+
+def build_chat_context(summary_data: dict) -> str:
+    """Short video header attached once at the start of a conversation
+
+    The body of the video (summary, description, transcript) is not included
+    here; relevant passages are retrieved per question instead.
+    """
+    if not summary_data:
+        return ""
+    lines = [f"Title: {summary_data.get('title', '')}"]
+    if summary_data.get('channel'):
+        lines.append(f"Channel: {summary_data['channel']}")
+    if summary_data.get('youtubeUrl'):
+        lines.append(f"URL: {summary_data['youtubeUrl']}")
+    topics = summary_data.get('topics') or []
+    if topics:
+        lines.append(f"Topics: {', '.join(str(t) for t in topics)}")
+    return '\n'.join(lines)
+
+def retrieve_passages(session: Session, user_message: str) -> Optional[list]:
+    """Top-k passages of the session's video for this question, under the token budget"""
+    if not session.video_id:
+        return None
+    index = retrieval_indexes.get(session.video_id)
+    if index is None:
+        # Sessions hold only the video ID; the summary is looked up again once the index was evicted
+        response_data = lookup_summary(session.video_id)
+        if response_data is None:
+            return None
+        index = retrieval_indexes.build(session.video_id, with_transcript(session.video_id, response_data))
+    return index.select(user_message, k=RETRIEVAL_TOP_K, token_budget=RETRIEVAL_TOKEN_BUDGET)
+
+def get_conversation(session: Session) -> ChatConversation:
+    """Return the session's Gemini conversation, starting it on first use"""
+    with session.lock:
+        if session.conversation is None:
+            session.conversation = ChatConversation(
+                get_chat_model(),
+                context=session.context,
+                history=session.chat_history,
+                lock=session.lock
+            )
+        return session.conversation
+
+def chat_with_gemini(user_message: str, session: Session) -> str:
     """Chat with Gemini AI"""
-    if not GEMINI_API_KEY:
-        return "❌ Gemini API is not configured."
-    
+    if not llm_router.backends:
+        return "❌ No LLM backend is configured (set GEMINI_API_KEY)."
+
+    first_turn = not session.chat_history
+    started = time.perf_counter()
     try:
-        # Use the stable Gemini 2.5 Flash model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        context = ""
-        
-        if app.summary_data:
-            context = f"Context from YouTube video summary:\n{str(app.summary_data)[:1000]}\n\n"
-        
-        full_message = f"{context}User question: {user_message}"
-        response = model.generate_content(full_message)
-        return response.text
+        with stage('retrieval'):
+            excerpts = retrieve_passages(session, user_message)
+        with stage('llm'):
+            response_text = get_conversation(session).send(user_message, excerpts)
     except Exception as e:
+        ERRORS.inc('chat', type(e).__name__)
         return f"Error: {str(e)}"
+    remember_answer(session, user_message, response_text, time.perf_counter() - started, first_turn)
+    session_store.add_turn(session, user_message, response_text)
+    return response_text
 
-# HTML Template
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>YouTube Summarizer Pro</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: white;
-            color: #333;
-        }
-        
-        .header {
-            background: linear-gradient(135deg, #ff8c00 0%, #ff9f1a 100%);
-            color: white;
-            padding: 3rem 2rem;
-            text-align: center;
-            box-shadow: 0 4px 15px rgba(255, 140, 0, 0.2);
-        }
-        
-        .header h1 {
-            font-size: 2.8rem;
-            font-weight: 900;
-            letter-spacing: -1px;
-            margin-bottom: 0.5rem;
-        }
-        
-        .header p {
-            font-size: 1.1rem;
-            opacity: 0.95;
-            font-weight: 500;
-        }
-        
-        .container {
-            max-width: 1000px;
-            margin: 0 auto;
-            padding: 2rem 1rem;
-        }
-        
-        .tabs {
-            display: flex;
-            gap: 10px;
-            margin-bottom: 2rem;
-            border-bottom: 2px solid #ff8c00;
-            flex-wrap: wrap;
-        }
-        
-        .tab-btn {
-            background: #f5f5f5;
-            color: #333;
-            border: none;
-            padding: 12px 24px;
-            font-size: 1rem;
-            font-weight: 600;
-            cursor: pointer;
-            border-radius: 8px 8px 0 0;
-            transition: all 0.3s ease;
-        }
-        
-        .tab-btn.active {
-            background: #ff8c00;
-            color: white;
-        }
-        
-        .tab-btn:hover {
-            background: #ff9f1a;
-            color: white;
-        }
-        
-        .tab-content {
-            display: none;
-            animation: fadeIn 0.3s ease;
-        }
-        
-        .tab-content.active {
-            display: block;
-        }
-        
-        @keyframes fadeIn {
-            from { opacity: 0; }
-            to { opacity: 1; }
-        }
-        
-        .input-section {
-            background: #f9f9f9;
-            padding: 2rem;
-            border-radius: 12px;
-            border-left: 6px solid #ff8c00;
-            margin-bottom: 2rem;
-        }
-        
-        .input-section h3 {
-            color: #ff8c00;
-            margin-bottom: 1.5rem;
-            font-size: 1.2rem;
-        }
-        
-        .form-group {
-            margin-bottom: 1.5rem;
-        }
-        
-        label {
-            display: block;
-            margin-bottom: 0.5rem;
-            font-weight: 600;
-            color: #333;
-        }
-        
-        input[type="text"],
-        select,
-        textarea {
-            width: 100%;
-            padding: 12px;
-            border: 2px solid #ff8c00;
-            border-radius: 8px;
-            font-size: 1rem;
-            font-family: inherit;
-            transition: all 0.3s ease;
-        }
-        
-        input[type="text"]:focus,
-        select:focus,
-        textarea:focus {
-            outline: none;
-            border-color: #ff7700;
-            box-shadow: 0 0 0 3px rgba(255, 140, 0, 0.1);
-        }
-        
-        .button-group {
-            display: flex;
-            gap: 1rem;
-            margin-top: 2rem;
-            flex-wrap: wrap;
-        }
-        
-        button {
-            background: #ff8c00;
-            color: white;
-            border: none;
-            padding: 12px 24px;
-            font-size: 1rem;
-            font-weight: 600;
-            border-radius: 8px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        
-        button:hover {
-            background: #ff7700;
-            box-shadow: 0 6px 15px rgba(255, 140, 0, 0.3);
-        }
-        
-        button:disabled {
-            background: #ccc;
-            cursor: not-allowed;
-            box-shadow: none;
-        }
-        
-        .output-box {
-            background: #f9f9f9;
-            border-left: 6px solid #ff8c00;
-            padding: 2rem;
-            border-radius: 8px;
-            margin-top: 2rem;
-            max-height: 600px;
-            overflow-y: auto;
-            word-wrap: break-word;
-            white-space: normal;
-        }
-        
-        .output-box h4 {
-            color: #ff8c00;
-            margin-bottom: 1rem;
-            font-size: 1.1rem;
-        }
-        
-        .output-box pre {
-            background: white;
-            padding: 1.5rem;
-            border-radius: 6px;
-            border: 1px solid #ddd;
-            overflow-x: visible;
-            overflow-y: auto;
-            font-size: 0.95rem;
-            line-height: 1.6;
-            white-space: pre-wrap;
-            word-wrap: break-word;
-            max-height: 500px;
-        }
-        
-        .summary-section {
-            background: white;
-            padding: 1.5rem;
-            border-radius: 6px;
-            border: 1px solid #ddd;
-            margin-bottom: 1rem;
-            line-height: 1.8;
-        }
-        
-        .summary-section h5 {
-            color: #ff8c00;
-            margin-bottom: 0.8rem;
-            font-size: 1rem;
-        }
-        
-        .summary-section p {
-            color: #333;
-            margin-bottom: 0.8rem;
-            text-align: justify;
-        }
-        
-        .summary-list {
-            color: #333;
-            margin-left: 1.5rem;
-            line-height: 1.8;
-        }
-        
-        .summary-list li {
-            margin-bottom: 0.8rem;
-        }
-        
-        .success {
-            background: #e5ffe5;
-            border-left: 6px solid #00aa00;
-            color: #006600;
-            padding: 1rem;
-            border-radius: 8px;
-            margin-bottom: 1rem;
-        }
-        
-        .error {
-            background: #ffe5e5;
-            border-left: 6px solid #cc0000;
-            color: #990000;
-            padding: 1rem;
-            border-radius: 8px;
-            margin-bottom: 1rem;
-        }
-        
-        .info {
-            background: #fff5e5;
-            border-left: 6px solid #ff8c00;
-            color: #994400;
-            padding: 1rem;
-            border-radius: 8px;
-            margin-bottom: 1rem;
-        }
-        
-        .stats {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(150px, 1fr));
-            gap: 1rem;
-            margin-bottom: 2rem;
-        }
-        
-        .stat-box {
-            background: linear-gradient(135deg, #ff8c00 0%, #ff9f1a 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 8px;
-            text-align: center;
-        }
-        
-        .stat-value {
-            font-size: 1.8rem;
-            font-weight: 900;
-            margin-bottom: 0.5rem;
-        }
-        
-        .stat-label {
-            font-size: 0.9rem;
-            opacity: 0.95;
-        }
-        
-        .chat-box {
-            background: white;
-            border: 2px solid #ff8c00;
-            border-radius: 12px;
-            padding: 1.5rem;
-            margin-bottom: 1.5rem;
-            max-height: 400px;
-            overflow-y: auto;
-        }
-        
-        .chat-message {
-            margin-bottom: 1rem;
-            padding: 1rem;
-            border-radius: 8px;
-        }
-        
-        .chat-user {
-            background: #ff8c00;
-            color: white;
-            margin-left: 1rem;
-            border-bottom-right-radius: 0;
-        }
-        
-        .chat-bot {
-            background: #f9f9f9;
-            color: #333;
-            margin-right: 1rem;
-            border-left: 4px solid #ff8c00;
-            border-bottom-left-radius: 0;
-        }
-        
-        .loading {
-            display: inline-block;
-            width: 20px;
-            height: 20px;
-            border: 3px solid #ff8c00;
-            border-radius: 50%;
-            border-top-color: transparent;
-            animation: spin 0.8s linear infinite;
-        }
-        
-        @keyframes spin {
-            to { transform: rotate(360deg); }
-        }
-        
-        .footer {
-            text-align: center;
-            color: #666;
-            padding: 2rem 1rem;
-            margin-top: 3rem;
-            border-top: 2px solid #ff8c00;
-        }
-        
-        @media (max-width: 768px) {
-            .header h1 {
-                font-size: 2rem;
-            }
-            
-            .button-group {
-                flex-direction: column;
-            }
-            
-            button {
-                width: 100%;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>🎬 YouTube Summarizer Pro</h1>
-        <p>Transform Videos into Instant Summaries with AI Chat</p>
-    </div>
-    
-    <div class="container">
-        <div class="tabs">
-            <button class="tab-btn active" onclick="switchTab('summarizer')">📝 Summarizer</button>
-            <button class="tab-btn" onclick="switchTab('chatbot')">💬 Chatbot</button>
-            <button class="tab-btn" onclick="switchTab('analytics')">📊 Analytics</button>
-        </div>
-        
-        <!-- Summarizer Tab -->
-        <div id="summarizer" class="tab-content active">
-            <div class="input-section">
-                <h3>Enter YouTube Video Details</h3>
-                
-                <div class="form-group">
-                    <label for="youtube-url">YouTube URL</label>
-                    <input type="text" id="youtube-url" placeholder="https://youtu.be/6bnDzZDiCkA">
-                </div>
-                
-                <div class="form-group">
-                    <label for="output-format">Output Format</label>
-                    <select id="output-format">
-                        <option>Summary</option>
-                        <option>Timestamps</option>
-                        <option>Key Points</option>
-                        <option>Full Transcript</option>
-                    </select>
-                </div>
-                
-                <div class="button-group">
-                    <button onclick="summarizeVideo()">✨ Summarize</button>
-                    <button onclick="clearSummary()" style="background: #999;">🔄 Clear</button>
-                </div>
-            </div>
-            
-            <div id="summary-output"></div>
-        </div>
-        
-        <!-- Chatbot Tab -->
-        <div id="chatbot" class="tab-content">
-            <div class="input-section">
-                <h3>🤖 AI Chat Assistant</h3>
-                <p style="color: #666; margin-bottom: 1rem;">Ask questions about the video summary or any topic!</p>
-                
-                <div class="chat-box" id="chat-history"></div>
-                
-                <div class="form-group">
-                    <label for="chat-input">Your Message</label>
-                    <textarea id="chat-input" placeholder="Type your question..." rows="3"></textarea>
-                </div>
-                
-                <div class="button-group">
-                    <button onclick="sendMessage()">Send</button>
-                    <button onclick="clearChat()" style="background: #999;">🗑️ Clear Chat</button>
-                </div>
-            </div>
-        </div>
-        
-        <!-- Analytics Tab -->
-        <div id="analytics" class="tab-content">
-            <div class="input-section">
-                <h3>📊 Statistics & Information</h3>
-                
-                <div class="stats">
-                    <div class="stat-box">
-                        <div class="stat-value" id="stat-summaries">0</div>
-                        <div class="stat-label">Total Summaries</div>
-                    </div>
-                    <div class="stat-box">
-                        <div class="stat-value" id="stat-messages">0</div>
-                        <div class="stat-label">Chat Messages</div>
-                    </div>
-                </div>
-                
-                <div style="background: white; border: 2px solid #ff8c00; border-radius: 8px; padding: 2rem; text-align: center;">
-                    <h3 style="color: #ff8c00; margin-bottom: 1rem;">🚀 Getting Started</h3>
-                    <p style="color: #666; line-height: 1.8;">
-                        1. Go to the <strong>Summarizer tab</strong><br>
-                        2. Paste your YouTube URL<br>
-                        3. Select output format<br>
-                        4. Click <strong>Summarize</strong><br>
-                        5. Use the <strong>Chatbot</strong> to ask questions
-                    </p>
-                </div>
-            </div>
-        </div>
-    </div>
-    
-    <div class="footer">
-        <p>🎬 YouTube Summarizer Pro | Powered by n8n, Gemini AI & Flask</p>
-        <p style="font-size: 0.9rem;">© 2025 All rights reserved</p>
-    </div>
-    
-    <script>
-        let summaryCount = 0;
-        let messageCount = 0;
-        
-        function escapeHtml(text) {
-            const map = {
-                '&': '&amp;',
-                '<': '&lt;',
-                '>': '&gt;',
-                '"': '&quot;',
-                "'": '&#039;'
-            };
-            return text.replace(/[&<>"']/g, m => map[m]);
-        }
-        
-        function switchTab(tabName) {
-            document.querySelectorAll('.tab-content').forEach(el => el.classList.remove('active'));
-            document.querySelectorAll('.tab-btn').forEach(el => el.classList.remove('active'));
-            
-            document.getElementById(tabName).classList.add('active');
-            event.target.classList.add('active');
-        }
-        
-        async function summarizeVideo() {
-            const url = document.getElementById('youtube-url').value;
-            const format = document.getElementById('output-format').value;
-            const outputDiv = document.getElementById('summary-output');
-            
-            if (!url.trim()) {
-                outputDiv.innerHTML = '<div class="error">❌ Please enter a YouTube URL</div>';
-                return;
-            }
-            
-            outputDiv.innerHTML = '<div class="info"><div class="loading"></div> Processing...</div>';
-            
-            try {
-                const response = await fetch('/api/summarize', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ url, format })
-                });
-                
-                let data;
-                try {
-                    data = await response.json();
-                } catch (parseError) {
-                    outputDiv.innerHTML = `<div class="error">❌ Server error: Invalid response format. ${response.statusText}</div>`;
-                    return;
-                }
-                
-                if (data.success) {
-                    summaryCount++;
-                    document.getElementById('stat-summaries').textContent = summaryCount;
-                    
-                    const summary = data.summary;
-                    const format = data.format;
-                    let summaryHTML = `
-                        <div class="success">✅ Summary generated successfully!</div>
-                        <div class="stats">
-                            <div class="stat-box">
-                                <div class="stat-value">${data.video_id}</div>
-                                <div class="stat-label">Video ID</div>
-                            </div>
-                            <div class="stat-box">
-                                <div class="stat-value">${format}</div>
-                                <div class="stat-label">Format</div>
-                            </div>
-                        </div>
-                        <div class="output-box">
-                    `;
-                    
-                    if (format === "Summary") {
-                        summaryHTML += `
-                            <h4>📝 Video Summary</h4>
-                            <div class="summary-section">
-                                <h5>📌 Title</h5>
-                                <p>${escapeHtml(summary.title)}</p>
-                            </div>
-                            <div class="summary-section">
-                                <h5>📖 Description</h5>
-                                <p>${escapeHtml(summary.description)}</p>
-                            </div>
-                            <div class="summary-section">
-                                <h5>✨ Summary</h5>
-                                <p>${escapeHtml(summary.summary)}</p>
-                            </div>
-                            ${summary.topics && summary.topics.length > 0 ? `
-                            <div class="summary-section">
-                                <h5>🎯 Topics</h5>
-                                <ul class="summary-list">
-                                    ${summary.topics.map(t => `<li>${escapeHtml(t)}</li>`).join('')}
-                                </ul>
-                            </div>
-                            ` : ''}
-                        `;
-                    } 
-                    else if (format === "Timestamps") {
-                        summaryHTML += `
-                            <h4>⏱️ Video Timestamps</h4>
-                            <div class="summary-section">
-                                <h5>📌 Title</h5>
-                                <p>${escapeHtml(summary.title)}</p>
-                            </div>
-                            <div class="summary-section">
-                                <h5>⏱️ Timeline</h5>
-                                <ul class="summary-list">
-                                    ${summary.timestamps.map(ts => `<li><strong>${ts.time}</strong> - ${escapeHtml(ts.description)}</li>`).join('')}
-                                </ul>
-                            </div>
-                            <div class="summary-section">
-                                <h5>📹 Duration</h5>
-                                <p>${summary.total_duration}</p>
-                            </div>
-                        `;
-                    }
-                    else if (format === "Key Points") {
-                        summaryHTML += `
-                            <h4>🔑 Key Points</h4>
-                            <div class="summary-section">
-                                <h5>📌 Title</h5>
-                                <p>${escapeHtml(summary.title)}</p>
-                            </div>
-                            <div class="summary-section">
-                                <h5>🔑 Main Points</h5>
-                                <ul class="summary-list">
-                                    ${summary.key_points.map(kp => `<li>${escapeHtml(kp)}</li>`).join('')}
-                                </ul>
-                            </div>
-                            ${summary.topics && summary.topics.length > 0 ? `
-                            <div class="summary-section">
-                                <h5>🎯 Topics Covered</h5>
-                                <ul class="summary-list">
-                                    ${summary.topics.map(t => `<li>${escapeHtml(t)}</li>`).join('')}
-                                </ul>
-                            </div>
-                            ` : ''}
-                        `;
-                    }
-                    else if (format === "Full Transcript") {
-                        summaryHTML += `
-                            <h4>📄 Full Transcript</h4>
-                            <div class="summary-section">
-                                <h5>📌 Title</h5>
-                                <p>${escapeHtml(summary.title)}</p>
-                            </div>
-                            <div class="summary-section">
-                                <h5>📹 Channel</h5>
-                                <p>${summary.channel}</p>
-                            </div>
-                            <div class="summary-section">
-                                <h5>📖 Full Description</h5>
-                                <p>${escapeHtml(summary.full_description)}</p>
-                            </div>
-                            <div class="summary-section">
-                                <h5>✨ Summary</h5>
-                                <p>${escapeHtml(summary.summary)}</p>
-                            </div>
-                            ${summary.topics && summary.topics.length > 0 ? `
-                            <div class="summary-section">
-                                <h5>🎯 Topics</h5>
-                                <ul class="summary-list">
-                                    ${summary.topics.map(t => `<li>${escapeHtml(t)}</li>`).join('')}
-                                </ul>
-                            </div>
-                            ` : ''}
-                            <div class="summary-section">
-                                <h5>🔗 Video URL</h5>
-                                <p><a href="${escapeHtml(summary.url)}" target="_blank" style="color: #ff8c00; text-decoration: none;">${escapeHtml(summary.url)}</a></p>
-                            </div>
-                        `;
-                    }
-                    
-                    summaryHTML += `
-                            <div class="summary-section">
-                                <h5>📊 Raw Data</h5>
-                                <pre>${JSON.stringify(summary, null, 2)}</pre>
-                            </div>
-                        </div>
-                    `;
-                    
-                    outputDiv.innerHTML = summaryHTML;
-                } else {
-                    outputDiv.innerHTML = `<div class="error">❌ ${data.error}</div>`;
-                }
-            } catch (error) {
-                outputDiv.innerHTML = `<div class="error">❌ Error: ${error.message}</div>`;
-            }
-        }
-        
-        function clearSummary() {
-            document.getElementById('youtube-url').value = '';
-            document.getElementById('summary-output').innerHTML = '';
-        }
-        
-        async function sendMessage() {
-            const input = document.getElementById('chat-input');
-            const message = input.value.trim();
-            
-            if (!message) return;
-            
-            const chatHistory = document.getElementById('chat-history');
-            
-            // Add user message
-            const userDiv = document.createElement('div');
-            userDiv.className = 'chat-message chat-user';
-            userDiv.textContent = 'You: ' + message;
-            chatHistory.appendChild(userDiv);
-            
-            input.value = '';
-            chatHistory.scrollTop = chatHistory.scrollHeight;
-            
-            try {
-                const response = await fetch('/api/chat', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ message })
-                });
-                
-                const data = await response.json();
-                
-                // Add bot message
-                const botDiv = document.createElement('div');
-                botDiv.className = 'chat-message chat-bot';
-                botDiv.textContent = 'AI: ' + data.response;
-                chatHistory.appendChild(botDiv);
-                
-                messageCount += 2;
-                document.getElementById('stat-messages').textContent = messageCount;
-                chatHistory.scrollTop = chatHistory.scrollHeight;
-            } catch (error) {
-                const errorDiv = document.createElement('div');
-                errorDiv.className = 'chat-message chat-bot';
-                errorDiv.textContent = 'AI: Error - ' + error.message;
-                chatHistory.appendChild(errorDiv);
+def cached_answer(session: Session, user_message: str) -> Optional[str]:
+    """An earlier answer to the same question about this video, recorded as a chat turn"""
+    if not answer_cache.enabled or not session.video_id:
+        return None
+    with stage('answer_cache'):
+        answer = answer_cache.get(session.video_id, user_message)
+    if answer is not None:
+        session_store.add_turn(session, user_message, answer)
+    return answer
+
+def remember_answer(session: Session, user_message: str, answer: str, seconds: float, first_turn: bool) -> None:
+    """Offer a fresh answer to the answer cache
+
+    Only answers given without earlier turns are stored: they depend on the
+    video and the question alone, so any session may reuse them.
+    """
+    if first_turn and answer_cache.enabled and session.video_id:
+        answer_cache.put(session.video_id, user_message, answer, seconds)
+
+def stream_chat_with_gemini(user_message: str, session: Session) -> Iterator[str]:
+    """Yield Gemini's reply chunk by chunk as it is generated
+
+    Closing the generator stops consuming the stream, which releases the
+    underlying Gemini call.
+    """
+    return get_conversation(session).stream(user_message, retrieve_passages(session, user_message))
+
+class ChatStreamStats:
+    """Counters and time-to-first-token for streamed chat replies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.ttft_total = 0.0
+        self.ttft_count = 0
+        self.ttft_last = None
+
+    def record_ttft(self, seconds: float) -> None:
+        with self._lock:
+            self.ttft_total += seconds
+            self.ttft_count += 1
+            self.ttft_last = seconds
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'streams': self.streams,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'errors': self.errors,
+                'ttft_avg_ms': round(self.ttft_total / self.ttft_count * 1000, 1) if self.ttft_count else None,
+                'ttft_last_ms': round(self.ttft_last * 1000, 1) if self.ttft_last is not None else None,
             }
-        }
-        
-        function clearChat() {
-            document.getElementById('chat-history').innerHTML = '';
-            fetch('/api/clear-chat', { method: 'POST' });
-            messageCount = 0;
-            document.getElementById('stat-messages').textContent = '0';
-        }
-    </script>
-</body>
-</html>
-"""
+
+chat_stream_stats = ChatStreamStats()
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def current_session() -> Session:
+    """Return the caller's session (cookie or X-Session-Token header), creating it on first use"""
+    if 'session' not in g:
+        session_id = request.cookies.get(SESSION_COOKIE) or request.headers.get('X-Session-Token')
+        g.session, g.new_session = session_store.get_or_create(session_id)
+    return g.session
+
+def new_request_id(incoming: str) -> str:
+    """The caller's X-Request-ID if it looks sane, else a fresh one"""
+    return incoming if REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex[:16]
+
+def finish_request(started: float, route: str, method: str, path: str, status: int,
+                   rid: str, keep: bool, timings: dict) -> None:
+    """Record a finished request's latency and write its log line"""
+    duration = time.perf_counter() - started
+    REQUEST_LATENCY.observe(duration, route, method, str(status))
+    REQUESTS_IN_FLIGHT.dec(route)
+    if status >= 400 or keep:
+        log.log(logging.INFO if status < 500 else logging.WARNING, 'request', extra={
+            'request_id': rid, 'method': method, 'path': path, 'route': route, 'status': status,
+            'duration_ms': round(duration * 1000, 2), 'stages': timings
+        })
+    log_pipeline.report_drops(log)
+
+@app.before_request
+def begin_request():
+    # Registered before admission control so shed requests are measured and logged too
+    route = request.endpoint or 'unmatched'
+    g.request_started = time.perf_counter()
+    g.request_id = new_request_id(request.headers.get('X-Request-ID', ''))
+    g.sampled = random.random() < LOG_SAMPLE_RATE
+    g.stage_timings = {}
+    g.context_tokens = (request_id.set(g.request_id), sampled.set(g.sampled), stage_timings.set(g.stage_timings))
+    REQUESTS_IN_FLIGHT.inc(route)
+    if request.content_length:
+        REQUEST_BYTES.observe(request.content_length, route)
+
+@app.after_request
+def end_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    route = request.endpoint or 'unmatched'
+    method, path, status = request.method, request.path, response.status_code
+    rid, keep, timings = g.request_id, g.sampled, g.stage_timings
+    response.headers['X-Request-ID'] = rid
+    if not response.is_streamed:
+        RESPONSE_BYTES.observe(response.calculate_content_length() or 0, route)
+
+    # Runs once the body has been sent, so streamed responses are timed in full
+    response.call_on_close(lambda: finish_request(started, route, method, path, status, rid, keep, timings))
+    return response
+
+@app.teardown_request
+def reset_request_context(error):
+    tokens = g.pop('context_tokens', None)
+    if tokens is not None:
+        for var, token in zip((request_id, sampled, stage_timings), tokens):
+            var.reset(token)
+
+# Endpoint -> (rate limiter, concurrency limiter). Endpoints not listed,
+# notably /, /assets and /healthz, bypass admission control entirely.
+summarize_admission = (
+    RateLimiter(SUMMARIZE_RATE, SUMMARIZE_BURST),
+    ConcurrencyLimiter('summarize', SUMMARIZE_CONCURRENCY, SUMMARIZE_QUEUE, ADMISSION_MAX_WAIT)
+)
+# Batches and caption ingests hold their slot for as long as they stream, so they
+# get their own group and never take the slots interactive summarizes need
+batch_admission = (
+    RateLimiter(SUMMARIZE_RATE, SUMMARIZE_BURST),
+    ConcurrencyLimiter('batch', BATCH_CONCURRENCY, BATCH_QUEUE, ADMISSION_MAX_WAIT)
+)
+chat_admission = (
+    RateLimiter(CHAT_RATE, CHAT_BURST),
+    ConcurrencyLimiter('chat', CHAT_CONCURRENCY, CHAT_QUEUE, ADMISSION_MAX_WAIT)
+)
+ADMISSION = {
+    'summarize': summarize_admission,
+    'summarize_batch': batch_admission,
+    'ingest_captions': batch_admission,
+    'chat': chat_admission,
+    'chat_stream': chat_admission,
+}
+ADMISSION_GROUPS = (('summarize', summarize_admission), ('batch', batch_admission), ('chat', chat_admission))
+# Long-polls and job event streams hold a thread while they wait; no queue, so a
+# poll beyond the limit is answered at once instead of taking another thread
+job_wait_limiter = ConcurrencyLimiter('job_wait', JOB_WAIT_CONCURRENCY, 0, 0)
+
+def client_key() -> str:
+    """Rate-limit key: the address Render's proxy saw (last X-Forwarded-For hop) or the peer"""
+    forwarded = request.headers.get('X-Forwarded-For', '')
+    return forwarded.split(',')[-1].strip() or request.remote_addr or 'unknown'
+
+@app.before_request
+def admit_request():
+    limits = ADMISSION.get(request.endpoint)
+    if limits is None:
+        return None
+    rate_limiter, concurrency = limits
+    try:
+        rate_limiter.check(client_key())
+        g.admission = (concurrency, concurrency.acquire())
+    except AdmissionRejected as e:
+        message = str(e)
+        response = jsonify({'success': False, 'error': message, 'response': f"❌ {message}"})
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    return None
+
+@app.after_request
+def release_admission(response):
+    # Streamed responses keep their slot until the body is fully sent
+    admission = g.pop('admission', None)
+    if admission is not None:
+        concurrency, acquired_at = admission
+        response.call_on_close(lambda: concurrency.release(acquired_at))
+    return response
+
+@app.teardown_request
+def release_admission_on_error(error):
+    admission = g.pop('admission', None)
+    if admission is not None:
+        concurrency, acquired_at = admission
+        concurrency.release(acquired_at)
+
+@app.after_request
+def save_session(response):
+    if getattr(g, 'new_session', False):
+        response.set_cookie(SESSION_COOKIE, g.session.id, max_age=int(SESSION_IDLE_TTL),
+                            httponly=True, samesite='Lax')
+        response.headers['X-Session-Token'] = g.session.id
+    return response
+
+# Page and assets are rendered, hashed and compressed once per worker
+frontend = FrontendAssets(
+    os.path.join(BASE_DIR, 'static'),
+    os.path.join(BASE_DIR, 'templates', 'index.html')
+)
 
 @app.route('/')
 def home():
-    return render_template_string(HTML_TEMPLATE)
+    return frontend.index.response(request)
+
+@app.route('/assets/<name>')
+def asset(name):
+    static_asset = frontend.asset(name)
+    if static_asset is None:
+        abort(404)
+    return static_asset.response(request)
 
 def format_summary_by_type(response_data, format_type):
     """Format summary based on selected format type"""
     if format_type == "Summary":
+        summary = response_data.get('summary', '')
+        summary_source = 'webhook'
+        transcript = response_data.get('transcript')
+        if long_summarizer and isinstance(transcript, str) and transcript.strip():
+            # The n8n summary only sees the title; prefer one built from the transcript
+            try:
+                with stage('map_reduce'):
+                    summary = long_summarizer.summarize(transcript)['summary']
+                summary_source = 'transcript'
+            except Exception as e:
+                log.warning('transcript summary failed', exc_info=True)
+        if not summary:
+            # n8n gave no summary: build one locally from the description or transcript
+            local = summarize_locally(response_data)
+            if local:
+                summary = local['summary']
+                summary_source = 'extractive'
         return {
             'title': response_data.get('title', ''),
             'description': response_data.get('description', '')[:500],
-            'summary': response_data.get('summary', ''),
+            'summary': summary,
+            'summary_source': summary_source,
             'topics': response_data.get('topics', []),
             'id': response_data.get('id', '')
         }
     
     elif format_type == "Timestamps":
-        # Extract timestamps if available, or generate format
-        timestamps = response_data.get('timestamps', [])
-        if not timestamps:
-            timestamps = [
-                {"time": "0:00", "description": "Intro"},
-                {"time": "5:00", "description": "Main Content"},
-                {"time": "15:00", "description": "Conclusion"}
-            ]
+        # n8n timestamps, else creator chapters in the description, else
+        # topic segmentation of a timed transcript
+        timestamps, timestamps_source = generate_timestamps(response_data)
+        duration = response_data.get('duration')
+        segments = response_data.get('segments')
+        if not duration and segments:
+            duration = format_time(segments[-1][1])
         return {
             'title': response_data.get('title', ''),
             'timestamps': timestamps,
-            'total_duration': response_data.get('duration', 'N/A')
+            'timestamps_source': timestamps_source,
+            'total_duration': duration or 'N/A'
         }
     
     elif format_type == "Key Points":
         description = response_data.get('description', '')
         topics = response_data.get('topics', [])
         
-        # Extract key points from description
+        # First sentences of the description; TextRank when opted in, or when
+        # there is no description (e.g. a video known only from uploaded captions)
         key_points = []
-        if description:
+        if description and not LOCAL_KEY_POINTS:
             sentences = description.split('.')
             key_points = [s.strip() + '.' for s in sentences[:5] if s.strip()]
+        if not key_points:
+            local = summarize_locally(response_data)
+            if local:
+                key_points = local['key_points']
         
         if not key_points and topics:
             key_points = topics
@@ -814,74 +655,453 @@ def format_summary_by_type(response_data, format_type):
     
     return response_data
 
+def webhook_payload(youtube_url: str, output_format: str) -> dict:
+    return {
+        "youtubeUrl": youtube_url,
+        "format": output_format,
+        "timestamp": datetime.now().isoformat()
+    }
+
+def fetch_summary(youtube_url: str, output_format: str) -> dict:
+    """Call the n8n webhook and return its raw JSON response"""
+    with stage('webhook'):
+        response = webhook_client.post_json(WEBHOOK_URL, webhook_payload(youtube_url, output_format))
+    return parse_webhook_response(response, youtube_url, output_format)
+
+def parse_webhook_response(response, youtube_url: str, output_format: str) -> dict:
+    """Check and decode a webhook response (requests, or async_http's for the async server)"""
+    WEBHOOK_RESPONSES.inc(str(response.status_code))
+    WEBHOOK_BYTES.observe(len(response.content))
+    log.info('webhook response', extra={
+        'youtube_url': youtube_url,
+        'format': output_format,
+        'status': response.status_code,
+        'content_type': response.headers.get('content-type'),
+        'bytes': len(response.content)
+    })
+
+    # Check if response is HTML (error)
+    if 'text/html' in response.headers.get('content-type', ''):
+        raise WebhookError(f'Webhook error (Status {response.status_code}): The n8n webhook is not responding properly. Please check if the workflow is active.')
+
+    response.raise_for_status()
+
+    try:
+        with stage('json_parse'):
+            return response.json()
+    except ValueError:
+        raise WebhookError(f'Invalid JSON response from webhook. Response: {response.text[:200]}')
+
+def lookup_summary(video_id: str) -> Optional[dict]:
+    """Return an already known summary from the cache or the shared store"""
+    cached = summary_cache.get(video_id)
+    if cached is not None:
+        SUMMARY_LOOKUPS.inc('cache')
+        return cached
+    if summary_store:
+        with stage('store_lookup'):
+            stored = summary_store.get(video_id)
+        if stored is not None:
+            SUMMARY_LOOKUPS.inc('store')
+            summary_cache.put(video_id, stored)
+            return stored
+    SUMMARY_LOOKUPS.inc('miss')
+    return None
+
+def get_summary(youtube_url: str, video_id: Optional[str], output_format: str) -> dict:
+    """Return the raw summary for a video, serving repeats from the cache"""
+    if video_id:
+        known = lookup_summary(video_id)
+        if known is not None:
+            return known
+
+    if not video_id:
+        return fetch_summary(youtube_url, output_format)
+
+    try:
+        return single_flight.do(
+            video_id,
+            lambda: store_summary(video_id, fetch_summary(youtube_url, output_format)),
+            lookup=summary_store.get if summary_store else None
+        )
+    except (WebhookError, SingleFlightTimeout, requests.exceptions.RequestException) as e:
+        return stored_fallback(video_id, e)
+
+def store_summary(video_id: str, response_data: dict) -> dict:
+    """Publish a fresh webhook response to this worker's cache and the shared store"""
+    summary_cache.put(video_id, response_data)
+    if summary_store:
+        summary_store.put(video_id, response_data)
+    return response_data
+
+def prefetch_summary(video_id: str) -> None:
+    """Watchlist work: fetch a video's summary ahead of any request for it
+
+    Unlike get_summary there is no stale fallback; a failure is left for the
+    scheduler to retry later.
+    """
+    youtube_url = VideoRef(video_id).url
+    single_flight.do(
+        video_id,
+        lambda: store_summary(video_id, fetch_summary(youtube_url, 'Summary')),
+        lookup=summary_store.get if summary_store else None
+    )
+
+def summary_known(video_id: str) -> bool:
+    return video_id in summary_cache or bool(summary_store and summary_store.contains(video_id))
+
+def stored_fallback(video_id: str, error: Exception) -> dict:
+    """Webhook slow or down: an expired stored copy, or re-raise the error
+
+    The copy is served with n8n's stored summary as it was; only a copy with
+    no summary gets one built locally by format_summary_by_type.
+    """
+    stale = summary_store.get(video_id, include_expired=True) if summary_store else None
+    if stale is None:
+        raise error
+    log.warning('webhook failed, serving stored copy', extra={'video_id': video_id, 'error': type(error).__name__})
+    return stale
+
+def summarize_error_message(error: Exception) -> str:
+    """Map a summarization failure to the message shown to the user"""
+    ERRORS.inc('summarize', type(error).__name__)
+    if isinstance(error, WebhookError):
+        return str(error)
+    if isinstance(error, SingleFlightTimeout):
+        return f'Timed out waiting for an identical summary request already in progress. {str(error)}'
+    if isinstance(error, CircuitOpenError):
+        return f'{str(error)}. Please try again shortly.'
+    if isinstance(error, requests.exceptions.Timeout):
+        return f'Request timed out ({WEBHOOK_DEADLINE:.0f}s). The video might be too long or the webhook is slow.'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return 'Connection failed. Check if the webhook URL is correct and the n8n service is running.'
+    if isinstance(error, requests.exceptions.RequestException):
+        return f'Request error: {str(error)}'
+    return f'Server error: {str(error)}'
+
+def with_transcript(video_id: Optional[str], response_data: dict) -> dict:
+    """Add an ingested caption transcript and its timed segments to a raw summary"""
+    segments = transcripts.get(video_id) if video_id else None
+    if segments is None or not len(segments):
+        return response_data
+    return {**response_data, 'transcript': segments.text(), 'segments': segments}
+
+def build_summary_response(video_id: Optional[str], output_format: str, response_data: dict,
+                           session: Optional[Session] = None) -> dict:
+    """Shape a raw summary into the JSON body returned to the browser"""
+    response_data = with_transcript(video_id, response_data)
+    if session is not None:
+        session_store.set_summary(session, video_id, build_chat_context(response_data))
+        if video_id and retrieval_indexes.get(video_id) is None:
+            retrieval_indexes.build(video_id, response_data)
+
+    # Format the response based on selected format
+    with stage('format'):
+        formatted_data = format_summary_by_type(response_data, output_format)
+
+    return {
+        'success': True,
+        'video_id': video_id or 'unknown',
+        'format': output_format,
+        'summary': formatted_data
+    }
+
+def run_summary_job(youtube_url: str, video_id: Optional[str], output_format: str,
+                    session: Optional[Session] = None) -> dict:
+    """Background job body: fetch the summary and build the response"""
+    response_data = get_summary(youtube_url, video_id, output_format)
+    return build_summary_response(video_id, output_format, response_data, session)
+
+# One pool for every batch request in this worker, so concurrent batches share
+# BATCH_WORKERS webhook calls instead of each starting their own
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+job_manager = JobManager(
+    max_workers=JOB_WORKERS,
+    max_queue=JOB_MAX_QUEUE,
+    retention=JOB_RETENTION,
+    job_store=summary_store,
+    error_message=summarize_error_message
+)
+
+def interactive_busy() -> bool:
+    """True while this worker has summarize requests, batches or summary jobs running or waiting"""
+    return (not summarize_admission[1].idle() or not batch_admission[1].idle()
+            or job_manager.stats()['active'] > 0)
+
+# Pre-summarizes watchlist videos, but only while no user work is running or
+# queued in this worker; the scan and quota span all workers
+watchlist = None
+if WATCHLIST or WATCHLIST_FILE:
+    watchlist = WatchlistScheduler(
+        summarize=prefetch_summary,
+        is_known=summary_known,
+        interactive_busy=interactive_busy,
+        video_ids=WATCHLIST.replace(',', ' ').split(),
+        feed_path=WATCHLIST_FILE or None,
+        interval=WATCHLIST_INTERVAL,
+        concurrency=WATCHLIST_CONCURRENCY,
+        quota=WATCHLIST_QUOTA,
+        quota_window=WATCHLIST_QUOTA_WINDOW,
+        lock_store=summary_store
+    )
+    watchlist.start()
+
 @app.route('/api/summarize', methods=['POST'])
 def summarize():
     data = request.json
     youtube_url = data.get('url', '').strip()
     output_format = data.get('format', 'Summary')
-    
+    job_mode = data.get('mode') == 'job' or request.args.get('mode') == 'job'
+
     if not youtube_url:
         return jsonify({'success': False, 'error': 'Please enter a YouTube URL'})
-    
-    if not YOUTUBE_REGEX.match(youtube_url):
+
+    video = parse_video_url(youtube_url)
+    if video is None:
         return jsonify({'success': False, 'error': 'Invalid YouTube URL'})
-    
+    # n8n gets one URL shape per video, whatever form was pasted
+    youtube_url, video_id = video.url, video.video_id
+
     try:
-        video_id = extract_video_id(youtube_url)
-        
-        payload = {
-            "youtubeUrl": youtube_url,
-            "format": output_format,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        print(f"Sending request to: {WEBHOOK_URL}")
-        print(f"Payload: {payload}")
-        
-        response = requests.post(WEBHOOK_URL, json=payload, timeout=90)
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response content type: {response.headers.get('content-type')}")
-        
-        # Check if response is HTML (error)
-        if 'text/html' in response.headers.get('content-type', ''):
-            return jsonify({
-                'success': False, 
-                'error': f'Webhook error (Status {response.status_code}): The n8n webhook is not responding properly. Please check if the workflow is active.'
-            })
-        
-        response.raise_for_status()
-        
-        try:
-            response_data = response.json()
-        except ValueError:
-            return jsonify({
-                'success': False,
-                'error': f'Invalid JSON response from webhook. Response: {response.text[:200]}'
-            })
-        
-        app.summary_data = response_data
-        
-        # Format the response based on selected format
-        formatted_data = format_summary_by_type(response_data, output_format)
-        
-        return jsonify({
-            'success': True,
-            'video_id': video_id[:8] if video_id else 'unknown',
-            'format': output_format,
-            'summary': formatted_data
-        })
-    
-    except requests.exceptions.Timeout:
-        return jsonify({'success': False, 'error': 'Request timed out (90s). The video might be too long or the webhook is slow.'})
-    except requests.exceptions.ConnectionError:
-        return jsonify({'success': False, 'error': 'Connection failed. Check if the webhook URL is correct and the n8n service is running.'})
-    except requests.exceptions.RequestException as e:
-        return jsonify({'success': False, 'error': f'Request error: {str(e)}'})
+
+        if job_mode:
+            # Known videos are answered inline; everything else becomes a job
+            known = lookup_summary(video_id) if video_id else None
+            if known is not None:
+                return jsonify(build_summary_response(video_id, output_format, known, current_session()))
+            job = job_manager.submit(run_summary_job, youtube_url, video_id, output_format, current_session())
+            return jsonify({'success': True, **job.to_dict()}), 202
+
+        response_data = get_summary(youtube_url, video_id, output_format)
+        return jsonify(build_summary_response(video_id, output_format, response_data, current_session()))
+
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except (WebhookError, SingleFlightTimeout, requests.exceptions.RequestException) as e:
+        return jsonify({'success': False, 'error': summarize_error_message(e)})
     except Exception as e:
-        import traceback
-        print(f"Error: {traceback.format_exc()}")
-        return jsonify({'success': False, 'error': f'Server error: {str(e)}'})
+        log.exception('summarize failed')
+        return jsonify({'success': False, 'error': summarize_error_message(e)})
+
+@app.route('/api/captions', methods=['POST'])
+def ingest_captions():
+    """Attach an SRT/WebVTT/json3 caption file to a video for summaries and chat
+
+    Accepts a multipart upload (``file``) or JSON with a ``path`` under
+    CAPTIONS_DIR, plus the video's ``url`` or ``video_id``.
+    """
+    # Checked before request.files/form, which would receive and spool the whole upload
+    if request.content_length and request.content_length > CAPTIONS_MAX_BYTES:
+        return jsonify({'success': False, 'error': f'Caption file too large (max {CAPTIONS_MAX_BYTES} bytes)'}), 413
+    if request.content_length is None and request.mimetype == 'multipart/form-data':
+        return jsonify({'success': False, 'error': 'Caption uploads need a Content-Length header'}), 411
+
+    data = request.form if request.files else (request.get_json(silent=True) or {})
+    url = (data.get('url') or '').strip()
+    video_id = (data.get('video_id') or '').strip() or (extract_video_id(url) if url else None)
+    output_format = data.get('format', 'Summary')
+    caption_format = data.get('caption_format') or None
+
+    if not video_id or not is_video_id(video_id):
+        return jsonify({'success': False, 'error': 'Please provide a YouTube URL or 11-character video ID'}), 400
+
+    upload = request.files.get('file')
+    temp_path = None
+    try:
+        if upload is not None:
+            name = upload.filename or ''
+            with tempfile.NamedTemporaryFile(suffix=os.path.splitext(name)[1], delete=False) as f:
+                temp_path = f.name
+                upload.save(f)
+            path = temp_path
+        else:
+            if not CAPTIONS_DIR:
+                return jsonify({'success': False, 'error': 'Local caption paths are disabled (set CAPTIONS_DIR)'}), 400
+            root = os.path.realpath(CAPTIONS_DIR)
+            path = os.path.realpath(os.path.join(root, data.get('path') or ''))
+            if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+                return jsonify({'success': False, 'error': 'Caption file not found'}), 404
+            name = os.path.basename(path)
+
+        started = time.perf_counter()
+        segments = parse_captions(path, caption_format)
+        parse_ms = (time.perf_counter() - started) * 1000
+        record_stage('caption_parse', parse_ms / 1000)
+    except CaptionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
+
+    if not len(segments):
+        return jsonify({'success': False, 'error': 'No caption cues found in file'}), 400
+
+    transcripts.put(video_id, segments)
+    # Answers given from the summary alone may now be incomplete
+    answer_cache.invalidate(video_id)
+    response_data = with_transcript(video_id, lookup_summary(video_id) or {'id': video_id, 'title': name})
+    # Re-index so chat retrieval sees the transcript
+    retrieval_indexes.build(video_id, response_data)
+    body = build_summary_response(video_id, output_format, response_data, current_session())
+    body['captions'] = {
+        'segments': len(segments),
+        'duration': format_time(segments.duration),
+        'bytes': segments.nbytes,
+        'parse_ms': round(parse_ms, 1)
+    }
+    return jsonify(body)
+
+@app.route('/api/summarize/batch', methods=['POST'])
+def summarize_batch():
+    """Summarize many URLs, streaming one NDJSON line per video in completion order"""
+    data = request.json or {}
+    urls = data.get('urls')
+    output_format = data.get('format', 'Summary')
+
+    if not isinstance(urls, list) or not urls:
+        return jsonify({'success': False, 'error': 'Please provide a non-empty list of YouTube URLs'}), 400
+
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({'success': False, 'error': f'Too many URLs (max {BATCH_MAX_URLS} per batch)'}), 400
+
+    # Validate and de-duplicate up front; rejects are reported before any fan-out
+    rejected = []
+    tasks = []
+    seen = set()
+    for index, (url, video) in enumerate(zip(urls, parse_many(urls))):
+        url = url.strip() if isinstance(url, str) else ''
+        if video is None:
+            rejected.append({'index': index, 'url': url, 'success': False, 'error': 'Invalid YouTube URL'})
+        elif video.video_id in seen:
+            rejected.append({'index': index, 'url': url, 'video_id': video.video_id, 'success': False,
+                             'error': 'Duplicate video in batch'})
+        else:
+            seen.add(video.video_id)
+            tasks.append((index, url, video))
+
+    def summarize_one(task):
+        _, _, video = task
+        response_data = get_summary(video.url, video.video_id, output_format)
+        with stage('format'):
+            return format_summary_by_type(with_transcript(video.video_id, response_data), output_format)
+
+    def generate():
+        for line in rejected:
+            yield json.dumps(line) + '\n'
+        for (index, url, video), formatted_data, error in map_unordered(
+                summarize_one, tasks, max_workers=BATCH_WORKERS, executor=batch_executor):
+            line = {'index': index, 'url': url, 'video_id': video.video_id, 'format': output_format}
+            if error is None:
+                line.update({'success': True, 'summary': formatted_data})
+            else:
+                line.update({'success': False, 'error': summarize_error_message(error)})
+            yield json.dumps(line) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'X-Batch-Size': str(len(tasks)), 'X-Batch-Rejected': str(len(rejected))})
+
+@app.route('/api/validate', methods=['POST'])
+def validate_urls():
+    """Canonical video ID, playlist and start time for each URL, without summarizing
+
+    Repeats of an earlier video carry ``duplicate_of``, the index of its
+    first occurrence, so a client can de-duplicate before submitting a batch.
+    """
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+
+    if not isinstance(urls, list):
+        return jsonify({'success': False, 'error': 'Please provide a list of YouTube URLs'}), 400
+
+    if len(urls) > VALIDATE_MAX_URLS:
+        return jsonify({'success': False, 'error': f'Too many URLs (max {VALIDATE_MAX_URLS} per call)'}), 400
+
+    with stage('validate'):
+        results = []
+        first_seen = {}
+        for index, video in enumerate(parse_many(urls)):
+            if video is None:
+                results.append({'index': index, 'valid': False})
+                continue
+            result = {'index': index, 'valid': True, **video.to_dict(), 'url': video.url}
+            first = first_seen.setdefault(video.video_id, index)
+            if first != index:
+                result['duplicate_of'] = first
+            results.append(result)
+
+    return jsonify({
+        'success': True,
+        'count': len(urls),
+        'valid': sum(result['valid'] for result in results),
+        'unique': len(first_seen),
+        'results': results
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status; ?wait=N long-polls up to JOB_MAX_WAIT seconds for completion
+
+    When JOB_WAIT_CONCURRENCY polls are already waiting, the current status is
+    returned at once with Retry-After, so waiting clients never take every thread.
+    """
+    wait = min(request.args.get('wait', 0, type=float), JOB_MAX_WAIT)
+    acquired_at = None
+    if wait > 0:
+        try:
+            acquired_at = job_wait_limiter.acquire()
+        except AdmissionRejected:
+            wait = 0
+    try:
+        if acquired_at is not None:
+            state = job_manager.wait(job_id, wait)
+        else:
+            state = job_manager.get(job_id)
+    finally:
+        if acquired_at is not None:
+            job_wait_limiter.release(acquired_at)
+    if state is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired job'}), 404
+    response = jsonify({'success': True, **state})
+    if request.args.get('wait') and acquired_at is None and state['status'] not in ('done', 'error'):
+        response.headers['Retry-After'] = f'{JOB_POLL_INTERVAL:g}'
+    return response
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events stream that emits the job status until it finishes"""
+    if job_manager.get(job_id) is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired job'}), 404
+    try:
+        acquired_at = job_wait_limiter.acquire()
+    except AdmissionRejected as e:
+        response = jsonify({'success': False, 'error': str(e)})
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+    def generate():
+        last_status = None
+        while True:
+            state = job_manager.wait(job_id, JOB_MAX_WAIT)
+            if state is None:
+                yield 'event: error\ndata: {"error": "Unknown or expired job"}\n\n'
+                return
+            if state['status'] in ('done', 'error'):
+                yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+                return
+            if state['status'] != last_status:
+                last_status = state['status']
+                yield f"event: status\ndata: {json.dumps(state)}\n\n"
+            else:
+                # Keep-alive comment so proxies don't drop the idle connection
+                yield ': keep-alive\n\n'
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The slot is held until the stream ends or the client goes away
+    response.call_on_close(lambda: job_wait_limiter.release(acquired_at))
+    return response
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -891,16 +1111,149 @@ def chat():
     if not user_message:
         return jsonify({'response': 'Please enter a message'})
     
-    response_text = chat_with_gemini(user_message)
-    app.chat_history.append({'user': user_message, 'bot': response_text})
-    
-    return jsonify({'response': response_text})
+    session = current_session()
+    cached = cached_answer(session, user_message)
+    if cached is not None:
+        return jsonify({'response': cached, 'usage': None, 'cached': True})
+
+    response_text = chat_with_gemini(user_message, session)
+    conversation = session.conversation
+
+    return jsonify({
+        'response': response_text,
+        'usage': conversation.last_usage if conversation else None,
+        'cached': False
+    })
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.json
+    user_message = data.get('message', '').strip()
+
+    if not user_message:
+        return jsonify({'response': 'Please enter a message'})
+
+    if not llm_router.backends:
+        return jsonify({'response': "❌ No LLM backend is configured (set GEMINI_API_KEY)."})
+
+    session = current_session()
+    cached = cached_answer(session, user_message)
+    if cached is not None:
+        events = (sse_event('chunk', {'text': cached}),
+                  sse_event('done', {'ttft_ms': 0.0, 'total_ms': 0.0, 'usage': None, 'cached': True}))
+        return Response(events, mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    first_turn = not session.chat_history
+
+    def generate():
+        chat_stream_stats.incr('streams')
+        started = time.perf_counter()
+        ttft = None
+        parts = []
+        stream = stream_chat_with_gemini(user_message, session)
+        try:
+            for text in stream:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    chat_stream_stats.record_ttft(ttft)
+                parts.append(text)
+                yield sse_event('chunk', {'text': text})
+            response_text = ''.join(parts)
+            remember_answer(session, user_message, response_text, time.perf_counter() - started, first_turn)
+            session_store.add_turn(session, user_message, response_text)
+            chat_stream_stats.incr('completed')
+            record_stage('llm_stream', time.perf_counter() - started)
+            yield sse_event('done', {
+                'ttft_ms': round(ttft * 1000, 1) if ttft is not None else None,
+                'total_ms': round((time.perf_counter() - started) * 1000, 1),
+                'usage': session.conversation.last_usage
+            })
+        except GeneratorExit:
+            # Client went away: stop pulling chunks so generation is abandoned
+            chat_stream_stats.incr('cancelled')
+            raise
+        except Exception as e:
+            chat_stream_stats.incr('errors')
+            ERRORS.inc('chat_stream', type(e).__name__)
+            yield sse_event('error', {'error': f"Error: {str(e)}"})
+        finally:
+            stream.close()
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/clear-chat', methods=['POST'])
 def clear_chat_route():
-    app.chat_history = []
+    session_store.clear_history(current_session())
     return jsonify({'success': True})
 
+def _gauges(stats: dict, *keys: str) -> dict:
+    return {(key,): stats[key] for key in keys}
+
+metrics.callback('summary_cache', 'Summary cache size and counters', lambda: _gauges(
+    summary_cache.stats(), 'entries', 'bytes', 'hits', 'misses', 'evictions'), ('kind',))
+metrics.callback('summary_jobs', 'Background summary jobs', lambda: _gauges(
+    job_manager.stats(), 'active', 'tracked', 'submitted', 'rejected', 'completed', 'failed'), ('kind',))
+metrics.callback('sessions', 'Chat sessions and their memory', lambda: _gauges(
+    session_store.stats(), 'sessions', 'bytes'), ('kind',))
+metrics.callback('admission_queue_depth', 'Requests waiting for a slot', lambda: {
+    (limits[1].name,): limits[1].stats()['queue_depth'] for _, limits in ADMISSION_GROUPS},
+    ('group',))
+metrics.callback('admission_rejected', 'Requests shed by admission control', lambda: {
+    (limits[1].name, reason): value
+    for _, limits in ADMISSION_GROUPS
+    for reason, value in (('rate', limits[0].stats()['limited']),
+                          ('queue_full', limits[1].stats()['rejected_queue_full']),
+                          ('timeout', limits[1].stats()['rejected_timeout']))},
+    ('group', 'reason'))
+metrics.callback('chat_answer_cache', 'Chat answer cache size and counters', lambda: _gauges(
+    answer_cache.stats(), 'entries', 'bytes', 'hits', 'misses', 'skipped', 'evictions', 'latency_saved_seconds'),
+    ('kind',))
+metrics.callback('watchlist', 'Watchlist pre-summarization', lambda: _gauges(
+    watchlist.stats(), 'in_flight', 'summarized', 'failed', 'deferred_for_traffic', 'quota_exhausted')
+    if watchlist else {}, ('kind',))
+metrics.callback('webhook_breaker_open', 'Webhook circuit breaker: 0 closed, 0.5 half-open, 1 open', lambda: {
+    (): {'closed': 0, 'half_open': 0.5, 'open': 1}[webhook_client.breaker.state]} if webhook_client.breaker else {})
+metrics.callback('webhook_breaker_trips', 'Times the webhook breaker has opened', lambda: {
+    (): webhook_client.breaker.trips} if webhook_client.breaker else {}, kind='counter')
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition for this worker process"""
+    if not METRICS_ENABLED:
+        abort(404)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness check; never queued behind summarize or chat work"""
+    breaker = webhook_client.breaker
+    return jsonify({'status': 'ok', 'webhook': breaker.state if breaker else 'unknown'})
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    return jsonify({
+        'cache': summary_cache.stats(),
+        'store': summary_store.stats() if summary_store else None,
+        'single_flight': single_flight.stats(),
+        'jobs': job_manager.stats(),
+        'webhook': webhook_client.stats(),
+        'chat_stream': chat_stream_stats.stats(),
+        'sessions': session_store.stats(),
+        'retrieval': retrieval_indexes.stats(),
+        'answer_cache': answer_cache.stats(),
+        'transcripts': transcripts.stats(),
+        'map_reduce': long_summarizer.stats() if long_summarizer else None,
+        'llm': llm_router.stats(),
+        'logging': log_pipeline.stats(),
+        'watchlist': watchlist.stats() if watchlist else None,
+        'admission': {
+            **{group: {'rate': limits[0].stats(), 'concurrency': limits[1].stats()}
+               for group, limits in ADMISSION_GROUPS},
+            'job_wait': {'concurrency': job_wait_limiter.stats()}
+        }
+    })
+
 if __name__ == '__main__':
     app.run(
         host='0.0.0.0',
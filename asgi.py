@@ -0,0 +1,328 @@
+"""Async serving mode: uvicorn asgi:app
+
+POST /api/summarize and POST /api/chat run as coroutines. Their webhook
+and LLM calls are awaited on the event loop, sharing one aiohttp connection
+pool, so an in-flight request costs a coroutine rather than a thread. Every
+other route is the unchanged Flask app, run on a small thread pool. Caches,
+the summary store, sessions, admission control, metrics and logging are the
+same objects the Flask routes use.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+import requests
+from a2wsgi import WSGIMiddleware
+from werkzeug.http import dump_cookie
+
+import app as wsgi
+from admission import AdmissionRejected
+from async_http import AsyncWebhookClient
+from jobs import QueueFullError
+from single_flight import AsyncSingleFlight, SingleFlightTimeout
+from structured_logging import request_id, sampled, stage_timings
+from video_id import parse_video_url
+
+ASYNC_WEBHOOK_POOL_SIZE = int(os.getenv("ASYNC_WEBHOOK_POOL_SIZE", 100))
+ASYNC_WSGI_THREADS = int(os.getenv("ASYNC_WSGI_THREADS", 16))
+ASYNC_MAX_BODY_BYTES = int(os.getenv("ASYNC_MAX_BODY_BYTES", 1024 * 1024))
+
+log = wsgi.log
+
+# One pool of keep-alive connections to n8n for every in-flight request.
+# The breaker is the Flask client's, so both paths agree on n8n's health.
+async_webhook = AsyncWebhookClient(
+    pool_size=ASYNC_WEBHOOK_POOL_SIZE,
+    connect_timeout=wsgi.WEBHOOK_CONNECT_TIMEOUT,
+    read_timeout=wsgi.WEBHOOK_READ_TIMEOUT,
+    max_retries=wsgi.WEBHOOK_MAX_RETRIES,
+    deadline=wsgi.WEBHOOK_DEADLINE,
+    breaker=wsgi.webhook_client.breaker,
+    hedge=wsgi.WEBHOOK_HEDGE,
+    hedge_min_delay=wsgi.WEBHOOK_HEDGE_MIN_DELAY
+)
+async_single_flight = AsyncSingleFlight(
+    wait_timeout=wsgi.SINGLE_FLIGHT_WAIT,
+    lock_store=wsgi.summary_store if wsgi.SINGLE_FLIGHT_CROSS_WORKER else None
+)
+flask_app = WSGIMiddleware(wsgi.app, workers=ASYNC_WSGI_THREADS)
+
+
+class BadRequest(Exception):
+    """Raised for a request body that can't be read"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncRequest:
+    """The parts of an ASGI request the async routes need, plus the caller's session"""
+
+    def __init__(self, scope: dict, body: bytes):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = {k: v[-1] for k, v in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        self.client = scope.get('client')
+        self.body = body
+        self.new_session = False
+        self._session = None
+
+    def json(self) -> dict:
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            raise BadRequest('Request body must be JSON')
+        if not isinstance(data, dict):
+            raise BadRequest('Request body must be a JSON object')
+        return data
+
+    def client_key(self) -> str:
+        """Same key as app.client_key: last X-Forwarded-For hop, else the peer"""
+        forwarded = self.headers.get('x-forwarded-for', '')
+        return forwarded.split(',')[-1].strip() or (self.client[0] if self.client else 'unknown')
+
+    def session(self):
+        if self._session is None:
+            cookie = SimpleCookie(self.headers.get('cookie', ''))
+            morsel = cookie.get(wsgi.SESSION_COOKIE)
+            session_id = (morsel.value if morsel else None) or self.headers.get('x-session-token')
+            self._session, self.new_session = wsgi.session_store.get_or_create(session_id)
+        return self._session
+
+
+async def read_body(receive) -> bytes:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise BadRequest('Client disconnected')
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > ASYNC_MAX_BODY_BYTES:
+            raise BadRequest(f'Request body too large (max {ASYNC_MAX_BODY_BYTES} bytes)', 413)
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def fetch_summary(youtube_url: str, output_format: str) -> dict:
+    """app.fetch_summary with the webhook call awaited"""
+    with wsgi.stage('webhook'):
+        response = await async_webhook.post_json(wsgi.WEBHOOK_URL, wsgi.webhook_payload(youtube_url, output_format))
+    return wsgi.parse_webhook_response(response, youtube_url, output_format)
+
+
+async def get_summary(youtube_url: str, video_id, output_format: str) -> dict:
+    """app.get_summary: cache, shared store, then one coalesced webhook call
+
+    Store reads and writes are SQLite calls that can block for up to the busy
+    timeout (e.g. during the sweeper's VACUUM), so they run in threads.
+    """
+    if video_id:
+        known = await asyncio.to_thread(wsgi.lookup_summary, video_id)
+        if known is not None:
+            return known
+
+    if not video_id:
+        return await fetch_summary(youtube_url, output_format)
+
+    async def fetch_and_store():
+        response_data = await fetch_summary(youtube_url, output_format)
+        return await asyncio.to_thread(wsgi.store_summary, video_id, response_data)
+
+    try:
+        return await async_single_flight.do(
+            video_id,
+            fetch_and_store,
+            lookup=wsgi.summary_store.get if wsgi.summary_store else None
+        )
+    except (wsgi.WebhookError, SingleFlightTimeout, requests.exceptions.RequestException) as e:
+        return await asyncio.to_thread(wsgi.stored_fallback, video_id, e)
+
+
+async def summarize(req: AsyncRequest):
+    data = req.json()
+    youtube_url = (data.get('url') or '').strip()
+    output_format = data.get('format', 'Summary')
+    job_mode = data.get('mode') == 'job' or req.args.get('mode') == 'job'
+
+    if not youtube_url:
+        return 200, {'success': False, 'error': 'Please enter a YouTube URL'}
+
+    video = parse_video_url(youtube_url)
+    if video is None:
+        return 200, {'success': False, 'error': 'Invalid YouTube URL'}
+    youtube_url, video_id = video.url, video.video_id
+
+    try:
+
+        if job_mode:
+            known = await asyncio.to_thread(wsgi.lookup_summary, video_id) if video_id else None
+            if known is None:
+                job = wsgi.job_manager.submit(wsgi.run_summary_job, youtube_url, video_id, output_format,
+                                              req.session())
+                return 202, {'success': True, **job.to_dict()}
+            response_data = known
+        else:
+            response_data = await get_summary(youtube_url, video_id, output_format)
+
+        # Formatting is CPU work (and may call the LLM for transcripts): keep it off the loop
+        return 200, await asyncio.to_thread(
+            wsgi.build_summary_response, video_id, output_format, response_data, req.session())
+
+    except QueueFullError as e:
+        return 503, {'success': False, 'error': str(e)}
+    except (wsgi.WebhookError, SingleFlightTimeout, requests.exceptions.RequestException) as e:
+        return 200, {'success': False, 'error': wsgi.summarize_error_message(e)}
+    except Exception as e:
+        log.exception('summarize failed')
+        return 200, {'success': False, 'error': wsgi.summarize_error_message(e)}
+
+
+async def chat_with_llm(user_message: str, session) -> str:
+    """app.chat_with_gemini with the LLM call awaited"""
+    if not wsgi.llm_router.backends:
+        return "❌ No LLM backend is configured (set GEMINI_API_KEY)."
+
+    first_turn = not session.chat_history
+    started = time.perf_counter()
+    try:
+        with wsgi.stage('retrieval'):
+            excerpts = await asyncio.to_thread(wsgi.retrieve_passages, session, user_message)
+        with wsgi.stage('llm'):
+            response_text = await wsgi.get_conversation(session).asend(user_message, excerpts)
+    except Exception as e:
+        wsgi.ERRORS.inc('chat', type(e).__name__)
+        return f"Error: {str(e)}"
+    wsgi.remember_answer(session, user_message, response_text, time.perf_counter() - started, first_turn)
+    wsgi.session_store.add_turn(session, user_message, response_text)
+    return response_text
+
+
+async def chat(req: AsyncRequest):
+    data = req.json()
+    user_message = (data.get('message') or '').strip()
+
+    if not user_message:
+        return 200, {'response': 'Please enter a message'}
+
+    session = req.session()
+    cached = wsgi.cached_answer(session, user_message)
+    if cached is not None:
+        return 200, {'response': cached, 'usage': None, 'cached': True}
+
+    response_text = await chat_with_llm(user_message, session)
+    conversation = session.conversation
+
+    return 200, {
+        'response': response_text,
+        'usage': conversation.last_usage if conversation else None,
+        'cached': False
+    }
+
+
+async def stats(req: AsyncRequest):
+    """The Flask /api/stats plus the async path's own client and single-flight"""
+    with wsgi.app.app_context():
+        body = wsgi.stats().get_json()
+    body['async'] = {
+        'webhook': async_webhook.stats(),
+        'single_flight': async_single_flight.stats(),
+        'wsgi_threads': ASYNC_WSGI_THREADS,
+    }
+    return 200, body
+
+
+# (method, path) -> (endpoint name, handler); endpoint names match the Flask
+# routes so admission control, metrics and logs treat both modes alike
+ROUTES = {
+    ('POST', '/api/summarize'): ('summarize', summarize),
+    ('POST', '/api/chat'): ('chat', chat),
+    ('GET', '/api/stats'): ('stats', stats),
+}
+
+
+async def handle(scope, receive, send, route: str, handler) -> None:
+    started = time.perf_counter()
+    headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+    rid = wsgi.new_request_id(headers.get('x-request-id', ''))
+    keep = random.random() < wsgi.LOG_SAMPLE_RATE
+    timings = {}
+    # Each ASGI request runs in its own task, so these don't leak between requests
+    request_id.set(rid)
+    sampled.set(keep)
+    stage_timings.set(timings)
+    wsgi.REQUESTS_IN_FLIGHT.inc(route)
+
+    req = None
+    extra_headers = []
+    try:
+        req = AsyncRequest(scope, await read_body(receive))
+        if req.body:
+            wsgi.REQUEST_BYTES.observe(len(req.body), route)
+        limits = wsgi.ADMISSION.get(route)
+        if limits is None:
+            status, body = await handler(req)
+        else:
+            rate_limiter, concurrency = limits
+            rate_limiter.check(req.client_key())
+            acquired_at = await concurrency.acquire_async()
+            try:
+                status, body = await handler(req)
+            finally:
+                concurrency.release(acquired_at)
+    except AdmissionRejected as e:
+        message = str(e)
+        status, body = e.status, {'success': False, 'error': message, 'response': f"❌ {message}"}
+        extra_headers.append((b'retry-after', str(e.retry_after).encode()))
+    except BadRequest as e:
+        status, body = e.status, {'success': False, 'error': str(e)}
+    except Exception:
+        log.exception('request failed')
+        status, body = 500, {'success': False, 'error': 'Internal server error'}
+
+    payload = wsgi.app.json.dumps(body).encode('utf-8')
+    response_headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(payload)).encode()),
+        (b'x-request-id', rid.encode()),
+        *extra_headers,
+    ]
+    if req is not None and req.new_session:
+        cookie = dump_cookie(wsgi.SESSION_COOKIE, req.session().id, max_age=int(wsgi.SESSION_IDLE_TTL),
+                             httponly=True, samesite='Lax')
+        response_headers.append((b'set-cookie', cookie.encode('latin-1')))
+        response_headers.append((b'x-session-token', req.session().id.encode()))
+    wsgi.RESPONSE_BYTES.observe(len(payload), route)
+    try:
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': payload})
+    finally:
+        wsgi.finish_request(started, route, scope['method'], scope['path'], status, rid, keep, timings)
+
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_webhook.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http':
+        route = ROUTES.get((scope['method'], scope['path']))
+        if route is not None:
+            return await handle(scope, receive, send, *route)
+    return await flask_app(scope, receive, send)
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+
+import aiohttp
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from http_client import RETRY_STATUSES, connect_failed
+from resilience import CircuitBreaker, Deadline, LatencyTracker
+
+
+class WebhookResponse:
+    """A fully read response with the parts of ``requests.Response`` the app uses"""
+
+    def __init__(self, status_code: int, reason: str, headers, content: bytes, url: str):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            raise requests.exceptions.HTTPError(f'{self.status_code} {kind} Error: {self.reason} for url: {self.url}')
+
+
+class AsyncWebhookClient:
+    """WebhookClient for the async server: one aiohttp connection pool shared by all requests
+
+    Retries, backoff, deadline, circuit breaker and hedging follow
+    ``http_client.WebhookClient``. Pass that client's breaker so both serving
+    paths in a process agree on whether n8n is up. Transport errors are
+    re-raised as the equivalent ``requests`` exceptions, so callers can
+    handle both clients the same way.
+    """
+
+    def __init__(self, pool_size: int = 100, connect_timeout: float = 5, read_timeout: float = 85,
+                 max_retries: int = 2, backoff_base: float = 0.5, backoff_max: float = 8,
+                 retry_statuses=RETRY_STATUSES, deadline: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None, hedge: bool = False,
+                 hedge_min_delay: float = 1.0, hedge_min_samples: int = 20):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.deadline = deadline or connect_timeout + read_timeout
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyTracker()
+        self._client = None
+        self.in_flight = 0
+        self.in_flight_max = 0
+        self.requests_sent = 0
+        self.retries = 0
+        self.retry_exhausted = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+
+    def _http(self) -> aiohttp.ClientSession:
+        # Created lazily so it binds to the event loop that serves requests
+        if self._client is None:
+            self._client = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _post(self, url: str, payload: dict, deadline: Deadline, connect: float,
+                    read: float) -> WebhookResponse:
+        connect, read = deadline.timeout(connect, read)
+        # Waiting for a pooled connection counts against the deadline too
+        timeout = aiohttp.ClientTimeout(total=deadline.remaining(), sock_connect=connect, sock_read=read)
+        started = time.monotonic()
+        self.in_flight += 1
+        self.in_flight_max = max(self.in_flight_max, self.in_flight)
+        try:
+            async with self._http().post(url, json=payload, timeout=timeout) as raw:
+                response = WebhookResponse(raw.status, raw.reason, raw.headers, await raw.read(), url)
+        except aiohttp.ConnectionTimeoutError as e:
+            raise requests.exceptions.ConnectTimeout(str(e) or 'Connect timed out') from e
+        except aiohttp.ClientConnectorError as e:
+            # Same shape as requests' error for a refused connection, so it is retried
+            raise requests.exceptions.ConnectionError(NewConnectionError(None, str(e))) from e
+        except (aiohttp.ServerTimeoutError, asyncio.TimeoutError) as e:
+            raise requests.exceptions.ReadTimeout(str(e) or 'Read timed out') from e
+        except aiohttp.ClientError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        finally:
+            self.in_flight -= 1
+        if response.status_code < 500:
+            self.latencies.add(time.monotonic() - started)
+        return response
+
+    async def _send(self, url: str, payload: dict, deadline: Deadline, connect: float,
+                    read: float) -> WebhookResponse:
+        """One attempt, hedged with a duplicate request if it runs past the p95 latency"""
+        if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return await self._post(url, payload, deadline, connect, read)
+        delay = max(self.hedge_min_delay, self.latencies.percentile(0.95))
+        if delay >= deadline.remaining():
+            return await self._post(url, payload, deadline, connect, read)
+
+        first = asyncio.ensure_future(self._post(url, payload, deadline, connect, read))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        self.requests_sent += 1
+        self.hedges_sent += 1
+        second = asyncio.ensure_future(self._post(url, payload, deadline, connect, read))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    if task is second:
+                        self.hedge_wins += 1
+                    return task.result()
+            raise error
+        finally:
+            # Unlike threads, the slower request can simply be cancelled
+            for task in pending:
+                task.cancel()
+
+    async def post_json(self, url: str, payload: dict, timeout=None,
+                        deadline: Optional[Deadline] = None) -> WebhookResponse:
+        """POST a JSON payload within a deadline, retrying transient failures"""
+        deadline = deadline or Deadline(self.deadline)
+        if self.breaker is None:
+            return await self._post_with_retries(url, payload, timeout, deadline)
+        self.breaker.allow()
+        failed = True
+        try:
+            response = await self._post_with_retries(url, payload, timeout, deadline)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.breaker.record(failed)
+
+    async def _post_with_retries(self, url: str, payload: dict, timeout, deadline: Deadline) -> WebhookResponse:
+        connect, read = timeout or (self.connect_timeout, self.read_timeout)
+        attempt = 0
+        while True:
+            self.requests_sent += 1
+            try:
+                response = await self._send(url, payload, deadline, connect, read)
+            except requests.exceptions.ConnectionError as e:
+                if not connect_failed(e):
+                    raise
+                if attempt >= self.max_retries:
+                    self.retry_exhausted += 1
+                    raise
+            else:
+                if response.status_code not in self.retry_statuses:
+                    return response
+                if attempt >= self.max_retries or deadline.remaining() <= 0:
+                    self.retry_exhausted += 1
+                    return response
+
+            self.retries += 1
+            await asyncio.sleep(min(self._backoff(attempt), deadline.remaining()))
+            attempt += 1
+
+    def stats(self) -> dict:
+        return {
+            'pool_size': self.pool_size,
+            'in_flight': self.in_flight,
+            'in_flight_max': self.in_flight_max,
+            'requests_sent': self.requests_sent,
+            'retries': self.retries,
+            'retry_exhausted': self.retry_exhausted,
+            'deadline_seconds': self.deadline,
+            'latency_p95_seconds': self.latencies.percentile(0.95),
+            'hedging': self.hedge,
+            'hedges_sent': self.hedges_sent,
+            'hedge_wins': self.hedge_wins,
+        }
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
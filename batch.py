@@ -0,0 +1,48 @@
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+
+def map_unordered(fn: Callable, items: Iterable, max_workers: int = 4,
+                  max_pending: Optional[int] = None,
+                  executor: Optional[Executor] = None) -> Iterator[Tuple[object, object, Optional[Exception]]]:
+    """Run fn over items on a bounded pool, yielding (item, result, error) as each completes
+
+    At most ``max_pending`` calls are submitted at a time, so memory stays
+    flat regardless of how many items there are. A failing call yields its
+    exception instead of aborting the rest. Closing the generator early
+    cancels everything not yet started.
+
+    Pass a shared ``executor`` to cap concurrency across callers; otherwise a
+    pool of ``max_workers`` threads is created for this call.
+    """
+    max_pending = max_pending or max_workers * 2
+    items = iter(items)
+    pending = {}
+    owned = executor is None
+    if owned:
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch')
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(fn, item)] = item
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                yield item, (None if error else future.result()), error
+    finally:
+        if owned:
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,103 @@
+"""Hit rate, false-hit rate and lookup cost of the chat answer cache by threshold
+
+Usage: python benchmarks/bench_answer_cache.py [--thresholds 0.75,0.8,0.85,0.9,0.95,1.0] [--llm-seconds 1.5]
+
+Questions come in groups that ask the same thing in different words
+("what is this video about", "summarize this for me"), plus groups about
+specific topics that differ in one word, some sharing every other word
+("what does the main speaker say about engines at the end" against
+"... batteries ..."). A few phrasings add a content word ("what is this
+engine video about"); the cache treats that as a different topic, so they
+miss. For each threshold, the first phrasing of every group is answered
+and stored; every other phrasing is then looked up. A hit returning its
+own group's answer is correct; one returning another group's answer is a
+false hit, i.e. a wrong reply. Time saved assumes every hit replaces an
+LLM call of ``--llm-seconds``.
+Lookup cost is measured with ``max_per_video`` answers stored for the video.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_cache import AnswerCache  # noqa: E402
+
+GROUPS = {
+    'summary': ['What is this video about?', 'summarize this for me', 'Give me a summary of the video',
+                "what's the gist", 'Can you give me an overview?', 'tldr?', 'recap the video please',
+                'what is the video about', 'Summarise it briefly'],
+    'key points': ['What are the key takeaways?', 'main points?', 'List the key points',
+                   'what are the highlights', 'most important lessons from the video'],
+    'speaker': ['Who is the speaker?', 'who is presenting', 'who is the host of the video',
+                'which channel made this'],
+    'conclusion': ['How does the video end?', 'what is the conclusion', 'how does it end'],
+}
+TOPICS = ['torque', 'fuel mixture', 'compression', 'turbochargers', 'spark plugs', 'oil changes']
+for topic in TOPICS:
+    GROUPS[topic] = [f'What does he say about {topic}?', f'what does the video say about {topic}',
+                     f'what is said about {topic}', f'Explain what he says about {topic}',
+                     f'what does he actually say about {topic} here', f'what did he mention regarding {topic}']
+for topic in ['engines', 'batteries']:
+    GROUPS[f'end of {topic}'] = [f'What does the main speaker say about {topic} at the end?',
+                                 f'what does the host say about {topic} in the conclusion']
+for topic in ['sleep', 'diet']:
+    GROUPS[f'{topic} takeaways'] = [f'What are the takeaways the host mentions about {topic}?',
+                                    f'key points the speaker mentions about {topic}']
+# Same question with an extra content word: a different topic, so these miss
+GROUPS['summary'] += ['what is this engine video about', 'give me the gist of this car video']
+GROUPS['key points'] += ['what are the key takeaways for beginners']
+
+
+def evaluate(threshold: float, llm_seconds: float) -> dict:
+    cache = AnswerCache(threshold=threshold)
+    for group, phrasings in GROUPS.items():
+        cache.put('video', phrasings[0], group, llm_seconds)
+    correct = false_hits = missed = 0
+    for group, phrasings in GROUPS.items():
+        for question in phrasings[1:]:
+            answer = cache.get('video', question)
+            if answer is None:
+                missed += 1
+            elif answer == group:
+                correct += 1
+            else:
+                false_hits += 1
+    lookups = correct + false_hits + missed
+    return {
+        'threshold': threshold,
+        'lookups': lookups,
+        'hit_rate': correct / lookups,
+        'false_hit_rate': false_hits / lookups,
+        'saved_seconds': cache.stats()['latency_saved_seconds'],
+        'skipped': cache.stats()['skipped'],
+    }
+
+
+def lookup_cost(repeat: int = 2000) -> float:
+    cache = AnswerCache()
+    for index in range(cache.max_per_video):
+        cache.put('video', f'what does he say about topic{index} and part{index}', 'answer', 1.0)
+    started = time.perf_counter()
+    for index in range(repeat):
+        cache.get('video', f'what does the video say about subject{index}')
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--thresholds', default='0.75,0.8,0.85,0.9,0.95,1.0')
+    parser.add_argument('--llm-seconds', type=float, default=1.5)
+    args = parser.parse_args()
+
+    print(f"{'threshold':>9} {'lookups':>8} {'hit rate':>9} {'false hits':>11} {'saved s':>8}")
+    for threshold in (float(v) for v in args.thresholds.split(',')):
+        result = evaluate(threshold, args.llm_seconds)
+        print(f"{threshold:>9.2f} {result['lookups']:>8} {result['hit_rate']:>9.1%} "
+              f"{result['false_hit_rate']:>11.1%} {result['saved_seconds']:>8.1f}")
+    print(f"\nlookup with {AnswerCache().max_per_video} answers stored: {lookup_cost() * 1e6:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""Sync (gunicorn gthread) vs async (uvicorn asgi:app) serving: concurrency ceiling and memory
+
+Usage: python benchmarks/bench_async.py [--levels 16,64,256] [--duration 10] [--n8n-latency 0.5]
+                                        [--sync gthread:1x8,gthread:1x64] [--async-workers 1] [--output PATH]
+
+Every request is a summarize call for a new video, so each one waits the
+full ``--n8n-latency`` on benchmarks/stub_n8n.py. That makes the number
+of requests a server holds in flight the only limit on throughput. For
+each client concurrency level, both servers are started fresh and loaded
+for ``--duration`` seconds. The report shows requests per second,
+p50/p99 latency, errors, and the peak RSS and thread count of the whole
+server process tree.
+
+A gthread server can hold workers x threads requests at once; the rest
+queue in its accept backlog. More threads raise that ceiling at a cost in
+memory and context switches; the async server holds every request as a
+coroutine. Results are written as JSON next to bench_load.py's.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+
+from bench_load import (ROOT, children, free_port, git_revision, parse_config, pct,  # noqa: E402
+                        server_env, start_server, stop_server, wait_ready)
+from stub_n8n import StubConfig, start  # noqa: E402
+
+
+def proc_status(pid: int) -> dict:
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'Threads'):
+                    values[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+class TreeSampler:
+    """Peak total RSS and thread count of a server process and its workers"""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = threads = 0
+            for pid in [self.pid] + children(self.pid):
+                status = proc_status(pid)
+                rss += status.get('VmRSS', 0)
+                threads += status.get('Threads', 0)
+            self.peak_rss_mb = max(self.peak_rss_mb, rss / 1024)
+            self.peak_threads = max(self.peak_threads, threads)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def start_async_server(workers: int, port: int, env: dict, log) -> subprocess.Popen:
+    command = [
+        sys.executable, '-m', 'uvicorn', 'asgi:app',
+        '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers),
+        '--log-level', 'warning',
+    ]
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                            stderr=log, start_new_session=True)
+
+
+def drive(base: str, concurrency: int, duration: float, prefix: str) -> dict:
+    stop_at = time.monotonic() + duration
+    lock = threading.Lock()
+    latencies = []
+    errors = [0]
+    counter = [0]
+
+    def user(index):
+        http = requests.Session()
+        while time.monotonic() < stop_at:
+            with lock:
+                counter[0] += 1
+                number = counter[0]
+            url = f'https://www.youtube.com/watch?v={prefix}{number:0{11 - len(prefix)}d}'
+            started = time.perf_counter()
+            try:
+                response = http.post(f'{base}/api/summarize', json={'url': url}, timeout=120)
+                ok = response.ok and response.json().get('success', False)
+            except (requests.RequestException, ValueError):
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += not ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(user, range(concurrency)))
+    wall = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / wall, 1),
+        'errors': errors[0],
+        'p50_ms': pct(latencies, 0.50),
+        'p99_ms': pct(latencies, 0.99),
+    }
+
+
+def run(mode: str, sync_config: str, level: int, args, stub_url: str) -> dict:
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp, open(os.path.join(tmp, 'server.log'), 'w') as log:
+        env = server_env(args, stub_url, os.path.join(tmp, 'summaries.db'))
+        env['WEBHOOK_POOL_SIZE'] = env['ASYNC_WEBHOOK_POOL_SIZE'] = str(max(10, level))
+        if mode == 'sync':
+            server = start_server(parse_config(sync_config), port, env, log)
+        else:
+            server = start_async_server(args.async_workers, port, env, log)
+        try:
+            wait_ready(base, server, log.name)
+            time.sleep(1)
+            with TreeSampler(server.pid) as sampler:
+                result = drive(base, level, args.duration, f'{mode[0]}{level:x}')
+        finally:
+            stop_server(server)
+    label = f'sync {sync_config}' if mode == 'sync' else f'async uvicorn:{args.async_workers}'
+    return {
+        'mode': mode,
+        'server': label,
+        'concurrency': level,
+        **result,
+        'peak_rss_mb': round(sampler.peak_rss_mb, 1),
+        'peak_threads': sampler.peak_threads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--levels', default='16,64,256', help='comma-separated client concurrency levels')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--n8n-latency', type=float, default=0.5)
+    parser.add_argument('--sync', default='gthread:1x8,gthread:1x64',
+                        help='comma-separated gunicorn worker_class:workers[xthreads]')
+    parser.add_argument('--async-workers', type=int, default=1)
+    parser.add_argument('--output', help='results file (default benchmarks/results/async-<revision>.json)')
+    args = parser.parse_args()
+    # server_env reads these bench_load options
+    args.llm, args.concurrency = 'fake:0.05', max(int(v) for v in args.levels.split(','))
+
+    StubConfig.latency = args.n8n_latency
+    stub = start()
+    stub_url = f'http://127.0.0.1:{stub.server_port}/'
+
+    results = []
+    print(f"{'server':<24} {'clients':>7} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} "
+          f"{'RSS MB':>7} {'threads':>7}")
+    servers = [('sync', config) for config in args.sync.split(',')] + [('async', None)]
+    for level in (int(v) for v in args.levels.split(',')):
+        for mode, sync_config in servers:
+            result = run(mode, sync_config, level, args, stub_url)
+            results.append(result)
+            print(f"{result['server']:<24} {level:>7} {result['rps']:>7.1f} {result['p50_ms'] or 0:>8.0f} "
+                  f"{result['p99_ms'] or 0:>8.0f} {result['errors']:>7} {result['peak_rss_mb']:>7.1f} "
+                  f"{result['peak_threads']:>7}")
+
+    revision = git_revision()
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f'async-{revision}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'revision': revision, 'params': {k: v for k, v in vars(args).items() if k != 'output'},
+                   'results': results}, f, indent=2)
+    print(f"\nresults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
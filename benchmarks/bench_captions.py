@@ -0,0 +1,81 @@
+"""Parse time and memory of caption ingestion for long SRT, WebVTT and json3 files
+
+Usage: python benchmarks/bench_captions.py
+
+Writes synthetic caption files (one cue every 3 seconds, rolling duplicates
+as in auto-captions) to a temporary directory and parses each with
+captions.parse_captions. Peak is the tracemalloc peak during parsing; store
+is the size of the resulting segment arrays and text buffer.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from captions import parse_captions  # noqa: E402
+
+WORDS = ('so today we are going to look at how the engine works and why '
+         'the fuel mixture matters for torque at low speed').split()
+
+
+def stamp(seconds, separator):
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{separator}{ms:03d}"
+
+
+def cues(hours, seed=0):
+    rng = random.Random(seed)
+    line = ''
+    for index in range(int(hours * 3600 / 3)):
+        if index % 4:
+            line = ' '.join(rng.choice(WORDS) for _ in range(8))
+        yield index * 3.0, index * 3.0 + 3.0, line
+
+
+def write_srt(path, hours):
+    with open(path, 'w') as f:
+        for index, (start, end, text) in enumerate(cues(hours), 1):
+            f.write(f"{index}\n{stamp(start, ',')} --> {stamp(end, ',')}\n{text}\n\n")
+
+
+def write_vtt(path, hours):
+    with open(path, 'w') as f:
+        f.write("WEBVTT\n\n")
+        for start, end, text in cues(hours):
+            f.write(f"{stamp(start, '.')} --> {stamp(end, '.')} align:start\n<c>{text}</c>\n\n")
+
+
+def write_json3(path, hours):
+    events = [{'tStartMs': int(start * 1000), 'dDurationMs': 3000, 'segs': [{'utf8': text}]}
+              for start, _, text in cues(hours)]
+    with open(path, 'w') as f:
+        json.dump({'wireMagic': 'pb3', 'events': events}, f)
+
+
+def main():
+    print(f"{'format':<7} {'hours':>6} {'cues':>7} {'file MiB':>9} {'parse ms':>9} {'peak KiB':>9} {'store KiB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for hours in (1, 4, 12):
+            for extension, writer in (('srt', write_srt), ('vtt', write_vtt), ('json3', write_json3)):
+                path = os.path.join(directory, f"{hours}h.{extension}")
+                writer(path, hours)
+                tracemalloc.start()
+                start = time.perf_counter()
+                segments = parse_captions(path)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{extension:<7} {hours:>6} {len(segments):>7} {os.path.getsize(path) / 2 ** 20:>9.1f} "
+                      f"{elapsed * 1000:>9.1f} {peak / 1024:>9.0f} {segments.nbytes / 1024:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
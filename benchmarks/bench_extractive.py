@@ -0,0 +1,85 @@
+"""Latency and quality of the local extractive summarizer vs the old '.' splitter
+
+Usage: python benchmarks/bench_extractive.py
+
+Quality is ROUGE-1 recall of the top five key points against the reference
+summaries in benchmarks/data/descriptions.json, plus the number of key points
+that are channel boilerplate (links, calls to subscribe). Latency is measured
+on the corpus and on synthetic documents of increasing length.
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractive import NOISE_RE, URL_RE, extract_key_points  # noqa: E402
+from retrieval import tokenize  # noqa: E402
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'descriptions.json')
+
+
+def split_key_points(text, count=5):
+    """The previous Key Points behaviour: first five '.'-separated fragments"""
+    return [s.strip() + '.' for s in text.split('.')[:count] if s.strip()]
+
+
+def rouge1_recall(candidate, reference):
+    ref = tokenize(reference)
+    cand = set(tokenize(candidate))
+    return sum(1 for t in ref if t in cand) / len(ref) if ref else 0.0
+
+
+def noise(points):
+    return sum(1 for p in points if NOISE_RE.search(p) or URL_RE.search(p))
+
+
+def timed(fn, *args, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def synthetic(corpus, sentences):
+    pool = [s.strip() + '.' for doc in corpus for s in doc['text'].split('.') if len(s.split()) > 3]
+    rng = random.Random(sentences)
+    return ' '.join(rng.choice(pool) for _ in range(sentences))
+
+
+def main():
+    with open(DATA) as f:
+        corpus = json.load(f)
+
+    print(f"{'document':<10} {'split R1':>9} {'rank R1':>9} {'split noise':>12} {'rank noise':>11} "
+          f"{'split ms':>9} {'rank ms':>9}")
+    split_scores, rank_scores = [], []
+    split_noise = rank_noise = 0
+    for doc in corpus:
+        split_points = split_key_points(doc['text'])
+        rank_points = extract_key_points(doc['text'])
+        split_r = rouge1_recall(' '.join(split_points), doc['reference'])
+        rank_r = rouge1_recall(' '.join(rank_points), doc['reference'])
+        split_scores.append(split_r)
+        rank_scores.append(rank_r)
+        split_noise += noise(split_points)
+        rank_noise += noise(rank_points)
+        print(f"{doc['id']:<10} {split_r:>9.3f} {rank_r:>9.3f} {noise(split_points):>12} {noise(rank_points):>11} "
+              f"{timed(split_key_points, doc['text']):>9.3f} {timed(extract_key_points, doc['text']):>9.3f}")
+    print(f"{'mean/total':<10} {statistics.mean(split_scores):>9.3f} {statistics.mean(rank_scores):>9.3f} "
+          f"{split_noise:>12} {rank_noise:>11}")
+
+    print()
+    print(f"{'sentences':>10} {'rank ms':>10}")
+    for size in (50, 200, 1000, 5000):
+        text = synthetic(corpus, size)
+        print(f"{size:>10} {timed(extract_key_points, text, repeat=3):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Latency-aware routing across LLM backends, measured offline with fake providers
+
+Usage: python benchmarks/bench_llm_router.py
+
+Three fake backends (fast but flaky, medium, slow) serve 400 requests from 16
+threads. Routing by EWMA latency with failover is compared with always
+using one backend and with picking a backend at random. Mid-run the fast
+backend degrades (latency x10) to show the router moving traffic away.
+"""
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_router import FakeProvider, LLMRouter  # noqa: E402
+
+REQUESTS = 400
+THREADS = 16
+
+
+def backends():
+    return [
+        FakeProvider('fast', latency=0.02, tokens_per_second=800, error_rate=0.05, max_concurrency=8, seed=1),
+        FakeProvider('medium', latency=0.08, tokens_per_second=400, max_concurrency=8, seed=2),
+        FakeProvider('slow', latency=0.25, tokens_per_second=150, max_concurrency=16, seed=3),
+    ]
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def run(label, call, degrade=None):
+    def one(index):
+        if degrade and index == REQUESTS // 2:
+            degrade()
+        started = time.perf_counter()
+        try:
+            call('Summarize the main argument of this video in two sentences.')
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(one, range(REQUESTS)))
+    wall = time.perf_counter() - started
+    latencies = [t for t, _ in results]
+    errors = sum(1 for _, ok in results if not ok)
+    print(f"{label:<22} {REQUESTS / wall:>7.1f} {pct(latencies, 0.5) * 1000:>7.0f} "
+          f"{pct(latencies, 0.95) * 1000:>7.0f} {pct(latencies, 0.99) * 1000:>7.0f} {errors:>7}")
+
+
+def main():
+    print(f"{'strategy':<22} {'req/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'errors':>7}")
+    for degraded in (False, True):
+        suffix = ' (fast degrades)' if degraded else ''
+        for name in ('fast only', 'random', 'router'):
+            pool = backends()
+            fast = pool[0]
+
+            def degrade():
+                fast.latency *= 10
+
+            if name == 'fast only':
+                call = fast.generate
+            elif name == 'random':
+                rng = random.Random(0)
+                call = lambda prompt: rng.choice(pool).generate(prompt)  # noqa: E731
+            else:
+                router = LLMRouter(pool)
+                call = router.generate
+            run(name + suffix, call, degrade if degraded else None)
+            if name == 'router':
+                print('  ' + ', '.join(f"{backend}: {s['calls']} calls, {s['failures']} failed"
+                                       for backend, s in router.stats()['backends'].items())
+                      + f", {router.failovers} failovers")
+
+
+if __name__ == '__main__':
+    main()
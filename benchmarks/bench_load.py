@@ -0,0 +1,420 @@
+"""Load test of the real app under gunicorn, with local stand-ins for n8n and Gemini
+
+Usage: python benchmarks/bench_load.py [--configs gthread:1x8,gthread:2x8,sync:4]
+                                       [--duration 15] [--concurrency 16] [--videos 200]
+                                       [--chat-share 0.2] [--n8n-latency 0.3] [--n8n-jitter 0.5]
+                                       [--n8n-tail 0.02:3] [--n8n-error-rate 0] [--n8n-payload-bytes 4096]
+                                       [--llm fake:0.4~0.5:0:120] [--output PATH] [--baseline PATH]
+
+Each config is ``worker_class:workers[xthreads]``. For every config a fresh
+gunicorn serving app:app is started with an empty summary store. It talks to
+benchmarks/stub_n8n.py, served by this process, and to the app's fake LLM
+backend (``LLM_BACKENDS=fake:...``, see build_llm_backends in app.py).
+``--concurrency`` client threads then send requests back to back for
+``--duration`` seconds. Each request is a POST /api/summarize for a video
+drawn from a skewed popularity distribution over ``--videos`` IDs, or, with
+probability ``--chat-share``, a POST /api/chat.
+
+For each config it reports:
+
+* requests per second and error count
+* p50/p95/p99 latency per endpoint
+* peak RSS per gunicorn worker, sampled from /proc
+* the share of summarize requests answered without calling n8n (cache,
+  shared store or single-flight), worked out from the stub's request count
+
+Rate limits and concurrency limits are lifted, so this measures the app
+rather than its load shedding. Results go to a JSON file named after the
+current commit. ``--baseline`` prints the change from an earlier results
+file. The client runs in this process; past a few thousand requests per
+second it becomes the bottleneck.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+
+from stub_n8n import StubConfig, start  # noqa: E402
+
+CHAT_MESSAGES = [
+    'What is the main argument of the video?',
+    'Summarize the second half in two sentences.',
+    'Which examples does the speaker use?',
+    'Is there anything controversial in it?',
+]
+
+
+def parse_config(spec: str) -> dict:
+    worker_class, _, size = spec.partition(':')
+    workers, _, threads = (size or '1').partition('x')
+    return {'worker_class': worker_class, 'workers': int(workers), 'threads': int(threads or 1)}
+
+
+def config_label(config: dict) -> str:
+    label = f"{config['worker_class']}:{config['workers']}"
+    return label + (f"x{config['threads']}" if config['threads'] > 1 else '')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def video_id(index: int) -> str:
+    return f'load{index:07d}'
+
+
+def pick_video(rng: random.Random, videos: int) -> int:
+    """Log-uniform popularity: a few videos get most of the traffic"""
+    return int(videos ** rng.random()) - 1
+
+
+def pct(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1)
+
+
+def latency_summary(samples: list) -> dict:
+    return {
+        'count': len(samples),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 1) if samples else None,
+        'p50_ms': pct(samples, 0.50),
+        'p95_ms': pct(samples, 0.95),
+        'p99_ms': pct(samples, 0.99),
+    }
+
+
+def children(pid: int) -> list:
+    """PIDs whose parent is pid (gunicorn workers of a master)"""
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields resume after ')'
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            found.append(int(entry))
+    return found
+
+
+def rss_mb(pid: int):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class MemorySampler:
+    """Peak RSS of each gunicorn worker, polled in the background"""
+
+    def __init__(self, master_pid: int, interval: float = 0.5):
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peaks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def sample(self):
+        for pid in children(self.master_pid):
+            rss = rss_mb(pid)
+            if rss is not None:
+                self.peaks[pid] = max(self.peaks.get(pid, 0), rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def summary(self) -> dict:
+        peaks = sorted(self.peaks.values())
+        return {
+            'workers_seen': len(peaks),
+            'per_worker_peak_mb': [round(value, 1) for value in peaks],
+            'max_worker_mb': round(max(peaks), 1) if peaks else None,
+            'total_mb': round(sum(peaks), 1),
+        }
+
+
+def server_env(args, stub_url: str, db_path: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        'WEBHOOK_URL': stub_url,
+        'LLM_BACKENDS': args.llm,
+        'MAP_REDUCE_BACKEND': 'off',
+        'SUMMARY_DB_PATH': db_path,
+        'SUMMARIZE_RATE': '0',
+        'CHAT_RATE': '0',
+        'SUMMARIZE_CONCURRENCY': '10000',
+        'SUMMARIZE_QUEUE': '10000',
+        'CHAT_CONCURRENCY': '10000',
+        'CHAT_QUEUE': '10000',
+        'WEBHOOK_POOL_SIZE': str(max(10, args.concurrency)),
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    env.pop('GEMINI_API_KEY', None)
+    env.pop('GROQ_API_KEY', None)
+    return env
+
+
+def start_server(config: dict, port: int, env: dict, log) -> subprocess.Popen:
+    command = [
+        sys.executable, '-m', 'gunicorn', 'app:app',
+        '--bind', f'127.0.0.1:{port}',
+        '--worker-class', config['worker_class'],
+        '--workers', str(config['workers']),
+        '--threads', str(config['threads']),
+        '--timeout', '120',
+        '--log-level', 'warning',
+    ]
+    # App logs go to stdout and are discarded; gunicorn's own errors go to log
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                            stderr=log, start_new_session=True)
+
+
+def wait_ready(base: str, server: subprocess.Popen, log_path: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            with open(log_path, errors='replace') as f:
+                raise RuntimeError(f'gunicorn exited: {f.read()[-2000:]}')
+        try:
+            if requests.get(f'{base}/healthz', timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    if server.poll() is not None:
+        return
+    os.killpg(server.pid, signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+
+def drive(base: str, args, seed: int) -> dict:
+    """Closed-loop load for args.duration seconds; per-endpoint latencies and errors"""
+    stop_at = time.monotonic() + args.duration
+    lock = threading.Lock()
+    latencies = {'summarize': [], 'chat': []}
+    errors = {'summarize': 0, 'chat': 0}
+
+    def user(index):
+        rng = random.Random(seed * 1000 + index)
+        http = requests.Session()
+        while time.monotonic() < stop_at:
+            if rng.random() < args.chat_share:
+                endpoint = 'chat'
+                call = lambda: http.post(f'{base}/api/chat', json={'message': rng.choice(CHAT_MESSAGES)},
+                                         timeout=120)
+            else:
+                endpoint = 'summarize'
+                url = f'https://www.youtube.com/watch?v={video_id(pick_video(rng, args.videos))}'
+                call = lambda: http.post(f'{base}/api/summarize', json={'url': url, 'format': 'Summary'},
+                                         timeout=120)
+            started = time.perf_counter()
+            try:
+                response = call()
+                body = response.json()
+                ok = response.ok and body.get('success', True) is not False \
+                    and not str(body.get('response', '')).startswith(('Error', '❌'))
+            except (requests.RequestException, ValueError):
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[endpoint].append(elapsed)
+                errors[endpoint] += not ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(user, range(args.concurrency)))
+    wall = time.perf_counter() - started
+    return {'wall': wall, 'latencies': latencies, 'errors': errors}
+
+
+def run_config(config: dict, args, stub_url: str, seed: int) -> dict:
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp, open(os.path.join(tmp, 'gunicorn.log'), 'w') as log:
+        server = start_server(config, port, server_env(args, stub_url, os.path.join(tmp, 'summaries.db')), log)
+        try:
+            wait_ready(base, server, log.name)
+            # Give the other workers time to boot before the clock starts
+            time.sleep(1 + 0.2 * config['workers'])
+            with StubConfig.lock:
+                webhook_before = StubConfig.requests
+            with MemorySampler(server.pid) as memory:
+                load = drive(base, args, seed)
+            with StubConfig.lock:
+                webhook_calls = StubConfig.requests - webhook_before
+        finally:
+            stop_server(server)
+
+    latencies = load['latencies']
+    total = sum(len(samples) for samples in latencies.values())
+    summarize_count = len(latencies['summarize'])
+    return {
+        'config': config_label(config),
+        **config,
+        'requests': total,
+        'rps': round(total / load['wall'], 1),
+        'errors': load['errors'],
+        'latency': {
+            'all': latency_summary(latencies['summarize'] + latencies['chat']),
+            'summarize': latency_summary(latencies['summarize']),
+            'chat': latency_summary(latencies['chat']),
+        },
+        'memory': memory.summary(),
+        'cache': {
+            'summarize_requests': summarize_count,
+            'webhook_calls': webhook_calls,
+            'hit_rate': round(max(0.0, 1 - webhook_calls / summarize_count), 4) if summarize_count else None,
+        },
+    }
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'diff', '--quiet', 'HEAD', '--'], cwd=ROOT).returncode != 0
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_table(results: list) -> None:
+    print(f"{'config':<14} {'req/s':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'chat p95':>9} {'max RSS':>8} {'hit rate':>9}")
+    for result in results:
+        latency = result['latency']
+        hit_rate = result['cache']['hit_rate']
+        print(f"{result['config']:<14} {result['rps']:>7.1f} {sum(result['errors'].values()):>7} "
+              f"{latency['all']['p50_ms'] or 0:>8.1f} {latency['all']['p95_ms'] or 0:>8.1f} "
+              f"{latency['all']['p99_ms'] or 0:>8.1f} {latency['chat']['p95_ms'] or 0:>9.1f} "
+              f"{result['memory']['max_worker_mb'] or 0:>6.1f}MB "
+              f"{hit_rate * 100 if hit_rate is not None else 0:>8.1f}%")
+
+
+def change(new, old) -> str:
+    if new is None or not old:
+        return 'n/a'
+    return f'{(new - old) / old * 100:+.1f}%'
+
+
+def compare(results: list, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {result['config']: result for result in baseline['results']}
+    print(f"\nchange vs {baseline.get('revision', baseline_path)}")
+    print(f"{'config':<14} {'req/s':>9} {'p95':>9} {'p99':>9} {'max RSS':>9}")
+    for result in results:
+        old = previous.get(result['config'])
+        if old is None:
+            print(f"{result['config']:<14} {'(not in baseline)':>9}")
+            continue
+        print(f"{result['config']:<14} {change(result['rps'], old['rps']):>9} "
+              f"{change(result['latency']['all']['p95_ms'], old['latency']['all']['p95_ms']):>9} "
+              f"{change(result['latency']['all']['p99_ms'], old['latency']['all']['p99_ms']):>9} "
+              f"{change(result['memory']['max_worker_mb'], old['memory']['max_worker_mb']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--configs', default='gthread:1x8,gthread:2x8,sync:4',
+                        help='comma-separated worker_class:workers[xthreads]')
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--videos', type=int, default=200)
+    parser.add_argument('--chat-share', type=float, default=0.2)
+    parser.add_argument('--n8n-latency', type=float, default=0.3)
+    parser.add_argument('--n8n-jitter', type=float, default=0.5, help='log-normal sigma')
+    parser.add_argument('--n8n-tail', default='0.02:3', help='fraction:seconds of slow requests')
+    parser.add_argument('--n8n-error-rate', type=float, default=0.0)
+    parser.add_argument('--n8n-payload-bytes', type=int, default=4096)
+    parser.add_argument('--llm', default='fake:0.4~0.5:0:120',
+                        help='LLM_BACKENDS for the server, e.g. fake:<latency>~<jitter>:<error rate>:<tokens>')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='results file (default benchmarks/results/load-<revision>.json)')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    StubConfig.latency = args.n8n_latency
+    StubConfig.jitter = args.n8n_jitter
+    StubConfig.tail_rate, StubConfig.tail_seconds = (float(v) for v in args.n8n_tail.split(':'))
+    StubConfig.error_rate = args.n8n_error_rate
+    StubConfig.payload_bytes = args.n8n_payload_bytes
+    random.seed(args.seed)
+    stub = start()
+    stub_url = f'http://127.0.0.1:{stub.server_port}/'
+
+    results = []
+    for spec in filter(None, (part.strip() for part in args.configs.split(','))):
+        config = parse_config(spec)
+        print(f"running {config_label(config)} for {args.duration:g}s ...", file=sys.stderr)
+        try:
+            results.append(run_config(config, args, stub_url, args.seed))
+        except RuntimeError as e:
+            print(f"  skipped: {e}", file=sys.stderr)
+
+    revision = git_revision()
+    report = {
+        'revision': revision,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'results': results,
+    }
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f'load-{revision}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_table(results)
+    print(f"\nresults written to {output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
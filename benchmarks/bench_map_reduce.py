@@ -0,0 +1,44 @@
+"""Wall time and LLM calls of map-reduce transcript summarization
+
+Usage: python benchmarks/bench_map_reduce.py
+
+Uses the deterministic FakeBackend with a fixed per-call latency standing in
+for the model, so the numbers show the effect of the pool size and of the
+chunk cache rather than of any real model. Each transcript is summarized
+cold, again unchanged, and again after inserting one sentence in the middle.
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from map_reduce import FakeBackend, MapReduceSummarizer  # noqa: E402
+
+WORDS = ('engine fuel mixture torque speed piston gear rocket orbit moon star bread flour '
+         'yeast oven we look at how why it works and then the of to').split()
+LATENCY = 0.05
+
+
+def transcript(sentences, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + '.'
+            for _ in range(sentences)]
+
+
+def main():
+    print(f"{'sentences':>9} {'workers':>7} {'run':<9} {'chunks':>6} {'levels':>6} {'llm calls':>9} "
+          f"{'cached':>6} {'ms':>8}")
+    for sentences in (2000, 10000):
+        for workers in (1, 8):
+            summarizer = MapReduceSummarizer(FakeBackend(latency=LATENCY), max_workers=workers)
+            text = transcript(sentences)
+            edited = text[:sentences // 2] + ['A new sentence about something else entirely.'] + text[sentences // 2:]
+            for label, body in (('cold', text), ('repeat', text), ('edited', edited)):
+                result = summarizer.summarize(' '.join(body))
+                print(f"{sentences:>9} {workers:>7} {label:<9} {result['chunks']:>6} {result['reduce_levels']:>6} "
+                      f"{result['llm_calls']:>9} {result['cached_calls']:>6} {result['elapsed_ms']:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Overhead of the /metrics instrumentation
+
+Usage: python benchmarks/bench_metrics.py
+
+1. Cost per Histogram.observe with per-thread shards, against a single
+   lock-protected histogram and against doing nothing, from 1 and 8 threads.
+2. Cost per request of the metrics hooks: requests to /healthz through the
+   Flask test client with METRICS_ENABLED=1 and 0 (each in a fresh process).
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from metrics import LATENCY_BUCKETS, Registry  # noqa: E402
+
+OPS = 200_000
+
+
+class LockedHistogram:
+    """Baseline: one shared histogram guarded by a lock"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+            self.total += value
+
+
+class NoopHistogram:
+    def observe(self, value, *labels):
+        pass
+
+
+def hammer(histogram, threads):
+    per_thread = OPS // threads
+
+    def work():
+        observe = histogram.observe
+        for i in range(per_thread):
+            observe((i % 1000) / 1000, 'summarize')
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - started) / (per_thread * threads) * 1e9
+
+
+def requests_per_second(enabled):
+    code = (
+        "import time, app\n"
+        "c = app.app.test_client()\n"
+        "for _ in range(200): c.get('/healthz', buffered=True)\n"
+        "n = 3000\n"
+        "t = time.perf_counter()\n"
+        "for _ in range(n): c.get('/healthz', buffered=True)\n"
+        "print((time.perf_counter() - t) / n * 1e6)\n"
+    )
+    env = dict(os.environ, METRICS_ENABLED='1' if enabled else '0', SUMMARY_DB_PATH='')
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'histogram':<12} {'threads':>7} {'ns/observe':>11}")
+    for threads in (1, 8):
+        registry = Registry()
+        candidates = (
+            ('noop', NoopHistogram()),
+            ('locked', LockedHistogram()),
+            ('per-thread', registry.histogram('bench_seconds', 'bench', ('route',))),
+        )
+        for name, histogram in candidates:
+            print(f"{name:<12} {threads:>7} {hammer(histogram, threads):>11.0f}")
+        totals = registry.collect()
+        assert sum(sum(v[:-1]) for v in totals.values()) == OPS // threads * threads
+
+    print()
+    off, on = requests_per_second(False), requests_per_second(True)
+    print(f"/healthz via test client: {off:.1f} us/request without metrics, {on:.1f} us with "
+          f"({on - off:+.1f} us, {(on - off) / off * 100:+.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Webhook client behaviour under a degraded n8n: breaker, deadline and hedging
+
+Usage: python benchmarks/bench_resilience.py
+
+Runs against benchmarks/stub_n8n.py in-process:
+
+* outage: n8n hangs on every request. Without a breaker each call holds its
+  thread for the whole deadline; with one, calls fail fast after the trip.
+* tail: 5% of requests take 1.5 s extra. Hedging after the p95 latency cuts
+  the tail at the cost of a few duplicate requests.
+"""
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+
+from http_client import WebhookClient  # noqa: E402
+from resilience import CircuitBreaker  # noqa: E402
+from stub_n8n import StubConfig, start  # noqa: E402
+
+
+def call(client, url):
+    started = time.perf_counter()
+    try:
+        client.post_json(url, {'youtubeUrl': 'https://youtu.be/dQw4w9WgXcQ'}).close()
+        ok = True
+    except requests.exceptions.RequestException:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run(client, url, calls, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lambda _: call(client, url), range(calls)))
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def outage(url):
+    print('outage (every request hangs), deadline 1 s, 40 calls, 4 threads')
+    print(f"{'breaker':<8} {'wall s':>7} {'mean ms':>8} {'failed':>7} {'sent':>5} {'trips':>6}")
+    StubConfig.hang_rate = 1.0
+    for use_breaker in (False, True):
+        breaker = CircuitBreaker(min_calls=4, open_seconds=60) if use_breaker else None
+        client = WebhookClient(deadline=1.0, max_retries=0, breaker=breaker)
+        started = time.perf_counter()
+        results = run(client, url, 40, 4)
+        wall = time.perf_counter() - started
+        print(f"{str(use_breaker):<8} {wall:>7.2f} {statistics.mean(t for t, _ in results) * 1000:>8.0f} "
+              f"{sum(1 for _, ok in results if not ok):>7} {client.requests_sent:>5} "
+              f"{breaker.trips if breaker else 0:>6}")
+    StubConfig.hang_rate = 0.0
+
+
+def tail(url):
+    print('\nlong tail (5% of requests +1.5 s), 400 calls, 8 threads')
+    print(f"{'hedge':<6} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7} {'hedges':>7} {'wins':>5}")
+    StubConfig.latency, StubConfig.tail_rate, StubConfig.tail_seconds = 0.02, 0.05, 1.5
+    for hedge in (False, True):
+        client = WebhookClient(pool_size=16, hedge=hedge, hedge_min_delay=0.05, hedge_min_samples=20)
+        run(client, url, 40, 8)  # warm up the latency window
+        latencies = [t for t, _ in run(client, url, 400, 8)]
+        print(f"{str(hedge):<6} {pct(latencies, 0.5) * 1000:>7.0f} {pct(latencies, 0.95) * 1000:>7.0f} "
+              f"{pct(latencies, 0.99) * 1000:>7.0f} {max(latencies) * 1000:>7.0f} "
+              f"{client.hedges_sent:>7} {client.hedge_wins:>5}")
+
+
+def main():
+    server = start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    outage(url)
+    tail(url)
+
+
+if __name__ == '__main__':
+    main()
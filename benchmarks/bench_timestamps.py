@@ -0,0 +1,83 @@
+"""Throughput, peak memory and boundary accuracy of transcript segmentation
+
+Usage: python benchmarks/bench_timestamps.py
+
+Synthetic transcripts switch topic every few minutes; segments are generated
+lazily so peak memory reflects the segmenter, not the input. A true topic
+change counts as found if a chapter starts within 60 seconds of it.
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timestamps import parse_chapter_markers, segment_transcript  # noqa: E402
+
+TOPICS = [
+    'guitar chord string fret strum tuning pick amp riff melody',
+    'bread flour yeast oven dough knead crust bake rise loaf',
+    'python function loop variable list class module import error test',
+    'planet orbit star galaxy telescope gravity comet moon nebula light',
+    'engine piston fuel torque gear clutch exhaust brake tire wheel',
+    'stock market bond interest inflation dividend portfolio risk index fund',
+]
+FILLER = 'the a and then so we you it is that this of to in'.split()
+
+
+def synthetic_transcript(hours, seed=0, segment_seconds=3.0):
+    """Yield (start, end, text) segments and record the true topic changes"""
+    rng = random.Random(seed)
+    boundaries = []
+    t = 0.0
+    end = hours * 3600
+    topic = 0
+
+    def segments():
+        nonlocal t, topic
+        next_change = rng.uniform(240, 600)
+        while t < end:
+            if t >= next_change:
+                topic = (topic + rng.randint(1, len(TOPICS) - 1)) % len(TOPICS)
+                boundaries.append(t)
+                next_change = t + rng.uniform(240, 600)
+            vocab = TOPICS[topic].split()
+            words = [rng.choice(vocab) if rng.random() < 0.4 else rng.choice(FILLER) for _ in range(9)]
+            yield t, t + segment_seconds, ' '.join(words)
+            t += segment_seconds
+
+    return segments(), boundaries
+
+
+def recall(found, truth, tolerance=60):
+    starts = [c['seconds'] for c in found]
+    hits = sum(1 for b in truth if any(abs(b - s) <= tolerance for s in starts))
+    return hits / len(truth) if truth else 1.0
+
+
+def main():
+    print(f"{'hours':>6} {'segments':>9} {'seconds':>8} {'peak KiB':>9} {'chapters':>9} {'true':>5} {'recall':>7}")
+    for hours in (0.5, 3, 6, 12):
+        segments, truth = synthetic_transcript(hours)
+        tracemalloc.start()
+        start = time.perf_counter()
+        chapters = segment_transcript(segments, max_chapters=10_000)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        count = int(hours * 3600 / 3)
+        print(f"{hours:>6} {count:>9} {elapsed:>8.2f} {peak / 1024:>9.0f} {len(chapters):>9} "
+              f"{len(truth):>5} {recall(chapters, truth):>7.2f}")
+
+    description = '\n'.join(f"{h}:{m:02d}:00 Part {h * 60 + m}" for h in range(10) for m in range(0, 60, 5))
+    start = time.perf_counter()
+    for _ in range(1000):
+        parse_chapter_markers(description)
+    print(f"\ndescription markers ({description.count(chr(10)) + 1} lines): "
+          f"{(time.perf_counter() - start):.3f} ms per parse")
+
+
+if __name__ == '__main__':
+    main()
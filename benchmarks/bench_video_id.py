@@ -0,0 +1,150 @@
+"""Speed and coverage of video_id.parse_video_url against the old two-regex extractor
+
+Usage: python benchmarks/bench_video_id.py [--urls 10000] [--seed 0]
+
+Generates random 11-character IDs and links each in the ways people paste
+them: watch URLs with ``v=`` first or after tracking parameters, youtu.be,
+shorts, live, embed, the m./music. hosts, with and without a scheme,
+playlists and start times. A slice of deliberately broken URLs (IDs one
+character short or long, channel and playlist pages, other hosts) is mixed
+in. Both extractors run over the same list; the report shows microseconds
+per URL and how many URLs each one resolved to the right ID, to a wrong ID
+or to nothing. The new parser's answers are also checked against what was
+generated, so a regression fails the run.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_id import ID_CHARS, parse_many, parse_video_url  # noqa: E402
+
+# The extractor this replaced, as it was in app.py
+LEGACY_REGEX = re.compile(r"(https?://)?(www\.)?(youtube\.com|youtu\.be)/.+")
+LEGACY_PATTERNS = [
+    r"(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\n?#]+)",
+    r"youtube\.com\/embed\/([^&\n?#]+)",
+]
+
+
+def legacy_extract(url):
+    if not LEGACY_REGEX.match(url):
+        return None
+    for pattern in LEGACY_PATTERNS:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def random_id(rng):
+    return ''.join(rng.choice(ID_CHARS) for _ in range(11))
+
+
+def valid_url(rng, video_id):
+    """(url, playlist, start) for one of the link shapes YouTube hands out"""
+    playlist = f"PL{''.join(rng.choice(ID_CHARS) for _ in range(32))}" if rng.random() < 0.2 else None
+    start = rng.choice([None, None, 42, 90, 3723])
+    start_text = {None: None, 42: '42', 90: rng.choice(['90', '90s', '1m30s']), 3723: '1h2m3s'}[start]
+    scheme = rng.choice(['https://', 'http://', ''])
+    host = rng.choice(['www.', '', 'm.', 'music.'])
+    query = []
+    if rng.random() < 0.3:
+        query.append('feature=share')
+    shape = rng.choice(['watch', 'watch', 'short', 'shorts', 'live', 'embed'])
+    if shape == 'watch':
+        query.insert(rng.randint(0, len(query)), f'v={video_id}')
+        path = '/watch'
+        host_name = f'{host}youtube.com'
+    elif shape == 'short':
+        path = f'/{video_id}'
+        host_name = 'youtu.be'
+        query.append(f"si={''.join(rng.choice(ID_CHARS) for _ in range(16))}")
+    else:
+        path = f'/{shape}/{video_id}'
+        host_name = f'{host}youtube.com'
+    if playlist:
+        query.append(f'list={playlist}')
+    if start_text:
+        query.append(f"{'start' if shape == 'embed' else 't'}={start_text}")
+    url = f"{scheme}{host_name}{path}{'?' + '&'.join(query) if query else ''}"
+    return url, playlist, start
+
+
+def invalid_url(rng, video_id):
+    return rng.choice([
+        f'https://www.youtube.com/watch?v={video_id[:10]}',
+        f'https://www.youtube.com/watch?v={video_id}x',
+        f'https://youtu.be/{video_id[:9]}',
+        'https://www.youtube.com/channel/UC' + video_id * 2,
+        f'https://www.youtube.com/playlist?list=PL{video_id}',
+        f'https://vimeo.com/watch?v={video_id}',
+        f'https://www.youtube.com.evil.example/watch?v={video_id}',
+        'not a url',
+    ])
+
+
+def timed(fn, urls, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = fn(urls)
+        best = min(best, time.perf_counter() - started)
+    return results, best
+
+
+def tally(results, expected):
+    right = wrong = missed = rejected = 0
+    for got, want in zip(results, expected):
+        if want is None:
+            rejected += got is None
+            wrong += got is not None
+        elif got == want:
+            right += 1
+        elif got is None:
+            missed += 1
+        else:
+            wrong += 1
+    return right, wrong, missed, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--urls', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    urls, expected = [], []
+    for _ in range(args.urls):
+        video_id = random_id(rng)
+        if rng.random() < 0.1:
+            urls.append(invalid_url(rng, video_id))
+            expected.append(None)
+        else:
+            url, playlist, start = valid_url(rng, video_id)
+            urls.append(url)
+            expected.append((video_id, playlist, start))
+
+    # Property check: every generated link parses to exactly what was generated
+    for url, want in zip(urls, expected):
+        got = parse_video_url(url)
+        assert (got and tuple(got)) == (want or None), f'{url}: got {got}, want {want}'
+
+    expected_ids = [want[0] if want else None for want in expected]
+    old, old_seconds = timed(lambda batch: [legacy_extract(url) for url in batch], urls)
+    new, new_seconds = timed(lambda batch: [ref.video_id if ref else None for ref in parse_many(batch)], urls)
+
+    print(f"{len(urls)} URLs, {expected_ids.count(None)} invalid")
+    print(f"{'extractor':<18} {'us/URL':>7} {'right':>7} {'wrong':>7} {'missed':>7} {'rejected':>9}")
+    for name, results, seconds in (('legacy two-regex', old, old_seconds), ('parse_video_url', new, new_seconds)):
+        right, wrong, missed, rejected = tally(results, expected_ids)
+        print(f"{name:<18} {seconds / len(urls) * 1e6:>7.2f} {right:>7} {wrong:>7} {missed:>7} {rejected:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Local stand-in for the n8n webhook with injectable latency and failures
+
+Usage: python benchmarks/stub_n8n.py [--port 5678] [--latency 0.2] [--jitter 0.5]
+                                     [--tail 0.05:3] [--error-rate 0.1] [--hang-rate 0]
+                                     [--payload-bytes 4096]
+
+Answers every POST with a summary-shaped JSON body for the posted
+``youtubeUrl``. ``--jitter`` spreads the latency log-normally (sigma, so
+``--latency`` is the median), ``--payload-bytes`` pads the description to
+about that many bytes, ``--tail P:S`` makes a fraction P of requests take S extra
+seconds, ``--error-rate`` returns 503 and ``--hang-rate`` sleeps for ten
+minutes (an unresponsive n8n). Other benchmarks import ``start()`` and change
+``StubConfig`` fields while the server runs.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    latency = 0.0
+    jitter = 0.0
+    tail_rate = 0.0
+    tail_seconds = 0.0
+    error_rate = 0.0
+    hang_rate = 0.0
+    payload_bytes = 0
+    requests = 0
+    lock = threading.Lock()
+
+
+def summary_for(url: str) -> dict:
+    description = ('This stub explains engines. Fuel mixture changes torque. '
+                   'Higher compression raises efficiency. Thanks for watching.')
+    if StubConfig.payload_bytes > len(description):
+        filler = ' Engines convert heat into work.'
+        description += filler * ((StubConfig.payload_bytes - len(description)) // len(filler))
+    return {
+        'id': url.rsplit('=', 1)[-1][-11:],
+        'title': f'Stub video {url}',
+        'channel': 'Stub channel',
+        'youtubeUrl': url,
+        'description': description,
+        'summary': 'A stub summary of an engine video.',
+        'topics': ['engines', 'torque'],
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('content-length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        with StubConfig.lock:
+            StubConfig.requests += 1
+        roll = random.random()
+        if roll < StubConfig.hang_rate:
+            time.sleep(600)
+        delay = StubConfig.latency
+        if StubConfig.jitter:
+            delay *= random.lognormvariate(0, StubConfig.jitter)
+        if random.random() < StubConfig.tail_rate:
+            delay += StubConfig.tail_seconds
+        time.sleep(delay)
+        if random.random() < StubConfig.error_rate:
+            self.send_response(503)
+            self.send_header('content-length', '0')
+            self.end_headers()
+            return
+        out = json.dumps(summary_for(body.get('youtubeUrl', ''))).encode('utf-8')
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections under load-test bursts
+    request_queue_size = 1024
+
+
+def start(port: int = 0) -> StubServer:
+    """Serve in a daemon thread; the URL is http://127.0.0.1:<server.server_port>/"""
+    server = StubServer(('127.0.0.1', port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=5678)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0, help='log-normal sigma around the latency')
+    parser.add_argument('--tail', default='0:0', help='fraction:seconds of slow requests')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--payload-bytes', type=int, default=0)
+    args = parser.parse_args()
+    StubConfig.latency = args.latency
+    StubConfig.jitter = args.jitter
+    StubConfig.tail_rate, StubConfig.tail_seconds = (float(v) for v in args.tail.split(':'))
+    StubConfig.error_rate = args.error_rate
+    StubConfig.hang_rate = args.hang_rate
+    StubConfig.payload_bytes = args.payload_bytes
+    server = StubServer(('127.0.0.1', args.port), StubHandler)
+    print(f"Stub n8n webhook on http://127.0.0.1:{args.port}/")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+import codecs
+import html
+import json
+import mmap
+import os
+import re
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Iterator, Optional, Tuple
+
+# A cue's text ends at a blank line, at the end of the file, or right before the next cue's
+# (optional) identifier and timing line, so a cue with no text cannot swallow the next one.
+# A cue with no text at all may be followed directly by a numeric identifier or timing line.
+TIMING = rb"(?:\d+:)?\d{2}:\d{2}[,.]\d{3}\s*-->"
+CUE_END = (rb"(?:\r?\n\s*\r?\n|\r?\n(?=(?:[^\n]*\r?\n)?" + TIMING + rb")|(?<=\n)(?=(?:\d+\r?\n)?"
+           + TIMING + rb")|\Z)")
+SRT_CUE_RE = re.compile(
+    rb"(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})[^\n]*\n(.*?)" + CUE_END,
+    re.S
+)
+VTT_CUE_RE = re.compile(
+    rb"(?:(\d+):)?(\d{2}):(\d{2})\.(\d{3})\s*-->\s*(?:(\d+):)?(\d{2}):(\d{2})\.(\d{3})[^\n]*\n(.*?)" + CUE_END,
+    re.S
+)
+TAG_RE = re.compile(rb"<[^>]*>")
+EVENTS_RE = re.compile(r'"events"\s*:\s*\[')
+# json3 input is decoded this many bytes at a time
+JSON3_CHUNK = 1 << 16
+
+FORMATS = ('srt', 'vtt', 'json3')
+
+
+class CaptionError(Exception):
+    """Raised when a caption file cannot be read or parsed"""
+
+
+class SegmentStore:
+    """Compact, array-backed store of timed caption segments
+
+    Start/end times live in ``array('d')`` and text offsets in ``array('Q')``
+    over a single UTF-8 buffer, so a multi-hour transcript costs a few
+    arrays rather than millions of small Python objects. Identical
+    consecutive cue texts share one slice of the buffer. Segments are materialized as tuples only when accessed.
+    """
+
+    def __init__(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.offsets = array('Q')
+        self.lengths = array('Q')
+        self._buffer = bytearray()
+        self._last_text = None
+        self._text = None
+
+    def append(self, start: float, end: float, text: bytes) -> None:
+        if text == self._last_text:
+            offset, length = self.offsets[-1], self.lengths[-1]
+        else:
+            offset, length = len(self._buffer), len(text)
+            self._buffer += text
+            self._buffer += b'\n'
+            self._last_text = text
+        self._text = None
+        self.starts.append(start)
+        self.ends.append(end)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+
+    def text_at(self, index: int) -> str:
+        offset = self.offsets[index]
+        return self._buffer[offset:offset + self.lengths[index]].decode('utf-8', 'replace')
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> Tuple[float, float, str]:
+        return self.starts[index], self.ends[index], self.text_at(index)
+
+    def __iter__(self) -> Iterator[Tuple[float, float, str]]:
+        for index in range(len(self.starts)):
+            yield self[index]
+
+    @property
+    def duration(self) -> float:
+        return self.ends[-1] if self.ends else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held, including the joined transcript once ``text()`` has built it"""
+        return (len(self._buffer) + self.starts.itemsize * len(self.starts) * 2
+                + self.offsets.itemsize * len(self.offsets) * 2
+                + (sys.getsizeof(self._text) if self._text is not None else 0))
+
+    def text(self) -> str:
+        """Full transcript with consecutive duplicate cues collapsed"""
+        if self._text is not None:
+            return self._text
+        parts = []
+        last = None
+        for index in range(len(self.offsets)):
+            offset = self.offsets[index]
+            if offset != last:
+                parts.append(self._buffer[offset:offset + self.lengths[index]])
+                last = offset
+        self._text = b' '.join(parts).decode('utf-8', 'replace')
+        return self._text
+
+
+def _clean(text: bytes) -> bytes:
+    if b'<' in text:
+        text = TAG_RE.sub(b'', text)
+    text = b' '.join(text.split())
+    if b'&' in text:
+        text = html.unescape(text.decode('utf-8', 'replace')).encode('utf-8')
+    return text
+
+
+def _seconds(h, m, s, ms) -> float:
+    return int(h or 0) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+
+
+def detect_format(head: bytes, filename: str = '') -> str:
+    """Guess the caption format from the file name or its first bytes"""
+    extension = os.path.splitext(filename.lower())[1].lstrip('.')
+    if extension in ('srt', 'vtt'):
+        return extension
+    if extension in ('json', 'json3'):
+        return 'json3'
+    head = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    if head.startswith(b'WEBVTT'):
+        return 'vtt'
+    if head.startswith(b'{'):
+        return 'json3'
+    return 'srt'
+
+
+def _parse_cues(data, pattern, store: SegmentStore) -> None:
+    previous_last = None
+    for match in pattern.finditer(data):
+        g = match.groups()
+        lines = [line for line in (_clean(raw) for raw in g[8].splitlines()) if line]
+        if not lines:
+            continue
+        last = lines[-1]
+        # Rolling auto-captions repeat the previous cue's last line at the top of each cue
+        while lines and lines[0] == previous_last:
+            del lines[0]
+        previous_last = last
+        if lines:
+            store.append(_seconds(*g[0:4]), _seconds(*g[4:8]), b' '.join(lines))
+
+
+class _DecodedStream:
+    """UTF-8 text of a byte buffer, decoded JSON3_CHUNK bytes at a time
+
+    ``text[position:]`` is the unread part; consumed text is dropped as the
+    window advances, so at most a couple of chunks are held as str.
+    """
+
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self.text = ''
+        self.position = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self._offset >= len(self._data)
+
+    def more(self) -> bool:
+        """Decode the next chunk onto the window; False at the end of the data"""
+        if self.exhausted:
+            return False
+        chunk = self._data[self._offset:self._offset + JSON3_CHUNK]
+        self._offset += len(chunk)
+        self.text = self.text[self.position:] + self._decoder.decode(chunk, final=self.exhausted)
+        self.position = 0
+        return True
+
+
+def _parse_json3(data, store: SegmentStore) -> None:
+    # Decode one event object at a time from a sliding window of the file
+    # instead of copying the whole document into one string
+    stream = _DecodedStream(data)
+    while True:
+        match = EVENTS_RE.search(stream.text, stream.position)
+        if match:
+            stream.position = match.end()
+            break
+        # Keep a tail in case the key is split across chunks
+        stream.position = max(stream.position, len(stream.text) - 64)
+        if not stream.more():
+            raise CaptionError('json3 captions have no "events" array')
+
+    decoder = json.JSONDecoder()
+    while True:
+        text = stream.text
+        position = stream.position
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        stream.position = position
+        if position >= len(text):
+            if not stream.more():
+                raise CaptionError('json3 "events" array is not closed')
+            continue
+        if text[position] == ']':
+            break
+        try:
+            event, stream.position = decoder.raw_decode(text, position)
+        except json.JSONDecodeError as e:
+            # Usually an event split across chunks; only an error once all data is in
+            if stream.more():
+                continue
+            raise CaptionError(f'Malformed json3 event: {e.msg}')
+        _add_json3_event(event, store)
+
+
+def _add_json3_event(event, store: SegmentStore) -> None:
+    if not isinstance(event, dict):
+        raise CaptionError('json3 events must be objects')
+    segs = event.get('segs')
+    if not segs or 'tStartMs' not in event:
+        return
+    try:
+        content = ''.join(seg.get('utf8', '') for seg in segs)
+        begin = event['tStartMs'] / 1000
+        end = begin + event.get('dDurationMs', 0) / 1000
+    except (AttributeError, TypeError):
+        raise CaptionError('Malformed json3 event: segs must be objects with text and times must be numbers')
+    content = _clean(content.encode('utf-8'))
+    if content:
+        store.append(begin, end, content)
+
+
+def parse_captions(path: str, caption_format: Optional[str] = None) -> SegmentStore:
+    """Parse an SRT, WebVTT or YouTube json3 file through a memory map"""
+    store = SegmentStore()
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return store
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                caption_format = caption_format or detect_format(data[:64], path)
+                if caption_format == 'srt':
+                    _parse_cues(data, SRT_CUE_RE, store)
+                elif caption_format == 'vtt':
+                    _parse_cues(data, VTT_CUE_RE, store)
+                elif caption_format == 'json3':
+                    _parse_json3(data, store)
+                else:
+                    raise CaptionError(f'Unsupported caption format: {caption_format}')
+    except (OSError, ValueError) as e:
+        raise CaptionError(f'Could not read captions: {e}')
+    return store
+
+
+class TranscriptCache:
+    """LRU cache of parsed transcripts keyed by video ID, bounded in bytes"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, video_id: str, segments: SegmentStore) -> None:
+        # Every cached transcript is read as text, so build it now and count it
+        segments.text()
+        size = segments.nbytes
+        with self._lock:
+            old = self._items.pop(video_id, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[video_id] = (segments, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get(self, video_id: str) -> Optional[SegmentStore]:
+        with self._lock:
+            item = self._items.get(video_id)
+            if item is None:
+                return None
+            self._items.move_to_end(video_id)
+            return item[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'transcripts': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,159 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from retrieval import tokenize
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]*[A-Z0-9])|\n+")
+URL_RE = re.compile(r"https?://\S+|www\.\S+")
+# Calls to action and channel boilerplate common in video descriptions
+NOISE_RE = re.compile(
+    r"^[\W_]*(#|follow|like|share)|subscribe|patreon|instagram|twitter|tiktok|discord|"
+    r"link(s)? (below|in the description)|leave a comment|thanks for watching|"
+    r"check out (my|our)|hit the bell|see you (in the )?next",
+    re.I
+)
+
+# Sentences beyond this are pre-filtered by centroid similarity before ranking
+MAX_CANDIDATES = 300
+
+
+def split_sentences(text: str, min_words: int = 4, max_words: int = 40) -> List[str]:
+    """Split text into sentences, dropping links, social boilerplate and fragments
+
+    Runs longer than max_words, e.g. unpunctuated auto-captions, are cut
+    into windows of max_words words.
+    """
+    sentences = []
+    for raw in SENTENCE_RE.split(text or ''):
+        sentence = URL_RE.sub('', raw).strip(' \t-•*|')
+        words = sentence.split()
+        if len(words) > max_words:
+            pieces = [' '.join(words[i:i + max_words]) for i in range(0, len(words), max_words)]
+        else:
+            pieces = [sentence]
+        for piece in pieces:
+            if len(piece.split()) < min_words or NOISE_RE.search(piece):
+                continue
+            sentences.append(piece)
+    return sentences
+
+
+def _tfidf_vectors(token_lists: List[List[str]]) -> List[Dict[str, float]]:
+    doc_freq = Counter()
+    for tokens in token_lists:
+        doc_freq.update(set(tokens))
+    total = len(token_lists)
+    vectors = []
+    for tokens in token_lists:
+        counts = Counter(tokens)
+        vector = {term: (1 + math.log(tf)) * math.log(1 + total / doc_freq[term])
+                  for term, tf in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        vectors.append({term: w / norm for term, w in vector.items()})
+    return vectors
+
+
+def _similarity_graph(vectors: List[Dict[str, float]], threshold: float) -> List[Dict[int, float]]:
+    # Only sentence pairs that share a term can have non-zero cosine similarity,
+    # so walk an inverted index instead of comparing every pair.
+    postings = {}
+    for index, vector in enumerate(vectors):
+        for term, weight in vector.items():
+            postings.setdefault(term, []).append((index, weight))
+    edges = [dict() for _ in vectors]
+    for term_postings in postings.values():
+        for a, (i, wi) in enumerate(term_postings):
+            for j, wj in term_postings[a + 1:]:
+                edges[i][j] = edges[i].get(j, 0.0) + wi * wj
+    for i, neighbours in enumerate(edges):
+        for j in [j for j, sim in neighbours.items() if sim < threshold]:
+            del neighbours[j]
+        for j, sim in neighbours.items():
+            edges[j][i] = sim
+    return edges
+
+
+def textrank(sentences: List[str], damping: float = 0.85, threshold: float = 0.05,
+             iterations: int = 50, tolerance: float = 1e-6) -> List[float]:
+    """Score sentences with TextRank over a TF-IDF cosine similarity graph"""
+    n = len(sentences)
+    if n == 0:
+        return []
+    vectors = _tfidf_vectors([tokenize(s) for s in sentences])
+    edges = _similarity_graph(vectors, threshold)
+    out_weight = [sum(neighbours.values()) for neighbours in edges]
+    scores = [1.0 / n] * n
+    for _ in range(iterations):
+        new_scores = []
+        for i in range(n):
+            rank = sum(scores[j] * sim / out_weight[j] for j, sim in edges[i].items() if out_weight[j])
+            new_scores.append((1 - damping) / n + damping * rank)
+        delta = sum(abs(a - b) for a, b in zip(new_scores, scores))
+        scores = new_scores
+        if delta < tolerance:
+            break
+    return scores
+
+
+def _candidates(sentences: List[str]) -> List[int]:
+    """Indices of the sentences closest to the document centroid"""
+    if len(sentences) <= MAX_CANDIDATES:
+        return list(range(len(sentences)))
+    vectors = _tfidf_vectors([tokenize(s) for s in sentences])
+    centroid = Counter()
+    for vector in vectors:
+        centroid.update(vector)
+    scored = sorted(range(len(sentences)),
+                    key=lambda i: sum(w * centroid[t] for t, w in vectors[i].items()),
+                    reverse=True)
+    return sorted(scored[:MAX_CANDIDATES])
+
+
+def rank_sentences(text: str) -> List[str]:
+    """Sentences of text ordered from most to least central
+
+    Questions are ranked last: in descriptions they are usually hooks
+    ("Why do we sleep?") rather than content.
+    """
+    sentences = split_sentences(text)
+    candidates = _candidates(sentences)
+    scores = textrank([sentences[i] for i in candidates])
+    order = sorted(range(len(candidates)),
+                   key=lambda k: (sentences[candidates[k]].endswith('?'), -scores[k], candidates[k]))
+    return [sentences[candidates[k]] for k in order]
+
+
+def extract_key_points(text: str, count: int = 5) -> List[str]:
+    """Top-ranked sentences, most important first"""
+    return rank_sentences(text)[:count]
+
+
+def extractive_summary(text: str, sentences: int = 3) -> str:
+    """Short summary made of the top-ranked sentences in their original order"""
+    all_sentences = split_sentences(text)
+    top = set(rank_sentences(text)[:sentences])
+    return ' '.join(s for s in all_sentences if s in top)
+
+
+def summarize_locally(summary_data: dict, key_points: int = 5, sentences: int = 3) -> Optional[dict]:
+    """Key points and summary from the transcript (preferred) or description
+
+    A transcript without sentence punctuation (auto-captions) only yields
+    fixed-size word windows, so a punctuated description is used first.
+    """
+    texts = [text for text in (summary_data.get('transcript'), summary_data.get('description'))
+             if isinstance(text, str) and text.strip()]
+    punctuated = [text for text in texts if SENTENCE_RE.search(text)]
+    for text in punctuated + texts:
+        ranked = rank_sentences(text)
+        if ranked:
+            break
+    else:
+        return None
+    top = set(ranked[:sentences])
+    return {
+        'key_points': ranked[:key_points],
+        'summary': ' '.join(s for s in split_sentences(text) if s in top),
+    }
@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional
+
+from flask import Response
+from jinja2 import Template
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Preference order when the client accepts several encodings equally
+ENCODING_PREFERENCE = ('br', 'gzip', 'identity')
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Map each encoding in an Accept-Encoding header to its q-value"""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class Asset:
+    """One precompressed file with a strong ETag per encoding"""
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {'identity': body}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.variants['gzip'] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.variants['br'] = compressed
+
+    def etag(self, encoding: str) -> str:
+        return self.digest if encoding == 'identity' else f'{self.digest}-{encoding}'
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Best acceptable encoding (q > 0), or None when even identity is refused"""
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get('*')
+        best, best_q = None, 0.0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in self.variants:
+                continue
+            q = accepted.get(encoding, wildcard if wildcard is not None else
+                             (1.0 if encoding == 'identity' else 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def response(self, request) -> Response:
+        encoding = self.negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return Response('No acceptable content encoding', status=406, mimetype='text/plain',
+                            headers={'Vary': 'Accept-Encoding'})
+        etag = self.etag(encoding)
+        headers = {
+            'Cache-Control': self.cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(self.variants[encoding], mimetype=self.content_type, headers=headers)
+        response.set_etag(etag)
+        return response
+
+
+class FrontendAssets:
+    """Build the page and its static assets once at startup
+
+    CSS and JS are served under content-hashed names with far-future
+    caching; the page itself is rendered once with those names and served
+    with a strong ETag so browsers revalidate it cheaply.
+    """
+
+    # (file in static_dir, template variable, content type)
+    ASSETS = (
+        ('app.css', 'css_url', 'text/css'),
+        ('app.js', 'js_url', 'application/javascript'),
+    )
+
+    def __init__(self, static_dir: str, template_path: str, url_prefix: str = '/assets/'):
+        self.assets = {}
+        urls = {}
+        for filename, variable, content_type in self.ASSETS:
+            with open(os.path.join(static_dir, filename), 'rb') as f:
+                asset = Asset(f.read(), f'{content_type}; charset=utf-8', IMMUTABLE)
+            stem, ext = os.path.splitext(filename)
+            hashed_name = f'{stem}.{asset.digest[:10]}{ext}'
+            self.assets[hashed_name] = asset
+            urls[variable] = url_prefix + hashed_name
+
+        with open(template_path, encoding='utf-8') as f:
+            page = Template(f.read()).render(**urls)
+        self.index = Asset(page.encode('utf-8'), 'text/html; charset=utf-8', REVALIDATE)
+
+    def asset(self, name: str) -> Optional[Asset]:
+        return self.assets.get(name)
+
+    def stats(self) -> dict:
+        def sizes(asset):
+            return {encoding: len(body) for encoding, body in asset.variants.items()}
+        return {
+            'index': sizes(self.index),
+            'assets': {name: sizes(asset) for name, asset in self.assets.items()},
+        }
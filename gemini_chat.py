@@ -0,0 +1,127 @@
+import threading
+from contextlib import nullcontext
+from typing import Callable, Iterable, Iterator, List, Optional
+
+CONTEXT_PROMPT = "You are answering questions about a YouTube video. Context from the video summary:\n{context}"
+CONTEXT_ACK = "Understood. I will answer using this video context."
+EXCERPTS_PROMPT = "Relevant excerpts from the video:\n{excerpts}\n\nQuestion: {message}"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token)"""
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+
+class ModelPool:
+    """Process-wide cache of model instances keyed by model name"""
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self._factory(model_name)
+                    self._models[model_name] = model
+        return model
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+class ChatConversation:
+    """One conversation with Gemini whose video context is attached once
+
+    The pinned SDK (google-generativeai 0.3) has no system instructions or
+    context caching and the API is stateless, so every call re-sends the
+    context as an opening user/model exchange, then the earlier turns, then
+    the question. ``last_usage`` reports those estimated prompt tokens next
+    to ``baseline_tokens``, what a one-shot prompt of context and question
+    (no history) would cost. Earlier turns are read from ``history`` (the
+    session's bounded deque of ``{'user', 'bot'}`` dicts); callers append the
+    finished turn themselves, so an abandoned stream never enters history.
+    Pass the lock that guards ``history`` so each message sends a consistent
+    snapshot while other requests on the same session add turns.
+    Passages retrieved for a question are sent with that question only and
+    are not replayed in later turns.
+    """
+
+    def __init__(self, model, context: str = '', history: Optional[Iterable[dict]] = None, lock=None):
+        self.model = model
+        self.history = history if history is not None else []
+        self._history_lock = lock or nullcontext()
+        self.preamble = []
+        if context:
+            self.preamble = [
+                {'role': 'user', 'parts': [CONTEXT_PROMPT.format(context=context)]},
+                {'role': 'model', 'parts': [CONTEXT_ACK]},
+            ]
+        self.context_tokens = sum(estimate_tokens(c['parts'][0]) for c in self.preamble)
+        self.turns = 0
+        self.prompt_tokens_total = 0
+        self.baseline_tokens_total = 0
+        self.last_usage = None
+
+    def _contents(self, message: str, excerpts: Optional[List[str]] = None) -> List[dict]:
+        contents = list(self.preamble)
+        with self._history_lock:
+            turns = list(self.history)
+        for turn in turns:
+            contents.append({'role': 'user', 'parts': [turn['user']]})
+            contents.append({'role': 'model', 'parts': [turn['bot']]})
+        if excerpts:
+            message = EXCERPTS_PROMPT.format(excerpts='\n\n'.join(excerpts), message=message)
+        contents.append({'role': 'user', 'parts': [message]})
+        return contents
+
+    def _account(self, message: str, contents: List[dict]) -> None:
+        prompt_tokens = sum(estimate_tokens(c['parts'][0]) for c in contents)
+        message_tokens = estimate_tokens(contents[-1]['parts'][0])
+        baseline_tokens = self.context_tokens + message_tokens
+        self.turns += 1
+        self.prompt_tokens_total += prompt_tokens
+        self.baseline_tokens_total += baseline_tokens
+        self.last_usage = {
+            'prompt_tokens': prompt_tokens,
+            'context_tokens': self.context_tokens,
+            'history_tokens': prompt_tokens - self.context_tokens - message_tokens,
+            'message_tokens': message_tokens,
+            'history_turns': len(contents) // 2 - len(self.preamble) // 2,
+            'baseline_tokens': baseline_tokens,
+        }
+
+    def send(self, message: str, excerpts: Optional[List[str]] = None) -> str:
+        """Send a message and return the full reply"""
+        contents = self._contents(message, excerpts)
+        self._account(message, contents)
+        return self.model.generate_content(contents).text
+
+    async def asend(self, message: str, excerpts: Optional[List[str]] = None) -> str:
+        """``send`` for the async server"""
+        contents = self._contents(message, excerpts)
+        self._account(message, contents)
+        return (await self.model.generate_content_async(contents)).text
+
+    def stream(self, message: str, excerpts: Optional[List[str]] = None) -> Iterator[str]:
+        """Send a message and yield the reply chunk by chunk"""
+        contents = self._contents(message, excerpts)
+        self._account(message, contents)
+        for chunk in self.model.generate_content(contents, stream=True):
+            text = chunk.text
+            if text:
+                yield text
+
+    def usage(self) -> dict:
+        return {
+            'turns': self.turns,
+            'context_tokens': self.context_tokens,
+            'prompt_tokens_total': self.prompt_tokens_total,
+            'baseline_tokens_total': self.baseline_tokens_total,
+            'last': self.last_usage,
+        }
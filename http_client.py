@@ -0,0 +1,198 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from resilience import CircuitBreaker, Deadline, LatencyTracker
+
+# 504 is left out: the gateway gave up waiting, but the workflow may still be running
+RETRY_STATUSES = (502, 503)
+
+
+def connect_failed(error: requests.exceptions.ConnectionError) -> bool:
+    """True when the connection was never established, so n8n cannot have seen the request"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+
+
+class WebhookClient:
+    """Pooled keep-alive HTTP client for the n8n webhook
+
+    One ``HTTPAdapter`` (and therefore one urllib3 connection pool) is shared
+    by every thread in the worker; each thread gets its own ``Session`` on top
+    of it so no request state is shared. The webhook call is not idempotent,
+    so only failures before the request reached n8n are retried, with
+    full-jitter exponential backoff: connect timeouts, refused connections
+    and 502/503 from its gateway. Read timeouts, connections dropped after
+    the body was sent and 504s are not retried since the workflow may still
+    be running.
+
+    Every call runs under an overall ``deadline`` (seconds) that clips the
+    connect/read timeouts and backoff sleeps of all its attempts. An optional
+    circuit breaker fails calls fast while n8n is unhealthy. With ``hedge``
+    on, an attempt still running after the recent p95 latency gets a second,
+    identical request and the first response to arrive wins.
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5, read_timeout: float = 85,
+                 max_retries: int = 2, backoff_base: float = 0.5, backoff_max: float = 8,
+                 retry_statuses=RETRY_STATUSES, deadline: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None, hedge: bool = False,
+                 hedge_min_delay: float = 1.0, hedge_min_samples: int = 20):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.deadline = deadline or connect_timeout + read_timeout
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyTracker()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=pool_size * 2, thread_name_prefix='hedge') if hedge else None
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries = 0
+        self.retry_exhausted = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self._adapter)
+            session.mount('http://', self._adapter)
+            self._local.session = session
+        return session
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _post(self, url: str, payload: dict, timeout) -> requests.Response:
+        started = time.monotonic()
+        response = self._session().post(url, json=payload, timeout=timeout)
+        if response.status_code < 500:
+            self.latencies.add(time.monotonic() - started)
+        return response
+
+    def _send(self, url: str, payload: dict, timeout, deadline: Deadline) -> requests.Response:
+        """One attempt, hedged with a duplicate request if it runs past the p95 latency"""
+        if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return self._post(url, payload, timeout)
+        delay = max(self.hedge_min_delay, self.latencies.percentile(0.95))
+        if delay >= deadline.remaining():
+            return self._post(url, payload, timeout)
+
+        first = self._hedge_pool.submit(self._post, url, payload, timeout)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        with self._lock:
+            self.requests_sent += 1
+            self.hedges_sent += 1
+        second = self._hedge_pool.submit(self._post, url, payload, deadline.timeout(*timeout))
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for loser in pending:
+                    # The slower request still completes; drop its response
+                    loser.add_done_callback(lambda f: f.exception() or f.result().close())
+                if future is second:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return future.result()
+        raise error
+
+    def post_json(self, url: str, payload: dict, timeout=None,
+                  deadline: Optional[Deadline] = None) -> requests.Response:
+        """POST a JSON payload within a deadline, retrying transient failures"""
+        deadline = deadline or Deadline(self.deadline)
+        if self.breaker is None:
+            return self._post_with_retries(url, payload, timeout, deadline)
+        self.breaker.allow()
+        failed = True
+        try:
+            response = self._post_with_retries(url, payload, timeout, deadline)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.breaker.record(failed)
+
+    def _post_with_retries(self, url: str, payload: dict, timeout, deadline: Deadline) -> requests.Response:
+        connect, read = timeout or (self.connect_timeout, self.read_timeout)
+        attempt = 0
+        while True:
+            attempt_timeout = deadline.timeout(connect, read)
+            with self._lock:
+                self.requests_sent += 1
+            try:
+                response = self._send(url, payload, attempt_timeout, deadline)
+            except requests.exceptions.ConnectionError as e:
+                if not connect_failed(e):
+                    raise
+                if attempt >= self.max_retries:
+                    with self._lock:
+                        self.retry_exhausted += 1
+                    raise
+            else:
+                if response.status_code not in self.retry_statuses:
+                    return response
+                if attempt >= self.max_retries or deadline.remaining() <= 0:
+                    with self._lock:
+                        self.retry_exhausted += 1
+                    return response
+                response.close()
+
+            with self._lock:
+                self.retries += 1
+            time.sleep(min(self._backoff(attempt), deadline.remaining()))
+            attempt += 1
+
+    def connections_opened(self) -> int:
+        pools = self._adapter.poolmanager.pools
+        with pools.lock:
+            return sum(pools[key].num_connections for key in pools.keys())
+
+    def stats(self) -> dict:
+        opened = self.connections_opened()
+        return {
+            'pool_size': self.pool_size,
+            'connect_timeout_seconds': self.connect_timeout,
+            'read_timeout_seconds': self.read_timeout,
+            'requests_sent': self.requests_sent,
+            'connections_opened': opened,
+            'handshakes_saved': max(0, self.requests_sent - opened),
+            'retries': self.retries,
+            'retry_exhausted': self.retry_exhausted,
+            'deadline_seconds': self.deadline,
+            'latency_p95_seconds': self.latencies.percentile(0.95),
+            'hedging': self.hedge,
+            'hedges_sent': self.hedges_sent,
+            'hedge_wins': self.hedge_wins,
+            'breaker': self.breaker.stats() if self.breaker else None,
+        }
+
+    def close(self) -> None:
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+        self._adapter.close()
@@ -0,0 +1,163 @@
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+ERROR = 'error'
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class Job:
+    """A single background summarization job"""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, ERROR)
+
+    def to_dict(self) -> dict:
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+        if self.status == DONE:
+            data['result'] = self.result
+        elif self.status == ERROR:
+            data['error'] = self.error
+        return data
+
+
+class JobManager:
+    """Bounded background executor for long-running webhook calls
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` jobs
+    may be queued or running; beyond that ``submit`` raises QueueFullError.
+    Finished jobs are kept for ``retention`` seconds. With a ``job_store``
+    (``SummaryStore``) job state is also written to disk so a poll that lands
+    on another gunicorn worker still finds it.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32, retention: float = 900,
+                 job_store=None, error_message: Optional[Callable[[Exception], str]] = None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.job_store = job_store
+        self.error_message = error_message or str
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary-job')
+        self._jobs = {}
+        self._active = 0
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, fn: Callable, *args) -> Job:
+        """Queue fn(*args) and return its job immediately"""
+        with self._lock:
+            self._purge()
+            if self._active >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(f'Job queue is full ({self.max_queue} pending). Please retry shortly.')
+            job = Job(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+            self._active += 1
+            self.submitted += 1
+        self._persist(job)
+        # Carry the submitting request's context (request ID, log sampling) into the job
+        self._executor.submit(contextvars.copy_context().run, self._run, job, fn, args)
+        return job
+
+    def _run(self, job: Job, fn: Callable, args) -> None:
+        job.status = RUNNING
+        self._persist(job)
+        try:
+            job.result = fn(*args)
+            job.status = DONE
+            self.completed += 1
+        except Exception as e:
+            job.error = self.error_message(e)
+            job.status = ERROR
+            self.failed += 1
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active -= 1
+            self._persist(job)
+            job.done.set()
+
+    def _persist(self, job: Job) -> None:
+        if self.job_store is None:
+            return
+        try:
+            expires_at = (job.finished_at or time.time()) + self.retention
+            self.job_store.save_job(job.id, job.to_dict(), expires_at)
+        except Exception as e:
+            logger.warning('could not persist job', extra={'job_id': job.id, 'error': str(e)})
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return the job's status dict, checking the shared store if unknown here"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.job_store is not None:
+            return self.job_store.load_job(job_id)
+        return None
+
+    def wait(self, job_id: str, timeout: float, poll_interval: float = 0.5) -> Optional[dict]:
+        """Block until the job finishes or timeout elapses, then return its status"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+            return job.to_dict()
+
+        # Job belongs to another worker: poll the shared store
+        deadline = time.monotonic() + timeout
+        while True:
+            state = self.get(job_id)
+            if state is None or state['status'] in (DONE, ERROR) or time.monotonic() >= deadline:
+                return state
+            time.sleep(poll_interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'active': self._active,
+                'tracked': len(self._jobs),
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'retention_seconds': self.retention,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+            }
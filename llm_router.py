@@ -0,0 +1,395 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Iterator, List, Optional, Union
+
+import requests
+
+from gemini_chat import estimate_tokens
+
+# Prompts are either plain strings or Gemini-style contents:
+# [{'role': 'user' | 'model', 'parts': [text]}, ...]
+Contents = Union[str, List[dict]]
+
+CONTINUE_PROMPT = "Your previous answer was cut off. Continue it exactly where it stopped, without repeating anything."
+
+
+class NoBackendAvailable(RuntimeError):
+    """Raised when every LLM backend failed or is saturated"""
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _as_messages(contents: Contents) -> List[dict]:
+    """Gemini contents -> OpenAI-style chat messages"""
+    if isinstance(contents, str):
+        return [{'role': 'user', 'content': contents}]
+    return [{'role': 'assistant' if c['role'] == 'model' else 'user', 'content': c['parts'][0]}
+            for c in contents]
+
+
+def _continuation(contents: Contents, partial: str) -> Contents:
+    """Contents that ask the next backend to finish a reply cut off mid-stream"""
+    if isinstance(contents, str):
+        contents = [{'role': 'user', 'parts': [contents]}]
+    return list(contents) + [
+        {'role': 'model', 'parts': [partial]},
+        {'role': 'user', 'parts': [CONTINUE_PROMPT]},
+    ]
+
+
+class GeminiProvider:
+    """A Gemini model behind the router"""
+
+    def __init__(self, model_pool, model_name: str, max_concurrency: int = 8):
+        self.model_pool = model_pool
+        self.model_name = model_name
+        self.name = f"gemini:{model_name}"
+        self.max_concurrency = max_concurrency
+
+    def generate(self, contents: Contents) -> str:
+        return self.model_pool.get(self.model_name).generate_content(contents).text
+
+    async def agenerate(self, contents: Contents) -> str:
+        return (await self.model_pool.get(self.model_name).generate_content_async(contents)).text
+
+    def stream(self, contents: Contents) -> Iterator[str]:
+        for chunk in self.model_pool.get(self.model_name).generate_content(contents, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+
+class OpenAICompatibleProvider:
+    """A model served over an OpenAI-compatible chat completions API (e.g. Groq)"""
+
+    def __init__(self, name: str, base_url: str, api_key: str, model_name: str,
+                 max_concurrency: int = 8, timeout: float = 60):
+        self.name = f"{name}:{model_name}"
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.headers['Authorization'] = f'Bearer {api_key}'
+        self._async_client = None
+
+    def _post(self, contents: Contents, stream: bool) -> requests.Response:
+        response = self._session.post(self.url, json={
+            'model': self.model_name,
+            'messages': _as_messages(contents),
+            'stream': stream,
+        }, timeout=self.timeout, stream=stream)
+        response.raise_for_status()
+        return response
+
+    def generate(self, contents: Contents) -> str:
+        return self._post(contents, False).json()['choices'][0]['message']['content']
+
+    async def agenerate(self, contents: Contents) -> str:
+        if self._async_client is None:
+            import aiohttp  # only needed by the async server (asgi.py)
+            self._async_client = aiohttp.ClientSession(
+                headers={'Authorization': self._session.headers['Authorization']},
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        async with self._async_client.post(self.url, json={
+            'model': self.model_name,
+            'messages': _as_messages(contents),
+        }) as response:
+            response.raise_for_status()
+            return (await response.json())['choices'][0]['message']['content']
+
+    def stream(self, contents: Contents) -> Iterator[str]:
+        with self._post(contents, True) as response:
+            for line in response.iter_lines():
+                if not line.startswith(b'data: ') or line == b'data: [DONE]':
+                    continue
+                text = json.loads(line[6:])['choices'][0]['delta'].get('content')
+                if text:
+                    yield text
+
+
+class FakeProvider:
+    """Local stand-in with configurable latency, speed and failure rate
+
+    Replies are deterministic for a given prompt. ``latency`` is the time to
+    the first token; the rest arrives at ``tokens_per_second``. A non-zero
+    ``jitter`` draws each call's latency log-normally around ``latency``
+    with that sigma.
+    """
+
+    def __init__(self, name: str = 'fake', latency: float = 0.05, tokens_per_second: float = 200,
+                 error_rate: float = 0.0, reply_tokens: int = 40, max_concurrency: int = 8,
+                 seed: Optional[int] = None, jitter: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.reply_tokens = reply_tokens
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _reply(self, contents: Contents) -> List[str]:
+        prompt = contents if isinstance(contents, str) else contents[-1]['parts'][0]
+        words = prompt.split() or ['ok']
+        return [f"{self.name}:" if i == 0 else words[i % len(words)] for i in range(self.reply_tokens)]
+
+    def _latency(self) -> float:
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency * self._random.lognormvariate(0, self.jitter)
+
+    def _maybe_fail(self) -> None:
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise RuntimeError(f'{self.name} failed')
+
+    def generate(self, contents: Contents) -> str:
+        self._maybe_fail()
+        words = self._reply(contents)
+        time.sleep(self._latency() + len(words) / self.tokens_per_second)
+        return ' '.join(words)
+
+    async def agenerate(self, contents: Contents) -> str:
+        self._maybe_fail()
+        words = self._reply(contents)
+        await asyncio.sleep(self._latency() + len(words) / self.tokens_per_second)
+        return ' '.join(words)
+
+    def stream(self, contents: Contents) -> Iterator[str]:
+        words = self._reply(contents)
+        time.sleep(self._latency())
+        for index, word in enumerate(words):
+            if index == len(words) // 2:
+                self._maybe_fail()
+            yield word if index == 0 else ' ' + word
+            time.sleep(1 / self.tokens_per_second)
+
+
+class BackendState:
+    """Routing statistics and concurrency slots for one backend"""
+
+    def __init__(self, backend, alpha: float):
+        self.backend = backend
+        self.alpha = alpha
+        self.slots = threading.BoundedSemaphore(backend.max_concurrency)
+        self.lock = threading.Lock()
+        self.latency = None          # EWMA seconds per call
+        self.error_rate = 0.0        # EWMA of failures (0..1)
+        self.tokens_per_second = None
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + self.alpha * (value - current)
+
+    def record(self, seconds: float, text: Optional[str]) -> None:
+        """Record a call outcome; text is None for a failure"""
+        with self.lock:
+            self.calls += 1
+            if text is None:
+                self.failures += 1
+                self.last_failure = time.monotonic()
+                self.error_rate = self._ewma(self.error_rate, 1.0)
+                return
+            self.error_rate = self._ewma(self.error_rate, 0.0)
+            self.latency = self._ewma(self.latency, seconds)
+            if seconds > 0:
+                self.tokens_per_second = self._ewma(self.tokens_per_second, estimate_tokens(text) / seconds)
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+                'error_rate': round(self.error_rate, 4),
+                'tokens_per_second': round(self.tokens_per_second, 1) if self.tokens_per_second else None,
+                'in_flight': self.in_flight,
+                'max_concurrency': self.backend.max_concurrency,
+                'calls': self.calls,
+                'failures': self.failures,
+            }
+
+
+class LLMRouter:
+    """Send each LLM call to the fastest healthy backend, failing over on error
+
+    Backends are ranked by EWMA latency; one never called goes first so it
+    gets sampled once, and ones without a successful call yet go last. A backend whose EWMA error rate is above
+    ``max_error_rate`` is skipped for ``cooldown`` seconds after its last
+    failure and then tried again. A backend with all ``max_concurrency`` slots
+    busy is passed over for the next one; only if every backend is busy does
+    the call wait up to ``queue_timeout`` for the best one. Streams that fail
+    after producing text continue on the next backend from where they stopped.
+
+    The router also has a Gemini-model-like ``generate_content`` so it can be
+    used wherever a model is, and is callable for use as a summarizer backend.
+    """
+
+    def __init__(self, backends: list, alpha: float = 0.2, max_error_rate: float = 0.5,
+                 cooldown: float = 30, queue_timeout: float = 10):
+        self.states = [BackendState(backend, alpha) for backend in backends]
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.queue_timeout = queue_timeout
+        self.name = 'router:' + ','.join(backend.name for backend in backends)
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    @property
+    def backends(self) -> list:
+        return [state.backend for state in self.states]
+
+    def _healthy(self, state: BackendState, now: float) -> bool:
+        return state.error_rate <= self.max_error_rate or now - state.last_failure >= self.cooldown
+
+    def ranked(self) -> List[BackendState]:
+        """Backends in the order they should be tried: healthy and fast first"""
+        now = time.monotonic()
+        return sorted(self.states, key=lambda s: (
+            not self._healthy(s, now),
+            s.latency if s.latency is not None else (0.0 if s.calls == s.in_flight == 0 else float('inf')),
+        ))
+
+    def _acquire(self, tried: set) -> Optional[BackendState]:
+        candidates = [state for state in self.ranked() if state.backend.name not in tried]
+        for state in candidates:
+            if state.slots.acquire(blocking=False):
+                break
+        else:
+            if not candidates or not candidates[0].slots.acquire(timeout=self.queue_timeout):
+                return None
+            state = candidates[0]
+        return self._claimed(state, tried)
+
+    async def _acquire_async(self, tried: set) -> Optional[BackendState]:
+        candidates = [state for state in self.ranked() if state.backend.name not in tried]
+        if not candidates:
+            return None
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            for state in candidates:
+                if state.slots.acquire(blocking=False):
+                    return self._claimed(state, tried)
+            # Every backend is busy; the semaphores are thread-level, so poll
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(0.01)
+
+    def _claimed(self, state: BackendState, tried: set) -> BackendState:
+        tried.add(state.backend.name)
+        with state.lock:
+            state.in_flight += 1
+        return state
+
+    def _release(self, state: BackendState) -> None:
+        with state.lock:
+            state.in_flight -= 1
+        state.slots.release()
+
+    def _failed_over(self) -> None:
+        with self._lock:
+            self.failovers += 1
+
+    def generate(self, contents: Contents) -> str:
+        tried = set()
+        error = None
+        while True:
+            state = self._acquire(tried)
+            if state is None:
+                raise NoBackendAvailable(f'No LLM backend available: {error or "all busy"}')
+            if error is not None:
+                self._failed_over()
+            started = time.monotonic()
+            try:
+                text = state.backend.generate(contents)
+            except Exception as e:
+                state.record(time.monotonic() - started, None)
+                error = e
+                continue
+            finally:
+                self._release(state)
+            state.record(time.monotonic() - started, text)
+            return text
+
+    async def agenerate(self, contents: Contents) -> str:
+        """``generate`` for the async server; backends without ``agenerate`` run in a thread"""
+        tried = set()
+        error = None
+        while True:
+            state = await self._acquire_async(tried)
+            if state is None:
+                raise NoBackendAvailable(f'No LLM backend available: {error or "all busy"}')
+            if error is not None:
+                self._failed_over()
+            backend = state.backend
+            started = time.monotonic()
+            try:
+                if hasattr(backend, 'agenerate'):
+                    text = await backend.agenerate(contents)
+                else:
+                    text = await asyncio.to_thread(backend.generate, contents)
+            except Exception as e:
+                state.record(time.monotonic() - started, None)
+                error = e
+                continue
+            finally:
+                self._release(state)
+            state.record(time.monotonic() - started, text)
+            return text
+
+    def stream(self, contents: Contents) -> Iterator[str]:
+        tried = set()
+        error = None
+        produced = []
+        while True:
+            state = self._acquire(tried)
+            if state is None:
+                raise NoBackendAvailable(f'No LLM backend available: {error or "all busy"}')
+            if error is not None:
+                self._failed_over()
+            request = _continuation(contents, ''.join(produced)) if produced else contents
+            started = time.monotonic()
+            parts = []
+            try:
+                for text in state.backend.stream(request):
+                    parts.append(text)
+                    produced.append(text)
+                    yield text
+            except GeneratorExit:
+                raise
+            except Exception as e:
+                state.record(time.monotonic() - started, None)
+                error = e
+                continue
+            finally:
+                self._release(state)
+            state.record(time.monotonic() - started, ''.join(parts))
+            return
+
+    def generate_content(self, contents: Contents, stream: bool = False):
+        if stream:
+            return (_Response(text) for text in self.stream(contents))
+        return _Response(self.generate(contents))
+
+    async def generate_content_async(self, contents: Contents):
+        return _Response(await self.agenerate(contents))
+
+    def __call__(self, prompt: str) -> str:
+        return self.generate(prompt)
+
+    def stats(self) -> dict:
+        return {
+            'failovers': self.failovers,
+            'order': [state.backend.name for state in self.ranked()],
+            'backends': {state.backend.name: state.to_dict() for state in self.states},
+        }
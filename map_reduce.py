@@ -0,0 +1,189 @@
+import hashlib
+import re
+import threading
+import time
+import zlib
+from typing import Callable, List, Optional
+
+from batch import map_unordered
+from extractive import extractive_summary
+from gemini_chat import estimate_tokens
+from summary_cache import SummaryCache
+
+# Prompts end with a separator line; the text to summarize follows it
+SEPARATOR = "\n---\n"
+MAP_PROMPT = ("Summarize this part of a video transcript in 3-5 sentences. "
+              "Keep names, numbers and conclusions; do not invent anything." + SEPARATOR + "{text}")
+REDUCE_PROMPT = ("These are summaries of consecutive parts of one video transcript. "
+                 "Combine them into a single coherent summary of 4-6 sentences." + SEPARATOR + "{text}")
+PROMPT_VERSION = "1"
+
+SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*$")
+
+
+def chunk_text(text: str, max_tokens: int = 3000, overlap_tokens: int = 200) -> List[str]:
+    """Split text into chunks of about max_tokens with overlap_tokens shared between neighbours
+
+    Chunks end at a sentence boundary in the last quarter of the window,
+    chosen by a hash of the sentence's final word rather than its position.
+    After an insertion or deletion the same cut points are found again a
+    chunk or so later, so an edited transcript keeps most chunk texts (and
+    their cached summaries) unchanged.
+    """
+    words = (text or '').split()
+    if not words:
+        return []
+    costs = [estimate_tokens(word + ' ') for word in words]
+    chunks = []
+    start = 0
+    while start < len(words):
+        end = start
+        used = 0
+        while end < len(words) and (used + costs[end] <= max_tokens or end == start):
+            used += costs[end]
+            end += 1
+        if end < len(words):
+            floor = start + (end - start) * 3 // 4
+            cuts = [cut for cut in range(floor + 1, end + 1) if SENTENCE_END_RE.search(words[cut - 1])]
+            if cuts:
+                end = min(cuts, key=lambda cut: zlib.crc32(words[cut - 1].encode('utf-8')))
+        chunks.append(' '.join(words[start:end]))
+        if end >= len(words):
+            break
+        # Step back over overlap_tokens worth of words, always moving forward
+        back = end
+        carried = 0
+        while back > start + 1 and carried + costs[back - 1] <= overlap_tokens:
+            back -= 1
+            carried += costs[back]
+        start = back
+    return chunks
+
+
+class FakeBackend:
+    """Deterministic local backend for tests and benchmarks
+
+    Returns the top extractive sentences of the prompt's text after an
+    optional sleep that stands in for model latency.
+    """
+
+    def __init__(self, latency: float = 0.0, sentences: int = 3):
+        self.latency = latency
+        self.sentences = sentences
+        self.name = f"fake:{sentences}"
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        text = prompt.split(SEPARATOR, 1)[-1]
+        return extractive_summary(text, self.sentences) or ' '.join(text.split()[:60])
+
+
+class MapReduceSummarizer:
+    """Summarize long transcripts chunk by chunk, then combine the partial summaries
+
+    Chunks are summarized in parallel on a bounded pool. Partial summaries
+    are reduced in groups that fit ``chunk_tokens`` (at most ``fan_in`` per
+    group) until one summary remains. Every map and reduce result is cached
+    under a hash of its backend, prompt and input, so unchanged chunks of an
+    edited transcript are never sent again.
+    """
+
+    def __init__(self, backend: Callable[[str], str], max_workers: int = 4,
+                 chunk_tokens: int = 3000, overlap_tokens: int = 200, fan_in: int = 8,
+                 cache: Optional[SummaryCache] = None):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.fan_in = max(2, fan_in)
+        self.cache = cache if cache is not None else SummaryCache(
+            max_entries=4096, max_bytes=16 * 1024 * 1024, ttl=7 * 24 * 3600)
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.llm_calls = 0
+        self.cached_calls = 0
+
+    def _key(self, prompt: str) -> str:
+        name = getattr(self.backend, 'name', type(self.backend).__name__)
+        return hashlib.sha256(f"{PROMPT_VERSION}\0{name}\0{prompt}".encode('utf-8')).hexdigest()
+
+    def _generate(self, prompt: str, run: dict) -> str:
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        counter = 'cached_calls'
+        if cached is not None:
+            text = cached['text']
+        else:
+            text = self.backend(prompt).strip()
+            self.cache.put(key, {'text': text})
+            counter = 'llm_calls'
+        with self._lock:
+            run[counter] += 1
+            setattr(self, counter, getattr(self, counter) + 1)
+        return text
+
+    def _run_all(self, prompts: List[str], run: dict) -> List[str]:
+        if len(prompts) == 1:
+            return [self._generate(prompts[0], run)]
+        results = [None] * len(prompts)
+        for (index, _), text, error in map_unordered(
+                lambda item: self._generate(item[1], run), list(enumerate(prompts)),
+                max_workers=self.max_workers):
+            if error is not None:
+                raise error
+            results[index] = text
+        return results
+
+    def _groups(self, parts: List[str]) -> List[List[str]]:
+        groups = [[]]
+        used = 0
+        for part in parts:
+            cost = estimate_tokens(part)
+            if groups[-1] and (used + cost > self.chunk_tokens or len(groups[-1]) >= self.fan_in):
+                groups.append([])
+                used = 0
+            groups[-1].append(part)
+            used += cost
+        if len(groups) == len(parts) and len(parts) > 1:
+            # Every part fills a window on its own: pair them so the reduce still converges
+            groups = [parts[i:i + 2] for i in range(0, len(parts), 2)]
+        return groups
+
+    def summarize(self, text: str) -> Optional[dict]:
+        """Summary of text plus chunk, level and call counts for this run"""
+        chunks = chunk_text(text, self.chunk_tokens, self.overlap_tokens)
+        if not chunks:
+            return None
+        run = {'llm_calls': 0, 'cached_calls': 0}
+        started = time.perf_counter()
+        parts = self._run_all([MAP_PROMPT.format(text=chunk) for chunk in chunks], run)
+        levels = 0
+        while len(parts) > 1:
+            levels += 1
+            parts = self._run_all([REDUCE_PROMPT.format(text='\n\n'.join(group))
+                                   for group in self._groups(parts)], run)
+        with self._lock:
+            self.runs += 1
+        return {
+            'summary': parts[0],
+            'chunks': len(chunks),
+            'reduce_levels': levels,
+            'llm_calls': run['llm_calls'],
+            'cached_calls': run['cached_calls'],
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'backend': getattr(self.backend, 'name', type(self.backend).__name__),
+                'runs': self.runs,
+                'llm_calls': self.llm_calls,
+                'cached_calls': self.cached_calls,
+                'cache': self.cache.stats(),
+            }
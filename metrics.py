@@ -0,0 +1,213 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+# Seconds; covers cache hits (sub-ms) through slow webhook calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, registry: 'Registry', name: str, help_text: str, labelnames: Iterable[str]):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = registry._local
+
+
+class Counter(_Metric):
+    """Monotonic counter; ``inc`` touches only the calling thread's shard"""
+    kind = 'counter'
+
+    def inc(self, *labels, value: float = 1) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self.registry.shard()
+        key = (self, labels)
+        shard[key] = shard.get(key, 0) + value
+
+
+class Gauge(Counter):
+    """Up/down value summed over threads (e.g. requests in flight)"""
+    kind = 'gauge'
+
+    def dec(self, *labels, value: float = 1) -> None:
+        self.inc(*labels, value=-value)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution; each thread keeps its own bucket counts and sum"""
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labelnames, buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self.registry.shard()
+        key = (self, labels)
+        counts = shard.get(key)
+        if counts is None:
+            # One slot per bucket, one for +Inf, then the running sum
+            counts = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+
+class Registry:
+    """Metrics with per-thread aggregation, rendered in the Prometheus text format
+
+    Recording never takes a lock: each thread updates a private dict, which
+    is registered once under a lock the first time the thread records
+    anything. A scrape sums all shards; shards of threads that have exited
+    are folded into a retired shard so short-lived pool threads don't
+    accumulate. Values read mid-update may be off by the in-flight
+    observation, which is acceptable for monitoring.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._callbacks = []
+        self._local = threading.local()
+        self._shards = []  # (weakref to thread, shard dict)
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+            return shard
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(self, name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(self, name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(self, name, help_text, labelnames, buckets))
+
+    def callback(self, name: str, help_text: str, fn: Callable[[], Dict[Tuple, float]],
+                 labelnames: Iterable[str] = (), kind: str = 'gauge') -> None:
+        """A metric computed at scrape time from ``fn() -> {label values: value}``"""
+        with self._lock:
+            self._callbacks.append((name, help_text, tuple(labelnames), kind, fn))
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    @staticmethod
+    def _merge(into: dict, shard: dict) -> None:
+        for key, value in list(shard.items()):
+            if isinstance(value, list):
+                total = into.get(key)
+                if total is None:
+                    into[key] = list(value)
+                else:
+                    for i, v in enumerate(value):
+                        total[i] += v
+            else:
+                into[key] = into.get(key, 0) + value
+
+    def collect(self) -> dict:
+        """Sum of all shards: {(metric, labels): value or bucket list}"""
+        with self._lock:
+            live = []
+            for thread_ref, shard in self._shards:
+                thread = thread_ref()
+                if thread is None or not thread.is_alive():
+                    self._merge(self._retired, shard)
+                else:
+                    live.append((thread_ref, shard))
+            self._shards = live
+            totals = {}
+            self._merge(totals, self._retired)
+            for _, shard in live:
+                self._merge(totals, shard)
+            return totals
+
+    def render(self) -> str:
+        totals = self.collect()
+        by_metric = {}
+        for (metric, labels), value in totals.items():
+            by_metric.setdefault(metric, []).append((labels, value))
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for labels, value in sorted(by_metric.get(metric, ()), key=lambda item: item[0]):
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float('inf'),), value[:-1]):
+                        cumulative += count
+                        le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                        lines.append(f'{metric.name}_bucket{_labels(metric.labelnames, labels, le)} {cumulative}')
+                    lines.append(f'{metric.name}_sum{_labels(metric.labelnames, labels)} {value[-1]:.6f}')
+                    lines.append(f'{metric.name}_count{_labels(metric.labelnames, labels)} {cumulative}')
+                else:
+                    lines.append(f'{metric.name}{_labels(metric.labelnames, labels)} {value:g}')
+        for name, help_text, labelnames, kind, fn in self._callbacks:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            try:
+                values = fn()
+            except Exception:
+                continue
+            for labels, value in sorted(values.items()):
+                lines.append(f'{name}{_labels(labelnames, labels)} {float(value):g}')
+        return '\n'.join(lines) + '\n'
+
+
+class NullRegistry(Registry):
+    """Registry whose metrics record nothing, for METRICS_ENABLED=0"""
+
+    def __init__(self):
+        super().__init__()
+        self._local = _NullLocal()
+
+    def shard(self) -> dict:
+        return {}
+
+
+class _NullLocal:
+    @property
+    def shard(self) -> dict:
+        return {}
+
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+import requests
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling a dependency whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f'{name} is unavailable (circuit open, retry in {retry_after:.0f}s)')
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when a request's overall time budget is used up"""
+
+
+class Deadline:
+    """Overall time budget for one logical request, shared by all its attempts"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, connect: float, read: float) -> Tuple[float, float]:
+        """(connect, read) timeouts clipped to what is left of the budget"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'Deadline of {self.seconds:.0f}s exceeded')
+        return min(connect, remaining), min(read, remaining)
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over a sliding window of call outcomes
+
+    While closed, outcomes from the last ``window`` seconds are kept; once
+    at least ``min_calls`` are recorded and the failure rate reaches
+    ``failure_rate`` the breaker opens and every call fails fast for
+    ``open_seconds``. It then lets ``half_open_calls`` probes through: a
+    successful probe closes it, a failed one opens it again.
+    """
+
+    def __init__(self, name: str = 'dependency', failure_rate: float = 0.5, min_calls: int = 5,
+                 window: float = 60, open_seconds: float = 30, half_open_calls: int = 1):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._outcomes = deque()  # (monotonic time, failed)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.rejected = 0
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+        self.trips += 1
+
+    def allow(self) -> None:
+        """Reserve a call, or raise CircuitOpenError while the breaker is open"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.open_seconds - (now - self._opened_at))
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 1)
+                self._probes += 1
+
+    def record(self, failed: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                return
+            if self.state == OPEN:
+                return
+            self._outcomes.append((now, failed))
+            self._failures += failed
+            self._trim(now)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+                self._open(now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'window_calls': calls,
+                'window_failure_rate': round(self._failures / calls, 4) if calls else 0.0,
+                'failure_rate_threshold': self.failure_rate,
+                'open_seconds': self.open_seconds,
+            }
+
+
+class LatencyTracker:
+    """Recent successful call latencies, for percentile-based hedge delays"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
@@ -0,0 +1,152 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from gemini_chat import estimate_tokens
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its me my
+of on or our she so that the their them they this to was we were what when where
+which who why will with you your do does did can could would should about into
+""".split())
+
+# Fields of the n8n response (plus an optional ingested transcript) worth indexing
+INDEXED_FIELDS = (('summary', 'Summary'), ('description', 'Description'), ('transcript', 'Transcript'))
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def split_passages(text: str, max_words: int = 80) -> List[str]:
+    """Group sentences into passages of roughly max_words words
+
+    A sentence longer than max_words (e.g. unpunctuated auto-captions) is
+    cut into windows of max_words words.
+    """
+    passages = []
+    current = []
+    words = 0
+    for sentence in SENTENCE_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        count = len(sentence.split())
+        if current and words + count > max_words:
+            passages.append(' '.join(current))
+            current, words = [], 0
+        if count > max_words:
+            tokens = sentence.split()
+            full = count - count % max_words
+            passages.extend(' '.join(tokens[i:i + max_words]) for i in range(0, full, max_words))
+            sentence, count = ' '.join(tokens[full:]), count - full
+            if not count:
+                continue
+        current.append(sentence)
+        words += count
+    if current:
+        passages.append(' '.join(current))
+    return passages
+
+
+class RetrievalIndex:
+    """Okapi BM25 index over the passages of one video"""
+
+    def __init__(self, passages: Iterable[str], k1: float = 1.5, b: float = 0.75):
+        self.passages = list(passages)
+        self.k1 = k1
+        self.b = b
+        self._postings = {}  # term -> [(passage index, term frequency)]
+        self._lengths = []
+        for index, passage in enumerate(self.passages):
+            counts = Counter(tokenize(passage))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((index, tf))
+        total = len(self.passages)
+        self._avg_length = (sum(self._lengths) / total) if total else 0.0
+        self._idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[float, int]]:
+        """Return up to k (score, passage index) pairs, best first"""
+        scores = {}
+        k1, b, avg = self.k1, self.b, self._avg_length or 1.0
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for index, tf in self._postings[term]:
+                norm = k1 * (1 - b + b * self._lengths[index] / avg)
+                scores[index] = scores.get(index, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, index) for index, score in ranked]
+
+    def select(self, query: str, k: int = 4, token_budget: int = 600) -> List[str]:
+        """Top-k passages that fit the token budget, in their original order"""
+        chosen = []
+        used = 0
+        for _, index in self.search(query, k):
+            cost = estimate_tokens(self.passages[index])
+            if used + cost > token_budget:
+                continue
+            chosen.append(index)
+            used += cost
+        if not chosen and self.passages:
+            # Nothing matched: fall back to the opening passage so the model has some grounding
+            first = self.passages[0]
+            return [first[:token_budget * 4]]
+        return [self.passages[index] for index in sorted(chosen)]
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+
+def build_index(summary_data: dict, max_words: int = 80) -> RetrievalIndex:
+    """Split the summary, description and transcript of a video into an index"""
+    passages = []
+    for field, label in INDEXED_FIELDS:
+        text = summary_data.get(field)
+        if isinstance(text, str) and text.strip():
+            passages.extend(f"[{label}] {p}" for p in split_passages(text, max_words))
+    return RetrievalIndex(passages)
+
+
+class IndexCache:
+    """LRU cache of retrieval indexes keyed by video ID"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build(self, video_id: str, summary_data: dict) -> RetrievalIndex:
+        index = build_index(summary_data)
+        with self._lock:
+            self._indexes[video_id] = index
+            self._indexes.move_to_end(video_id)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
+
+    def get(self, video_id: str) -> Optional[RetrievalIndex]:
+        with self._lock:
+            index = self._indexes.get(video_id)
+            if index is not None:
+                self._indexes.move_to_end(video_id)
+            return index
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'indexes': len(self._indexes),
+                'passages': sum(len(index) for index in self._indexes.values()),
+                'max_entries': self.max_entries,
+            }
@@ -0,0 +1,146 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+# Rough fixed cost of a session object and of one chat turn, in bytes
+SESSION_OVERHEAD = 512
+TURN_OVERHEAD = 128
+
+
+class Session:
+    """Conversation state for one browser or API client"""
+
+    def __init__(self, session_id: str, max_history: int):
+        self.id = session_id
+        self.video_id = None
+        self.context = ''
+        self.chat_history = deque(maxlen=max_history)
+        self.conversation = None
+        self.last_seen = time.monotonic()
+        self.bytes = SESSION_OVERHEAD
+        self.lock = threading.Lock()
+
+    def history_bytes(self) -> int:
+        return sum(len(turn['user']) + len(turn['bot']) + TURN_OVERHEAD for turn in self.chat_history)
+
+    def size(self) -> int:
+        return SESSION_OVERHEAD + len(self.context) + self.history_bytes()
+
+
+class SessionStore:
+    """Per-client session registry with bounded memory
+
+    Each session keeps at most ``max_history`` chat turns. Sessions idle for
+    longer than ``idle_ttl`` are dropped, and when the estimated total size
+    exceeds ``memory_budget`` whole sessions are evicted least recently used
+    first. A session keeps only its video ID and a short context header;
+    the summary and transcript stay in their own bounded caches and are
+    looked up by ID, so nothing a session holds escapes the budget.
+    """
+
+    def __init__(self, max_history: int = 20, memory_budget: int = 16 * 1024 * 1024,
+                 idle_ttl: float = 3600):
+        self.max_history = max_history
+        self.memory_budget = memory_budget
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def get_or_create(self, session_id: Optional[str]) -> Tuple[Session, bool]:
+        """Return (session, created); unknown or expired IDs get a fresh session"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None:
+                session.last_seen = now
+                self._sessions.move_to_end(session.id)
+                return session, False
+
+            session = Session(secrets.token_urlsafe(18), self.max_history)
+            self._sessions[session.id] = session
+            self._bytes += session.bytes
+            self.created += 1
+            self._enforce_budget()
+            return session, True
+
+    def add_turn(self, session: Session, user_message: str, bot_message: str) -> None:
+        """Append a chat turn, dropping the oldest beyond max_history"""
+        with session.lock:
+            session.chat_history.append({'user': user_message, 'bot': bot_message})
+            delta = self._resize(session)
+        self._account(session, delta)
+
+    def set_summary(self, session: Session, video_id: Optional[str], context: str) -> None:
+        """Point the session at a video; ``context`` is the header its conversations start with"""
+        with session.lock:
+            if video_id != session.video_id:
+                # Questions about the previous video would only confuse the new conversation
+                session.chat_history.clear()
+            session.video_id = video_id
+            session.context = context
+            # New video, new context: the next chat message starts a fresh conversation
+            session.conversation = None
+            delta = self._resize(session)
+        self._account(session, delta)
+
+    def clear_history(self, session: Session) -> None:
+        with session.lock:
+            session.chat_history.clear()
+            session.conversation = None
+            delta = self._resize(session)
+        self._account(session, delta)
+
+    @staticmethod
+    def _resize(session: Session) -> int:
+        size = session.size()
+        delta = size - session.bytes
+        session.bytes = size
+        return delta
+
+    def _account(self, session: Session, delta: int) -> None:
+        with self._lock:
+            if session.id in self._sessions:
+                self._bytes += delta
+                self._enforce_budget()
+
+    def _expire(self, now: float) -> None:
+        # Oldest sessions sit at the front, so stop at the first live one
+        cutoff = now - self.idle_ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_seen > cutoff:
+                break
+            self._drop(session)
+            self.expired += 1
+
+    def _enforce_budget(self) -> None:
+        while self._bytes > self.memory_budget and len(self._sessions) > 1:
+            self._drop(next(iter(self._sessions.values())))
+            self.evicted += 1
+
+    def _drop(self, session: Session) -> None:
+        del self._sessions[session.id]
+        self._bytes -= session.bytes
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._bytes,
+                'memory_budget': self.memory_budget,
+                'max_history': self.max_history,
+                'idle_ttl_seconds': self.idle_ttl,
+                'created': self.created,
+                'evicted': self.evicted,
+                'expired': self.expired,
+            }
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Optional
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised when a coalesced caller gives up waiting for the leader"""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one upstream call
+
+    The first caller for a key becomes the leader and runs ``fn``; callers
+    arriving while it is in flight wait on the same future and receive the
+    same result or the same exception. With a ``lock_store`` (anything with
+    ``acquire_lock``/``release_lock``, e.g. ``SummaryStore``) the leader also
+    takes a cross-worker lock; a leader that loses that race polls
+    ``lookup(key)`` until the owning worker publishes the result.
+    """
+
+    def __init__(self, wait_timeout: float = 120, lock_store=None, lock_ttl: float = 120,
+                 poll_interval: float = 0.5):
+        self.wait_timeout = wait_timeout
+        self.lock_store = lock_store
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.remote_coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key: str, fn: Callable, lookup: Optional[Callable] = None):
+        """Run fn once per key across concurrent callers and return its result"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            try:
+                return future.result(timeout=self.wait_timeout)
+            except FutureTimeoutError:
+                self.timeouts += 1
+                raise SingleFlightTimeout(f'Timed out after {self.wait_timeout:.0f}s waiting for in-flight request')
+
+        try:
+            result = self._run_leader(key, fn, lookup)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _run_leader(self, key: str, fn: Callable, lookup: Optional[Callable]):
+        if self.lock_store is None:
+            return fn()
+
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+        while True:
+            if self.lock_store.acquire_lock(key, self._owner, self.lock_ttl):
+                try:
+                    return fn()
+                finally:
+                    self.lock_store.release_lock(key, self._owner)
+
+            # Another worker owns the key; wait for it to publish a result.
+            # If it releases the lock without one (it failed), try to take over.
+            if not waited:
+                waited = True
+                self.remote_coalesced += 1
+            if lookup is not None:
+                result = lookup(key)
+                if result is not None:
+                    return result
+            if time.monotonic() >= deadline:
+                self.timeouts += 1
+                raise SingleFlightTimeout(f'Timed out after {self.wait_timeout:.0f}s waiting for another worker')
+            time.sleep(self.poll_interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            inflight = len(self._inflight)
+        return {
+            'inflight': inflight,
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'remote_coalesced': self.remote_coalesced,
+            'timeouts': self.timeouts,
+            'wait_timeout_seconds': self.wait_timeout,
+            'cross_worker': self.lock_store is not None,
+        }
+
+
+class AsyncSingleFlight(SingleFlight):
+    """SingleFlight for coroutines on one event loop
+
+    ``fn`` is an async callable. Waiting for the leader, or for another
+    worker holding the cross-worker lock, awaits instead of blocking the
+    loop. The lock store and ``lookup`` calls are SQLite operations that can
+    wait out a busy timeout under contention, so they run in threads.
+    """
+
+    async def do(self, key: str, fn: Callable, lookup: Optional[Callable] = None):
+        """Run ``await fn()`` once per key across concurrent callers and return its result"""
+        task = self._inflight.get(key)
+        if task is None:
+            # A task of its own, so the call completes (and fills the caches)
+            # even if the client that started it disconnects
+            task = asyncio.ensure_future(self._lead(key, fn, lookup))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+            self.leaders += 1
+            return await asyncio.shield(task)
+
+        self.coalesced += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.wait_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise SingleFlightTimeout(f'Timed out after {self.wait_timeout:.0f}s waiting for in-flight request')
+
+    async def _lead(self, key: str, fn: Callable, lookup: Optional[Callable]):
+        try:
+            return await self._run_leader_async(key, fn, lookup)
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_leader_async(self, key: str, fn: Callable, lookup: Optional[Callable]):
+        if self.lock_store is None:
+            return await fn()
+
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+        while True:
+            if await asyncio.to_thread(self.lock_store.acquire_lock, key, self._owner, self.lock_ttl):
+                try:
+                    return await fn()
+                finally:
+                    await asyncio.to_thread(self.lock_store.release_lock, key, self._owner)
+
+            if not waited:
+                waited = True
+                self.remote_coalesced += 1
+            if lookup is not None:
+                result = await asyncio.to_thread(lookup, key)
+                if result is not None:
+                    return result
+            if time.monotonic() >= deadline:
+                self.timeouts += 1
+                raise SingleFlightTimeout(f'Timed out after {self.wait_timeout:.0f}s waiting for another worker')
+            await asyncio.sleep(self.poll_interval)
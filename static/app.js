@@ -0,0 +1,294 @@
+let summaryCount = 0;
+let messageCount = 0;
+
+function escapeHtml(text) {
+    const map = {
+        '&': '&amp;',
+        '<': '&lt;',
+        '>': '&gt;',
+        '"': '&quot;',
+        "'": '&#039;'
+    };
+    return text.replace(/[&<>"']/g, m => map[m]);
+}
+
+function switchTab(tabName) {
+    document.querySelectorAll('.tab-content').forEach(el => el.classList.remove('active'));
+    document.querySelectorAll('.tab-btn').forEach(el => el.classList.remove('active'));
+
+    document.getElementById(tabName).classList.add('active');
+    event.target.classList.add('active');
+}
+
+async function summarizeVideo() {
+    const url = document.getElementById('youtube-url').value;
+    const format = document.getElementById('output-format').value;
+    const outputDiv = document.getElementById('summary-output');
+
+    if (!url.trim()) {
+        outputDiv.innerHTML = '<div class="error">❌ Please enter a YouTube URL</div>';
+        return;
+    }
+
+    outputDiv.innerHTML = '<div class="info"><div class="loading"></div> Processing...</div>';
+
+    try {
+        const response = await fetch('/api/summarize', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ url, format, mode: 'job' })
+        });
+
+        let data;
+        try {
+            data = await response.json();
+        } catch (parseError) {
+            outputDiv.innerHTML = `<div class="error">❌ Server error: Invalid response format. ${response.statusText}</div>`;
+            return;
+        }
+
+        if (data.success && data.job_id) {
+            data = await waitForJob(data.job_id);
+        }
+
+        if (data.success) {
+            summaryCount++;
+            document.getElementById('stat-summaries').textContent = summaryCount;
+
+            const summary = data.summary;
+            const format = data.format;
+            let summaryHTML = `
+                <div class="success">✅ Summary generated successfully!</div>
+                <div class="stats">
+                    <div class="stat-box">
+                        <div class="stat-value">${data.video_id}</div>
+                        <div class="stat-label">Video ID</div>
+                    </div>
+                    <div class="stat-box">
+                        <div class="stat-value">${format}</div>
+                        <div class="stat-label">Format</div>
+                    </div>
+                </div>
+                <div class="output-box">
+            `;
+
+            if (format === "Summary") {
+                summaryHTML += `
+                    <h4>📝 Video Summary</h4>
+                    <div class="summary-section">
+                        <h5>📌 Title</h5>
+                        <p>${escapeHtml(summary.title)}</p>
+                    </div>
+                    <div class="summary-section">
+                        <h5>📖 Description</h5>
+                        <p>${escapeHtml(summary.description)}</p>
+                    </div>
+                    <div class="summary-section">
+                        <h5>✨ Summary</h5>
+                        <p>${escapeHtml(summary.summary)}</p>
+                    </div>
+                    ${summary.topics && summary.topics.length > 0 ? `
+                    <div class="summary-section">
+                        <h5>🎯 Topics</h5>
+                        <ul class="summary-list">
+                            ${summary.topics.map(t => `<li>${escapeHtml(t)}</li>`).join('')}
+                        </ul>
+                    </div>
+                    ` : ''}
+                `;
+            }
+            else if (format === "Timestamps") {
+                summaryHTML += `
+                    <h4>⏱️ Video Timestamps</h4>
+                    <div class="summary-section">
+                        <h5>📌 Title</h5>
+                        <p>${escapeHtml(summary.title)}</p>
+                    </div>
+                    <div class="summary-section">
+                        <h5>⏱️ Timeline</h5>
+                        ${summary.timestamps.length > 0 ? `
+                        <ul class="summary-list">
+                            ${summary.timestamps.map(ts => `<li><strong>${ts.time}</strong> - ${escapeHtml(ts.description)}</li>`).join('')}
+                        </ul>
+                        ` : '<p>No chapter markers found for this video.</p>'}
+                    </div>
+                    <div class="summary-section">
+                        <h5>📹 Duration</h5>
+                        <p>${summary.total_duration}</p>
+                    </div>
+                `;
+            }
+            else if (format === "Key Points") {
+                summaryHTML += `
+                    <h4>🔑 Key Points</h4>
+                    <div class="summary-section">
+                        <h5>📌 Title</h5>
+                        <p>${escapeHtml(summary.title)}</p>
+                    </div>
+                    <div class="summary-section">
+                        <h5>🔑 Main Points</h5>
+                        <ul class="summary-list">
+                            ${summary.key_points.map(kp => `<li>${escapeHtml(kp)}</li>`).join('')}
+                        </ul>
+                    </div>
+                    ${summary.topics && summary.topics.length > 0 ? `
+                    <div class="summary-section">
+                        <h5>🎯 Topics Covered</h5>
+                        <ul class="summary-list">
+                            ${summary.topics.map(t => `<li>${escapeHtml(t)}</li>`).join('')}
+                        </ul>
+                    </div>
+                    ` : ''}
+                `;
+            }
+            else if (format === "Full Transcript") {
+                summaryHTML += `
+                    <h4>📄 Full Transcript</h4>
+                    <div class="summary-section">
+                        <h5>📌 Title</h5>
+                        <p>${escapeHtml(summary.title)}</p>
+                    </div>
+                    <div class="summary-section">
+                        <h5>📹 Channel</h5>
+                        <p>${summary.channel}</p>
+                    </div>
+                    <div class="summary-section">
+                        <h5>📖 Full Description</h5>
+                        <p>${escapeHtml(summary.full_description)}</p>
+                    </div>
+                    <div class="summary-section">
+                        <h5>✨ Summary</h5>
+                        <p>${escapeHtml(summary.summary)}</p>
+                    </div>
+                    ${summary.topics && summary.topics.length > 0 ? `
+                    <div class="summary-section">
+                        <h5>🎯 Topics</h5>
+                        <ul class="summary-list">
+                            ${summary.topics.map(t => `<li>${escapeHtml(t)}</li>`).join('')}
+                        </ul>
+                    </div>
+                    ` : ''}
+                    <div class="summary-section">
+                        <h5>🔗 Video URL</h5>
+                        <p><a href="${escapeHtml(summary.url)}" target="_blank" style="color: #ff8c00; text-decoration: none;">${escapeHtml(summary.url)}</a></p>
+                    </div>
+                `;
+            }
+
+            summaryHTML += `
+                    <div class="summary-section">
+                        <h5>📊 Raw Data</h5>
+                        <pre>${JSON.stringify(summary, null, 2)}</pre>
+                    </div>
+                </div>
+            `;
+
+            outputDiv.innerHTML = summaryHTML;
+        } else {
+            outputDiv.innerHTML = `<div class="error">❌ ${data.error}</div>`;
+        }
+    } catch (error) {
+        outputDiv.innerHTML = `<div class="error">❌ Error: ${error.message}</div>`;
+    }
+}
+
+async function waitForJob(jobId) {
+    // Long-poll the job until the server reports it finished
+    while (true) {
+        const response = await fetch(`/api/jobs/${jobId}?wait=25`);
+        const job = await response.json();
+        if (!job.success) {
+            return { success: false, error: job.error };
+        }
+        if (job.status === 'done') {
+            return job.result;
+        }
+        if (job.status === 'error') {
+            return { success: false, error: job.error };
+        }
+        // Every long-poll slot was busy: the server answered at once, so back off
+        const retryAfter = parseFloat(response.headers.get('Retry-After'));
+        if (retryAfter > 0) {
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+        }
+    }
+}
+
+function clearSummary() {
+    document.getElementById('youtube-url').value = '';
+    document.getElementById('summary-output').innerHTML = '';
+}
+
+async function sendMessage() {
+    const input = document.getElementById('chat-input');
+    const message = input.value.trim();
+
+    if (!message) return;
+
+    const chatHistory = document.getElementById('chat-history');
+
+    // Add user message
+    const userDiv = document.createElement('div');
+    userDiv.className = 'chat-message chat-user';
+    userDiv.textContent = 'You: ' + message;
+    chatHistory.appendChild(userDiv);
+
+    input.value = '';
+    chatHistory.scrollTop = chatHistory.scrollHeight;
+
+    // Bot message is filled in as chunks stream in
+    const botDiv = document.createElement('div');
+    botDiv.className = 'chat-message chat-bot';
+    botDiv.textContent = 'AI: ';
+    chatHistory.appendChild(botDiv);
+
+    try {
+        const response = await fetch('/api/chat/stream', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ message })
+        });
+
+        if (!(response.headers.get('content-type') || '').includes('text/event-stream')) {
+            const data = await response.json();
+            botDiv.textContent = 'AI: ' + data.response;
+        } else {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                for (const raw of events) {
+                    const eventLine = raw.split('\n').find(l => l.startsWith('event: '));
+                    const dataLine = raw.split('\n').find(l => l.startsWith('data: '));
+                    if (!eventLine || !dataLine) continue;
+                    const event = eventLine.slice(7);
+                    const payload = JSON.parse(dataLine.slice(6));
+                    if (event === 'chunk') {
+                        botDiv.textContent += payload.text;
+                    } else if (event === 'error') {
+                        botDiv.textContent = 'AI: ' + payload.error;
+                    }
+                    chatHistory.scrollTop = chatHistory.scrollHeight;
+                }
+            }
+        }
+
+        messageCount += 2;
+        document.getElementById('stat-messages').textContent = messageCount;
+        chatHistory.scrollTop = chatHistory.scrollHeight;
+    } catch (error) {
+        botDiv.textContent = 'AI: Error - ' + error.message;
+    }
+}
+
+function clearChat() {
+    document.getElementById('chat-history').innerHTML = '';
+    fetch('/api/clear-chat', { method: 'POST' });
+    messageCount = 0;
+    document.getElementById('stat-messages').textContent = '0';
+}
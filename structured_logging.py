@@ -0,0 +1,133 @@
+import contextvars
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import traceback
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Per-request context, propagated to job threads with contextvars.copy_context()
+request_id = contextvars.ContextVar('request_id', default=None)
+sampled = contextvars.ContextVar('sampled', default=True)
+stage_timings = contextvars.ContextVar('stage_timings', default=None)
+
+# Attributes every LogRecord has; anything else came in through ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request ID and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_type'] = record.exc_info[0].__name__
+            entry['traceback'] = ''.join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development (LOG_FORMAT=text)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = ' '.join(f'{k}={v}' for k, v in record.__dict__.items() if k not in _RECORD_ATTRS)
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            line += ' ' + fields
+        if record.exc_info:
+            line += '\n' + ''.join(traceback.format_exception(*record.exc_info))
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Drop sub-WARNING records of requests that were not picked for sampling"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or sampled.get()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that never blocks the caller and does no formatting
+
+    The record is stamped with the request ID and handed to the writer
+    thread as is; message interpolation, JSON encoding and traceback
+    formatting all happen there. When the queue is full the record is
+    dropped and counted instead.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.enqueued = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        current = request_id.get()
+        if current is not None and 'request_id' not in record.__dict__:
+            record.request_id = current
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Root logging routed through a bounded queue to a background writer thread"""
+
+    def __init__(self, level: str = 'INFO', fmt: str = 'json', queue_size: int = 10000, stream=None):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.handler.addFilter(SamplingFilter())
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(TextFormatter() if fmt == 'text' else JsonFormatter())
+        self.listener = QueueListener(self.queue, output)
+        self._reported_drops = 0
+        self._lock = threading.Lock()
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            if isinstance(existing, NonBlockingQueueHandler):
+                root.removeHandler(existing)
+        root.addHandler(self.handler)
+        root.setLevel(level.upper())
+        self.listener.start()
+
+    def report_drops(self, logger: logging.Logger) -> None:
+        """Log how many records were dropped since the last report, if any"""
+        with self._lock:
+            new = self.handler.dropped - self._reported_drops
+            self._reported_drops = self.handler.dropped
+        if new:
+            logger.warning('log records dropped', extra={'dropped': new})
+
+    def stop(self) -> None:
+        self.listener.stop()
+
+    def stats(self) -> dict:
+        return {
+            'queued': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'enqueued': self.handler.enqueued,
+            'dropped': self.handler.dropped,
+        }
+
+
+def add_stage_timing(stage: str, seconds: float) -> None:
+    """Add a stage duration to the current request's timings, if one is being tracked"""
+    timings: Optional[dict] = stage_timings.get()
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0) + seconds * 1000, 2)
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class SummaryCache:
+    """In-process LRU cache of raw n8n responses keyed by video ID
+
+    Only the raw webhook response is stored; every output format is derived
+    from it by ``format_summary_by_type`` so switching formats never goes
+    back to n8n.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024,
+                 ttl: float = 6 * 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # video_id -> (expires_at, size, raw)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _sizeof(raw) -> int:
+        return len(json.dumps(raw, ensure_ascii=False, default=str).encode('utf-8'))
+
+    def get(self, video_id: str) -> Optional[dict]:
+        """Return the cached raw response for a video, or None"""
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, raw = entry
+            if expires_at <= time.monotonic():
+                self._remove(video_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(video_id)
+            self.hits += 1
+            return raw
+
+    def put(self, video_id: str, raw: dict) -> bool:
+        """Store a raw response; returns False if it exceeds the byte cap"""
+        size = self._sizeof(raw)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if video_id in self._entries:
+                self._remove(video_id)
+            self._entries[video_id] = (time.monotonic() + self.ttl, size, raw)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, video_id: str) -> None:
+        with self._lock:
+            if video_id in self._entries:
+                self._remove(video_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, video_id: str) -> None:
+        _, size, _ = self._entries.pop(video_id)
+        self._bytes -= size
+
+    def __contains__(self, video_id: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(video_id)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    video_id    TEXT PRIMARY KEY,
+    payload     BLOB NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    expires_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_expires ON summaries (expires_at);
+CREATE INDEX IF NOT EXISTS idx_summaries_accessed ON summaries (accessed_at);
+CREATE TABLE IF NOT EXISTS locks (
+    name       TEXT PRIMARY KEY,
+    owner      TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id     TEXT PRIMARY KEY,
+    state      BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SummaryStore:
+    """SQLite-backed summary store shared by every worker on a node
+
+    The database runs in WAL mode so readers in one gunicorn worker never
+    block a writer in another. Payloads are zlib-compressed JSON. A daemon
+    thread periodically deletes rows that expired more than ``stale_grace``
+    seconds ago, trims the table to ``max_rows`` and vacuums when enough
+    pages are free. Until then an expired row can still be served as a
+    fallback when the webhook fails.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_rows: int = 10000,
+                 sweep_interval: float = 300, start_sweeper: bool = True,
+                 stale_grace: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.stale_grace = stale_grace
+        self.max_rows = max_rows
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._sweeper = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.swept = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+        if start_sweeper and sweep_interval > 0:
+            self._sweeper = threading.Thread(target=self._sweep_loop,
+                                             name='summary-store-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version != SCHEMA_VERSION:
+                # Stored summaries are a cache of n8n output, so an
+                # incompatible schema is simply rebuilt.
+                conn.execute('DROP TABLE IF EXISTS summaries')
+                conn.execute('DROP TABLE IF EXISTS locks')
+                conn.execute('DROP TABLE IF EXISTS jobs')
+            for statement in SCHEMA.strip().split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _encode(raw: dict) -> bytes:
+        return zlib.compress(json.dumps(raw, ensure_ascii=False).encode('utf-8'), 6)
+
+    @staticmethod
+    def _decode(blob: bytes) -> dict:
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def get(self, video_id: str, include_expired: bool = False) -> Optional[dict]:
+        """Return the stored raw response for a video, or None
+
+        ``include_expired`` also returns rows up to ``stale_grace`` seconds
+        past their TTL, for use as a fallback when the webhook fails.
+        """
+        now = time.time()
+        row = self._connect().execute(
+            'SELECT payload, accessed_at FROM summaries WHERE video_id = ? AND expires_at > ?',
+            (video_id, now - self.stale_grace if include_expired else now)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Only touch the row once a minute to keep reads mostly write-free
+        if now - row[1] > 60:
+            self._connect().execute(
+                'UPDATE summaries SET accessed_at = ? WHERE video_id = ?', (now, video_id)
+            )
+        return self._decode(row[0])
+
+    def contains(self, video_id: str) -> bool:
+        """Whether a live row exists, without decoding it or counting a hit"""
+        return self._connect().execute(
+            'SELECT 1 FROM summaries WHERE video_id = ? AND expires_at > ?', (video_id, time.time())
+        ).fetchone() is not None
+
+    def put(self, video_id: str, raw: dict) -> None:
+        """Insert or replace the raw response for a video"""
+        now = time.time()
+        self._connect().execute(
+            'INSERT OR REPLACE INTO summaries (video_id, payload, created_at, accessed_at, expires_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (video_id, self._encode(raw), now, now, now + self.ttl)
+        )
+        self.writes += 1
+
+    def delete(self, video_id: str) -> None:
+        self._connect().execute('DELETE FROM summaries WHERE video_id = ?', (video_id,))
+
+    def recent(self, limit: int) -> Iterator[Tuple[str, dict]]:
+        """Yield the most recently used live entries, newest first"""
+        rows = self._connect().execute(
+            'SELECT video_id, payload FROM summaries WHERE expires_at > ? '
+            'ORDER BY accessed_at DESC LIMIT ?',
+            (time.time(), limit)
+        )
+        for video_id, blob in rows:
+            yield video_id, self._decode(blob)
+
+    def acquire_lock(self, name: str, owner: str, ttl: float) -> bool:
+        """Take a named cross-worker lease; expired leases are reclaimed"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM locks WHERE name = ? AND expires_at <= ?', (name, now))
+            acquired = conn.execute(
+                'INSERT OR IGNORE INTO locks (name, owner, expires_at) VALUES (?, ?, ?)',
+                (name, owner, now + ttl)
+            ).rowcount == 1
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return acquired
+
+    def release_lock(self, name: str, owner: str) -> None:
+        self._connect().execute('DELETE FROM locks WHERE name = ? AND owner = ?', (name, owner))
+
+    def save_job(self, job_id: str, state: dict, expires_at: float) -> None:
+        """Publish a job's status so any worker can answer polls for it"""
+        self._connect().execute(
+            'INSERT OR REPLACE INTO jobs (job_id, state, expires_at) VALUES (?, ?, ?)',
+            (job_id, self._encode(state), expires_at)
+        )
+
+    def load_job(self, job_id: str) -> Optional[dict]:
+        row = self._connect().execute(
+            'SELECT state FROM jobs WHERE job_id = ? AND expires_at > ?', (job_id, time.time())
+        ).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def sweep(self) -> int:
+        """Delete rows past the stale grace, trim to max_rows and compact; returns rows removed"""
+        conn = self._connect()
+        now = time.time()
+        removed = conn.execute('DELETE FROM summaries WHERE expires_at <= ?', (now - self.stale_grace,)).rowcount
+        conn.execute('DELETE FROM locks WHERE expires_at <= ?', (now,))
+        conn.execute('DELETE FROM jobs WHERE expires_at <= ?', (now,))
+        count = conn.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+        if count > self.max_rows:
+            removed += conn.execute(
+                'DELETE FROM summaries WHERE video_id IN ('
+                'SELECT video_id FROM summaries ORDER BY accessed_at ASC LIMIT ?)',
+                (count - self.max_rows,)
+            ).rowcount
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        total_pages = conn.execute('PRAGMA page_count').fetchone()[0]
+        if total_pages and free_pages / total_pages > 0.25:
+            conn.execute('VACUUM')
+        conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        self.swept += removed
+        return removed
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except sqlite3.Error as e:
+                logger.warning('summary store sweep failed', extra={'error': str(e)})
+
+    def close(self) -> None:
+        self._stop.set()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        rows = conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM summaries').fetchone()
+        return {
+            'path': self.path,
+            'schema_version': SCHEMA_VERSION,
+            'rows': rows[0],
+            'compressed_bytes': rows[1],
+            'max_rows': self.max_rows,
+            'ttl_seconds': self.ttl,
+            'stale_grace_seconds': self.stale_grace,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'swept': self.swept,
+        }
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The Flask app module, configured for tests before its first import"""
+    os.environ.update({
+        'SUMMARY_DB_PATH': str(tmp_path_factory.mktemp('store') / 'summaries.db'),
+        'WEBHOOK_URL': 'http://127.0.0.1:9/webhook',
+        'LLM_BACKENDS': 'fake:0',
+        'CHAT_RATE': '0',
+        'SUMMARIZE_RATE': '0',
+        'CHAT_CACHE_MAX_ENTRIES': '0',
+        'LOG_LEVEL': 'WARNING',
+    })
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,40 @@
+"""Stand-ins for the Gemini model used by the chat tests"""
+import threading
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Answers every prompt with ``chunks`` and records what it was sent
+
+    ``generate_content(contents, stream=True)`` yields the chunks one by one,
+    raising at ``fail_at`` if set; ``closed`` tells whether a stream was
+    abandoned before its last chunk.
+    """
+
+    def __init__(self, chunks=('Hello', ', ', 'world'), fail_at=None):
+        self.chunks = list(chunks)
+        self.fail_at = fail_at
+        self.calls = []
+        self.closed = threading.Event()
+
+    def generate_content(self, contents, stream=False):
+        self.calls.append(contents)
+        if not stream:
+            return _Chunk(''.join(self.chunks))
+        return self._stream()
+
+    def _stream(self):
+        finished = False
+        try:
+            for index, text in enumerate(self.chunks):
+                if index == self.fail_at:
+                    raise RuntimeError('model failed')
+                yield _Chunk(text)
+            finished = True
+        finally:
+            if not finished:
+                self.closed.set()
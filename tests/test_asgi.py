@@ -0,0 +1,63 @@
+"""Async serving mode: blocking store calls stay off the event loop"""
+import asyncio
+import time
+
+import pytest
+
+
+@pytest.fixture
+def asgi(app_module):
+    import asgi
+    return asgi
+
+
+def run_with_ticker(coroutine):
+    """Run coroutine while a ticker records how often the loop got to run"""
+    async def scenario():
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(ticker())
+        try:
+            return await coroutine, ticks
+        finally:
+            task.cancel()
+
+    return asyncio.run(scenario())
+
+
+def longest_stall(ticks):
+    return max(later - earlier for earlier, later in zip(ticks, ticks[1:]))
+
+
+def test_store_lookup_runs_off_the_loop(asgi, monkeypatch):
+    def slow_lookup(video_id):
+        time.sleep(0.2)
+        return {'id': video_id, 'title': 'Stored'}
+
+    monkeypatch.setattr(asgi.wsgi, 'lookup_summary', slow_lookup)
+    result, ticks = run_with_ticker(asgi.get_summary('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ', 'Summary'))
+    assert result['title'] == 'Stored'
+    assert longest_stall(ticks) < 0.1
+
+
+def test_store_write_and_stale_fallback_run_off_the_loop(asgi, monkeypatch):
+    def slow(result):
+        def call(*args):
+            time.sleep(0.1)
+            return result(*args)
+        return call
+
+    async def failing_fetch(youtube_url, output_format):
+        raise asgi.wsgi.WebhookError('n8n down')
+
+    monkeypatch.setattr(asgi.wsgi, 'lookup_summary', slow(lambda video_id: None))
+    monkeypatch.setattr(asgi.wsgi, 'stored_fallback', slow(lambda video_id, error: {'title': 'Stale'}))
+    monkeypatch.setattr(asgi, 'fetch_summary', failing_fetch)
+    result, ticks = run_with_ticker(asgi.get_summary('https://youtu.be/9bZkp7q19f0', '9bZkp7q19f0', 'Summary'))
+    assert result == {'title': 'Stale'}
+    assert longest_stall(ticks) < 0.08
@@ -0,0 +1,66 @@
+"""Bounded fan-out in batch.map_unordered and the batch admission group"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batch import map_unordered
+
+
+def test_results_and_errors_are_yielded_per_item():
+    def square(n):
+        if n == 3:
+            raise ValueError('three')
+        return n * n
+
+    results = {item: (result, error) for item, result, error in map_unordered(square, range(6), max_workers=2)}
+    assert {item: result for item, (result, error) in results.items() if error is None} == {
+        0: 0, 1: 1, 2: 4, 4: 16, 5: 25}
+    assert isinstance(results[3][1], ValueError)
+
+
+def test_shared_executor_caps_concurrency_across_callers():
+    lock = threading.Lock()
+    running = peak = 0
+
+    def work(_):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        callers = [threading.Thread(target=lambda: list(map_unordered(work, range(10), max_workers=4,
+                                                                        executor=executor)))
+                   for _ in range(3)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+    assert peak == 2
+
+
+def test_closing_early_cancels_only_its_own_pending_calls():
+    started = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other = executor.submit(lambda: 'other')
+        results = map_unordered(lambda n: started.append(n) or time.sleep(0.02), range(20),
+                                max_pending=4, executor=executor)
+        next(results)
+        results.close()
+        assert other.result() == 'other'
+        assert executor.submit(lambda: 'still usable').result() == 'still usable'
+    assert len(started) < 20
+
+
+def test_open_batch_stream_leaves_summarize_slots_free(client, app_module):
+    response = client.post('/api/summarize/batch', json={'urls': ['not a url']}, buffered=False)
+    try:
+        next(response.response)
+        assert app_module.batch_admission[1].stats()['active'] == 1
+        assert app_module.summarize_admission[1].idle()
+    finally:
+        response.close()
+    assert app_module.batch_admission[1].stats()['active'] == 0
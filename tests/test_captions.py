@@ -0,0 +1,110 @@
+"""Caption parsing: SRT/WebVTT cues, json3 events and the transcript cache"""
+import io
+import json
+
+import pytest
+
+import captions
+from captions import CaptionError, TranscriptCache, parse_captions
+from extractive import split_sentences, summarize_locally
+
+
+def parse(tmp_path, content, name):
+    path = tmp_path / name
+    path.write_bytes(content.encode('utf-8') if isinstance(content, str) else content)
+    return list(parse_captions(str(path)))
+
+
+def test_srt_cues_with_tags_and_entities(tmp_path):
+    srt = ("1\n00:00:01,000 --> 00:00:03,500\n<i>Hello</i> &amp; welcome\n\n"
+           "2\n00:00:04,000 --> 00:00:06,000\nto the show\nsecond line\n")
+    assert parse(tmp_path, srt, 'a.srt') == [
+        (1.0, 3.5, 'Hello & welcome'), (4.0, 6.0, 'to the show second line')]
+
+
+def test_empty_cue_does_not_swallow_the_next_one(tmp_path):
+    srt = ("1\n00:00:01,000 --> 00:00:02,000\n\n"
+           "2\n00:00:02,000 --> 00:00:03,000\nsecond\n\n"
+           "3\n00:00:03,000 --> 00:00:04,000\n"
+           "4\n00:00:04,000 --> 00:00:05,000\nfourth\n")
+    assert parse(tmp_path, srt, 'a.srt') == [(2.0, 3.0, 'second'), (4.0, 5.0, 'fourth')]
+
+
+def test_rolling_vtt_lines_are_not_repeated(tmp_path):
+    vtt = ("WEBVTT\n\n"
+           "00:00.000 --> 00:02.000 align:start\nthe engine turns\n\n"
+           "00:02.000 --> 00:04.000\nthe engine turns\nthe crankshaft\n\n"
+           "00:04.000 --> 00:06.000\nthe crankshaft\nand the wheels\n")
+    segments = parse(tmp_path, vtt, 'a.vtt')
+    assert [text for _, _, text in segments] == ['the engine turns', 'the crankshaft', 'and the wheels']
+
+
+def test_unpunctuated_transcript_still_yields_key_points():
+    words = ('so today we look at how the engine turns fuel into motion and why torque '
+             'matters more than power when you pull a heavy trailer up a hill ').split()
+    transcript = ' '.join(words * 10)
+    sentences = split_sentences(transcript, max_words=20)
+    assert sentences and all(len(sentence.split()) <= 20 for sentence in sentences)
+    local = summarize_locally({'transcript': transcript})
+    assert local and local['key_points']
+
+
+def json3(events):
+    return json.dumps({'wireMagic': 'pb3', 'events': events})
+
+
+def test_json3_events_across_decode_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(captions, 'JSON3_CHUNK', 7)
+    events = [{'tStartMs': 0, 'dDurationMs': 1500, 'segs': [{'utf8': 'Grüße '}, {'utf8': 'aus Köln'}]},
+              {'tStartMs': 1500, 'segs': [{'utf8': '\n'}]},
+              {'tStartMs': 2000, 'dDurationMs': 500, 'segs': [{'utf8': 'zweite Zeile ✓'}]}]
+    assert parse(tmp_path, json3(events), 'a.json3') == [
+        (0.0, 1.5, 'Grüße aus Köln'), (2.0, 2.5, 'zweite Zeile ✓')]
+
+
+@pytest.mark.parametrize('content', [
+    '{"wireMagic": "pb3"}',
+    '{"events": {"tStartMs": 0}}',
+    '{"events": [{"tStartMs": 0, "segs": [{"utf8": "cut off',
+    '{"events": ["not an event"]}',
+    '{"events": [{"tStartMs": "0", "segs": [{"utf8": "x"}]}]}',
+    '{"events": [{"tStartMs": 0, "segs": ["x"]}]}',
+])
+def test_malformed_json3_is_a_caption_error(tmp_path, content):
+    with pytest.raises(CaptionError):
+        parse(tmp_path, content, 'a.json3')
+
+
+def test_nbytes_counts_the_joined_transcript(tmp_path):
+    path = tmp_path / 'a.srt'
+    path.write_text('1\n00:00:01,000 --> 00:00:02,000\n' + 'word ' * 200 + '\n')
+    segments = parse_captions(str(path))
+    before = segments.nbytes
+    segments.text()
+    assert segments.nbytes >= before + 1000
+
+
+def test_transcript_cache_accounting_survives_eviction(tmp_path):
+    path = tmp_path / 'a.srt'
+    path.write_text('1\n00:00:01,000 --> 00:00:02,000\n' + 'word ' * 200 + '\n')
+    first = parse_captions(str(path))
+    cache = TranscriptCache(max_bytes=first.nbytes * 4)
+    for index in range(6):
+        cache.put(f'video{index:06d}', parse_captions(str(path)))
+    stats = cache.stats()
+    assert stats['bytes'] <= stats['max_bytes']
+    assert stats['bytes'] == sum(cache.get(video_id).nbytes for video_id in list(cache._items))
+
+
+def test_upload_too_large_is_rejected(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'CAPTIONS_MAX_BYTES', 100)
+    data = {'video_id': 'dQw4w9WgXcQ', 'file': (io.BytesIO(b'x' * 500), 'a.srt')}
+    with client.post('/api/captions', data=data, content_type='multipart/form-data') as response:
+        assert response.status_code == 413
+
+
+def test_malformed_json3_upload_is_a_bad_request(client):
+    data = {'video_id': 'dQw4w9WgXcQ', 'file': (io.BytesIO(b'{"events": [42]}'), 'a.json3')}
+    with client.post('/api/captions', data=data, content_type='multipart/form-data') as response:
+        assert response.status_code == 400
+        assert not response.get_json()['success']
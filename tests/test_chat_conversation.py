@@ -0,0 +1,123 @@
+"""Pooled models and per-session conversations, measured against a fake model"""
+import sys
+import threading
+
+from fakes import FakeModel
+from gemini_chat import CONTEXT_ACK, ChatConversation, ModelPool, estimate_tokens
+from session_store import SessionStore
+
+CONTEXT = 'Title: Engines explained\nChannel: Garage'
+
+
+def test_model_pool_builds_each_model_once():
+    built = []
+    pool = ModelPool(lambda name: built.append(name) or object())
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(pool.get('gemini-2.5-flash'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert built == ['gemini-2.5-flash']
+    assert len({id(model) for model in models}) == 1
+    assert pool.get('other') is not models[0]
+
+
+def test_each_call_sends_the_context_once_then_the_turns():
+    model = FakeModel()
+    history = []
+    conversation = ChatConversation(model, context=CONTEXT, history=history)
+    for message in ('What is torque?', 'And power?', 'Which matters more?'):
+        reply = conversation.send(message)
+        history.append({'user': message, 'bot': reply})
+
+    last = model.calls[-1]
+    assert sum(CONTEXT in content['parts'][0] for content in last) == 1
+    assert last[1] == {'role': 'model', 'parts': [CONTEXT_ACK]}
+    assert [c['parts'][0] for c in last[2:]] == [
+        'What is torque?', 'Hello, world', 'And power?', 'Hello, world', 'Which matters more?']
+
+
+def test_usage_reports_the_tokens_actually_sent():
+    model = FakeModel()
+    history = []
+    conversation = ChatConversation(model, context=CONTEXT, history=history)
+    for turn, message in enumerate(('What is torque?', 'And power?')):
+        reply = conversation.send(message)
+        usage = conversation.last_usage
+        sent = sum(estimate_tokens(content['parts'][0]) for content in model.calls[-1])
+        assert usage['prompt_tokens'] == sent
+        assert usage['prompt_tokens'] == usage['context_tokens'] + usage['history_tokens'] + usage['message_tokens']
+        assert usage['message_tokens'] == estimate_tokens(message)
+        assert usage['baseline_tokens'] == usage['context_tokens'] + usage['message_tokens']
+        assert usage['history_turns'] == turn
+        history.append({'user': message, 'bot': reply})
+    # The API is stateless: the context is paid on every message, and history on top of it
+    totals = conversation.usage()
+    assert totals['turns'] == 2
+    assert totals['prompt_tokens_total'] > 2 * conversation.context_tokens
+    assert totals['prompt_tokens_total'] - totals['baseline_tokens_total'] == conversation.last_usage['history_tokens']
+
+
+def test_excerpts_are_sent_with_their_question_only():
+    model = FakeModel()
+    history = []
+    conversation = ChatConversation(model, context=CONTEXT, history=history)
+    reply = conversation.send('What is torque?', excerpts=['[Summary] Torque is twisting force.'])
+    assert 'Torque is twisting force.' in model.calls[-1][-1]['parts'][0]
+    history.append({'user': 'What is torque?', 'bot': reply})
+    conversation.send('And power?')
+    assert not any('twisting force' in content['parts'][0] for content in model.calls[-1])
+
+
+def test_a_new_video_starts_a_new_conversation_and_history(client, app_module, monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(app_module, 'get_chat_model', lambda: model)
+    raw = {'title': 'Engines explained', 'channel': 'Garage', 'summary': 'Torque is twisting force.'}
+    app_module.summary_cache.put('dQw4w9WgXcQ', raw)
+    with client.post('/api/summarize', json={'url': 'https://youtu.be/dQw4w9WgXcQ'}) as response:
+        assert response.get_json()['success']
+
+    usages = []
+    for message in ('What is torque?', 'And power?'):
+        with client.post('/api/chat', json={'message': message}) as response:
+            usages.append(response.get_json()['usage'])
+    assert usages[0]['context_tokens'] == usages[1]['context_tokens'] > 0
+    assert usages[1]['history_turns'] == 1
+    assert 'Title: Engines explained' in model.calls[0][0]['parts'][0]
+    assert len(model.calls[1]) == len(model.calls[0]) + 2
+
+    app_module.summary_cache.put('9bZkp7q19f0', {'title': 'Gearboxes', 'summary': 'Ratios.'})
+    with client.post('/api/summarize', json={'url': 'https://youtu.be/9bZkp7q19f0'}) as response:
+        assert response.get_json()['success']
+    with client.post('/api/chat', json={'message': 'What about ratios?'}) as response:
+        assert response.get_json()['usage']['history_turns'] == 0
+    assert 'Title: Gearboxes' in model.calls[-1][0]['parts'][0]
+    assert not any('torque' in content['parts'][0] for content in model.calls[-1])
+
+
+def test_history_is_snapshotted_while_other_requests_add_turns():
+    # Iterating the live deque here raised 'deque mutated during iteration'
+    store = SessionStore(max_history=2000)
+    session, _ = store.get_or_create(None)
+    for _ in range(2000):
+        store.add_turn(session, 'question', 'answer')
+    conversation = ChatConversation(FakeModel(), context=CONTEXT, history=session.chat_history, lock=session.lock)
+    stop = threading.Event()
+
+    def add_turns():
+        while not stop.is_set():
+            store.add_turn(session, 'question', 'answer')
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    writer = threading.Thread(target=add_turns)
+    writer.start()
+    try:
+        for _ in range(200):
+            conversation.send('What is torque?')
+    finally:
+        stop.set()
+        writer.join()
+        sys.setswitchinterval(interval)
+    assert conversation.usage()['turns'] == 200
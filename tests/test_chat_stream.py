@@ -0,0 +1,80 @@
+"""/api/chat/stream against a fake model that yields chunks"""
+import json
+
+import pytest
+
+from fakes import FakeModel
+
+
+def read_events(body):
+    """(event, data) pairs from a Server-Sent Events body"""
+    events = []
+    for raw in body.strip().split('\n\n'):
+        lines = raw.split('\n')
+        event = next(line[7:] for line in lines if line.startswith('event: '))
+        data = next(line[6:] for line in lines if line.startswith('data: '))
+        events.append((event, json.loads(data)))
+    return events
+
+
+@pytest.fixture
+def model(app_module, monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(app_module, 'get_chat_model', lambda: model)
+    return model
+
+
+def test_chunks_are_forwarded_as_they_arrive(client, model, app_module):
+    with client.post('/api/chat/stream', json={'message': 'What is torque?'}) as response:
+        assert response.mimetype == 'text/event-stream'
+        events = read_events(response.get_data(as_text=True))
+    assert events[:-1] == [('chunk', {'text': 'Hello'}), ('chunk', {'text': ', '}), ('chunk', {'text': 'world'})]
+    event, done = events[-1]
+    assert event == 'done'
+    assert done['ttft_ms'] is not None and done['ttft_ms'] <= done['total_ms']
+    assert app_module.chat_stream_stats.stats()['ttft_last_ms'] is not None
+
+
+def test_finished_reply_enters_the_session_history(client, model, app_module):
+    with client.post('/api/chat/stream', json={'message': 'What is torque?'}) as response:
+        response.get_data()
+    with client.post('/api/chat/stream', json={'message': 'And power?'}) as response:
+        response.get_data()
+    second_prompt = model.calls[-1]
+    assert {'role': 'user', 'parts': ['What is torque?']} in second_prompt
+    assert {'role': 'model', 'parts': ['Hello, world']} in second_prompt
+
+
+def test_disconnect_stops_generation(client, model, app_module):
+    cancelled = app_module.chat_stream_stats.stats()['cancelled']
+    response = client.post('/api/chat/stream', json={'message': 'What is torque?'}, buffered=False)
+    first = next(response.response)
+    assert b'Hello' in first
+    response.close()
+    assert model.closed.is_set()
+    assert app_module.chat_stream_stats.stats()['cancelled'] == cancelled + 1
+
+
+def test_abandoned_reply_is_not_kept_in_history(client, model):
+    response = client.post('/api/chat/stream', json={'message': 'What is torque?'}, buffered=False)
+    next(response.response)
+    response.close()
+    with client.post('/api/chat/stream', json={'message': 'And power?'}) as response:
+        response.get_data()
+    assert {'role': 'user', 'parts': ['What is torque?']} not in model.calls[-1]
+
+
+def test_model_error_becomes_an_error_event(client, app_module, monkeypatch):
+    model = FakeModel(fail_at=1)
+    monkeypatch.setattr(app_module, 'get_chat_model', lambda: model)
+    with client.post('/api/chat/stream', json={'message': 'What is torque?'}) as response:
+        events = read_events(response.get_data(as_text=True))
+    assert events[0] == ('chunk', {'text': 'Hello'})
+    assert events[-1][0] == 'error'
+    assert 'model failed' in events[-1][1]['error']
+
+
+def test_empty_message_is_rejected(client, model):
+    with client.post('/api/chat/stream', json={'message': '  '}) as response:
+        assert response.get_json() == {'response': 'Please enter a message'}
+    assert model.calls == []
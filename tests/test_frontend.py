@@ -0,0 +1,52 @@
+"""Content-encoding negotiation and caching headers for the page and assets"""
+import gzip
+
+import pytest
+
+import frontend
+from frontend import Asset, parse_accept_encoding
+
+BODY = b'body { color: #333; }\n' * 200
+
+
+@pytest.fixture
+def asset():
+    return Asset(BODY, 'text/css; charset=utf-8', frontend.IMMUTABLE)
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding('gzip, br;q=0.5, identity;q=bad') == {'gzip': 1.0, 'br': 0.5, 'identity': 0.0}
+    assert parse_accept_encoding(None) == {}
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, 'identity'),
+    ('gzip', 'gzip'),
+    ('gzip;q=0.5, identity;q=0.8', 'identity'),
+    ('*', 'br' if frontend.brotli else 'gzip'),
+    ('br;q=0, gzip;q=0', 'identity'),
+    ('gzip;q=0, *;q=0.1', 'br' if frontend.brotli else 'identity'),
+])
+def test_negotiate_picks_the_best_accepted_encoding(asset, header, expected):
+    assert asset.negotiate(header) == expected
+
+
+@pytest.mark.parametrize('header', ['gzip;q=0, identity;q=0', 'gzip;q=0, *;q=0', 'br;q=0, gzip;q=0, identity;q=0'])
+def test_negotiate_never_picks_a_refused_encoding(asset, header):
+    assert asset.negotiate(header) is None
+
+
+def test_refused_encodings_get_406(client):
+    with client.get('/', headers={'Accept-Encoding': 'gzip;q=0, identity;q=0'}) as response:
+        assert response.status_code == 406
+        assert 'Content-Encoding' not in response.headers
+
+
+def test_gzip_page_and_revalidation(client):
+    with client.get('/', headers={'Accept-Encoding': 'gzip'}) as response:
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert b'<html' in gzip.decompress(response.data).lower()
+        etag = response.headers['ETag']
+    with client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}) as response:
+        assert response.status_code == 304
@@ -0,0 +1,290 @@
+"""WebhookClient against a local stub HTTP server that answers from a script"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_client import WebhookClient
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, DeadlineExceeded
+
+
+class ScriptedServer(ThreadingHTTPServer):
+    """Answers POSTs with the next (status, delay) from ``script``; 200 once it runs out
+
+    A status of ``None`` reads the request and then drops the connection
+    without answering.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ScriptedHandler)
+        self.script = []
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.url = f'http://127.0.0.1:{self.server_port}/webhook'
+
+    def next_reply(self):
+        with self.lock:
+            self.requests += 1
+            return self.script.pop(0) if self.script else (200, 0)
+
+    def handle_error(self, request, client_address):
+        # Clients that time out or hang up early break the pipe; that is expected here
+        pass
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('content-length', 0)))
+        status, delay = self.server.next_reply()
+        time.sleep(delay)
+        if status is None:
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        out = json.dumps({'echo': json.loads(body or b'{}')}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ScriptedServer()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client(**kwargs):
+    options = {'connect_timeout': 2, 'read_timeout': 2, 'backoff_base': 0.01, 'backoff_max': 0.05}
+    options.update(kwargs)
+    return WebhookClient(**options)
+
+
+def test_connections_are_reused(stub):
+    webhook = client()
+    for index in range(5):
+        response = webhook.post_json(stub.url, {'n': index})
+        assert response.json() == {'echo': {'n': index}}
+    assert stub.connections == 1
+    stats = webhook.stats()
+    assert stats['requests_sent'] == 5
+    assert stats['handshakes_saved'] == 4
+
+
+def test_transient_gateway_errors_are_retried(stub):
+    stub.script = [(503, 0), (502, 0)]
+    webhook = client(max_retries=2)
+    assert webhook.post_json(stub.url, {}).status_code == 200
+    assert stub.requests == 3
+    assert webhook.stats()['retries'] == 2
+
+
+def test_retries_stop_at_max_retries(stub):
+    stub.script = [(503, 0)] * 5
+    webhook = client(max_retries=2)
+    assert webhook.post_json(stub.url, {}).status_code == 503
+    assert stub.requests == 3
+    assert webhook.stats()['retry_exhausted'] == 1
+
+
+def test_other_errors_are_not_retried(stub):
+    stub.script = [(500, 0), (404, 0)]
+    webhook = client()
+    assert webhook.post_json(stub.url, {}).status_code == 500
+    assert webhook.post_json(stub.url, {}).status_code == 404
+    assert stub.requests == 2
+    assert webhook.stats()['retries'] == 0
+
+
+def test_gateway_timeouts_are_not_retried(stub):
+    # The gateway gave up waiting, but n8n may still finish the workflow
+    stub.script = [(504, 0)]
+    webhook = client(max_retries=2)
+    assert webhook.post_json(stub.url, {}).status_code == 504
+    assert stub.requests == 1
+
+
+def test_connection_dropped_after_sending_is_not_retried(stub):
+    stub.script = [(None, 0)]
+    webhook = client(max_retries=2)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        webhook.post_json(stub.url, {})
+    assert stub.requests == 1
+    assert webhook.stats()['retries'] == 0
+
+
+def test_read_timeouts_are_not_retried(stub):
+    # The workflow may still be running, so a second call could run it twice
+    stub.script = [(200, 1.0)]
+    webhook = client(read_timeout=0.2)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        webhook.post_json(stub.url, {})
+    assert stub.requests == 1
+
+
+def test_connection_errors_are_retried_then_raised():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    webhook = client(max_retries=2)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        webhook.post_json(f'http://127.0.0.1:{port}/webhook', {})
+    assert webhook.stats()['retries'] == 2
+
+
+def test_deadline_bounds_all_attempts(stub):
+    stub.script = [(503, 0.15)] * 10
+    webhook = client(max_retries=10, deadline=0.4)
+    started = time.monotonic()
+    with pytest.raises((DeadlineExceeded, requests.exceptions.ReadTimeout)):
+        webhook.post_json(stub.url, {})
+    assert time.monotonic() - started < 1.0
+
+
+def test_open_breaker_fails_fast(stub):
+    stub.script = [(503, 0)] * 10
+    webhook = client(max_retries=0, breaker=CircuitBreaker('n8n', min_calls=2, open_seconds=60))
+    for _ in range(2):
+        assert webhook.post_json(stub.url, {}).status_code == 503
+    with pytest.raises(CircuitOpenError):
+        webhook.post_json(stub.url, {})
+    assert stub.requests == 2
+
+
+def tripped_breaker(open_seconds=0.1):
+    breaker = CircuitBreaker('n8n', min_calls=2, open_seconds=open_seconds)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record(True)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_breaker_lets_one_probe_through_after_open_seconds():
+    breaker = tripped_breaker()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    time.sleep(0.15)
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.rejected == 2
+
+
+def test_successful_probe_closes_breaker(stub):
+    breaker = tripped_breaker()
+    webhook = client(max_retries=0, breaker=breaker)
+    time.sleep(0.15)
+    assert webhook.post_json(stub.url, {}).status_code == 200
+    assert breaker.state == CLOSED
+    assert webhook.post_json(stub.url, {}).status_code == 200
+    assert stub.requests == 2
+    assert breaker.trips == 1
+
+
+def test_failed_probe_reopens_breaker(stub):
+    stub.script = [(503, 0)]
+    breaker = tripped_breaker()
+    webhook = client(max_retries=0, breaker=breaker)
+    time.sleep(0.15)
+    assert webhook.post_json(stub.url, {}).status_code == 503
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+    with pytest.raises(CircuitOpenError):
+        webhook.post_json(stub.url, {})
+    assert stub.requests == 1
+
+
+class RecordingClient(WebhookClient):
+    """Keeps every response so tests can see which ones were closed"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.responses = []
+
+    def _post(self, url, payload, timeout):
+        response = super()._post(url, payload, timeout)
+        response.closed = False
+        close = response.close
+
+        def record_close():
+            response.closed = True
+            close()
+
+        response.close = record_close
+        self.responses.append(response)
+        return response
+
+
+def hedging_client(**kwargs):
+    options = {'connect_timeout': 2, 'read_timeout': 2, 'max_retries': 0, 'hedge': True,
+               'hedge_min_delay': 0.1, 'hedge_min_samples': 5}
+    options.update(kwargs)
+    webhook = RecordingClient(**options)
+    for _ in range(5):
+        webhook.latencies.add(0.01)
+    return webhook
+
+
+def test_fast_first_response_sends_no_hedge(stub):
+    webhook = hedging_client()
+    assert webhook.post_json(stub.url, {'n': 1}).json() == {'echo': {'n': 1}}
+    assert stub.requests == 1
+    assert webhook.stats()['hedges_sent'] == 0
+    webhook.close()
+
+
+def test_slow_request_is_hedged_and_loser_dropped(stub):
+    stub.script = [(200, 0.6), (200, 0)]
+    webhook = hedging_client()
+    started = time.monotonic()
+    response = webhook.post_json(stub.url, {'n': 2})
+    assert time.monotonic() - started < 0.5
+    assert response.json() == {'echo': {'n': 2}}
+    stats = webhook.stats()
+    assert stats['hedges_sent'] == 1
+    assert stats['hedge_wins'] == 1
+    assert stats['requests_sent'] == 2
+
+    # The slow original still finishes; its response is closed, not returned
+    for _ in range(40):
+        if len(webhook.responses) == 2:
+            break
+        time.sleep(0.05)
+    winner, loser = webhook.responses
+    assert winner is response
+    time.sleep(0.05)
+    assert loser.closed
+    assert not winner.closed
+    webhook.close()
+
+
+def test_original_wins_when_hedge_is_slower(stub):
+    stub.script = [(200, 0.2), (200, 1.0)]
+    webhook = hedging_client()
+    webhook.post_json(stub.url, {})
+    stats = webhook.stats()
+    assert stats['hedges_sent'] == 1
+    assert stats['hedge_wins'] == 0
+    webhook.close()
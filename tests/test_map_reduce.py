@@ -0,0 +1,114 @@
+"""Chunking and map-reduce summarization with the deterministic FakeBackend"""
+import random
+
+import pytest
+
+from gemini_chat import estimate_tokens
+from map_reduce import MAP_PROMPT, REDUCE_PROMPT, SEPARATOR, FakeBackend, MapReduceSummarizer, chunk_text
+
+WORDS = 'engine torque fuel piston gear brake wheel crankshaft clutch exhaust'.split()
+
+
+def transcript(sentences=300, seed=0):
+    rng = random.Random(seed)
+    return ' '.join(' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() + '.'
+                    for _ in range(sentences))
+
+
+def cost(chunk):
+    return sum(estimate_tokens(word + ' ') for word in chunk.split())
+
+
+class Recording(FakeBackend):
+    """FakeBackend that keeps every prompt and can fail on chosen text"""
+
+    def __init__(self, fail_on=None):
+        super().__init__()
+        self.prompts = []
+        self.fail_on = fail_on
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError('model unavailable')
+        return super().__call__(prompt)
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text('') == [] and chunk_text('   ') == []
+    assert MapReduceSummarizer(FakeBackend()).summarize('') is None
+
+
+def test_chunks_fit_the_window_overlap_and_cover_every_word():
+    text = transcript()
+    chunks = chunk_text(text, max_tokens=200, overlap_tokens=30)
+    assert len(chunks) > 3
+    assert all(cost(chunk) <= 200 for chunk in chunks)
+    for earlier, later in zip(chunks, chunks[1:]):
+        shared = later.split()[:3]
+        assert ' '.join(shared) in earlier
+    words = text.split()
+    assert chunks[0].split() == words[:len(chunks[0].split())]
+    assert chunks[-1].split() == words[-len(chunks[-1].split()):]
+
+
+def test_chunks_end_at_sentence_boundaries():
+    chunks = chunk_text(transcript(), max_tokens=200, overlap_tokens=30)
+    assert all(chunk.endswith('.') for chunk in chunks)
+
+
+def test_an_edit_keeps_later_chunks_unchanged():
+    text = transcript()
+    edited = 'A brand new opening sentence about the engine. ' + text
+    before = set(chunk_text(text, max_tokens=200, overlap_tokens=30))
+    after = chunk_text(edited, max_tokens=200, overlap_tokens=30)
+    assert sum(chunk in before for chunk in after) >= len(after) - 3
+
+
+def test_partial_summaries_are_reduced_to_one():
+    backend = Recording()
+    summarizer = MapReduceSummarizer(backend, chunk_tokens=200, overlap_tokens=30, fan_in=3)
+    result = summarizer.summarize(transcript())
+    maps = [p for p in backend.prompts if p.startswith(MAP_PROMPT.split(SEPARATOR)[0])]
+    reduces = [p for p in backend.prompts if p.startswith(REDUCE_PROMPT.split(SEPARATOR)[0])]
+    assert len(maps) == result['chunks'] > 3
+    assert result['reduce_levels'] >= 2
+    assert len(reduces) >= result['reduce_levels']
+    assert result['llm_calls'] == len(backend.prompts)
+    assert result['summary']
+
+
+def test_single_chunk_needs_no_reduce():
+    result = MapReduceSummarizer(FakeBackend(), chunk_tokens=3000).summarize('Short text about torque. ' * 5)
+    assert (result['chunks'], result['reduce_levels'], result['llm_calls']) == (1, 0, 1)
+
+
+def test_repeat_run_is_served_from_the_cache():
+    backend = Recording()
+    summarizer = MapReduceSummarizer(backend, chunk_tokens=200, overlap_tokens=30)
+    text = transcript()
+    first = summarizer.summarize(text)
+    second = summarizer.summarize(text)
+    assert second['summary'] == first['summary']
+    assert second['llm_calls'] == 0
+    assert second['cached_calls'] == first['llm_calls'] + first['cached_calls']
+
+
+def test_failing_map_call_fails_the_run_and_is_retried_alone():
+    text = transcript()
+    chunks = chunk_text(text, max_tokens=200, overlap_tokens=30)
+    target = chunks[2].split('.')[1]
+    backend = Recording(fail_on=target)
+    summarizer = MapReduceSummarizer(backend, chunk_tokens=200, overlap_tokens=30, max_workers=2)
+    with pytest.raises(RuntimeError, match='model unavailable'):
+        summarizer.summarize(text)
+
+    backend.fail_on = None
+    backend.prompts.clear()
+    result = summarizer.summarize(text)
+    assert result['summary']
+    # Chunks summarized before the failure come from the cache; the failed one is sent again
+    map_calls = [p for p in backend.prompts if p.startswith(MAP_PROMPT.split(SEPARATOR)[0])]
+    assert result['cached_calls'] >= 1
+    assert len(map_calls) < len(chunks)
+    assert any(target in p for p in map_calls)
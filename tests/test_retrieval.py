@@ -0,0 +1,58 @@
+"""Passage splitting, BM25 ranking and the per-video index cache"""
+from retrieval import IndexCache, RetrievalIndex, build_index, split_passages, tokenize
+
+PASSAGES = [
+    'The engine burns fuel to push the pistons.',
+    'Torque is the twisting force at the crankshaft; torque moves heavy loads.',
+    'The gearbox trades speed for torque through its ratios.',
+    'Brakes turn motion into heat.',
+]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize('What is THE torque, at 2000 rpm?') == ['torque', '2000', 'rpm']
+
+
+def test_sentences_are_grouped_up_to_max_words():
+    text = 'One two three four. Five six seven eight. Nine ten eleven twelve.'
+    assert split_passages(text, max_words=8) == ['One two three four. Five six seven eight.',
+                                                 'Nine ten eleven twelve.']
+
+
+def test_oversized_sentence_is_cut_into_max_words_windows():
+    # Unpunctuated auto-captions arrive as one huge "sentence"
+    words = [f'w{i}' for i in range(25)]
+    passages = split_passages('Short intro here. ' + ' '.join(words), max_words=10)
+    assert all(len(passage.split()) <= 10 for passage in passages)
+    assert ' '.join(passages).split() == ['Short', 'intro', 'here.'] + words
+
+
+def test_bm25_ranks_the_most_specific_passage_first():
+    index = RetrievalIndex(PASSAGES)
+    ranked = [position for _, position in index.search('how much torque at the crankshaft', k=4)]
+    assert ranked[0] == 1
+    assert set(ranked) == {1, 2}
+    assert index.search('windscreen wipers') == []
+
+
+def test_select_keeps_original_order_and_token_budget():
+    index = RetrievalIndex(PASSAGES)
+    assert index.select('torque gearbox ratios', k=2, token_budget=600) == [PASSAGES[1], PASSAGES[2]]
+    # Only one passage fits; the best one is kept
+    assert index.select('torque gearbox ratios', k=2, token_budget=18) == [PASSAGES[2]]
+
+
+def test_unmatched_question_falls_back_to_the_opening_passage():
+    assert RetrievalIndex(PASSAGES).select('windscreen wipers', token_budget=5) == [PASSAGES[0][:20]]
+
+
+def test_index_labels_fields_and_cache_evicts_least_recently_used():
+    index = build_index({'summary': 'Torque explained.', 'transcript': 'We measure torque on a dyno.'})
+    assert index.passages == ['[Summary] Torque explained.', '[Transcript] We measure torque on a dyno.']
+    cache = IndexCache(max_entries=2)
+    for video_id in ('a', 'b'):
+        cache.build(video_id, {'summary': 'Torque explained.'})
+    cache.get('a')
+    cache.build('c', {'summary': 'Brakes.'})
+    assert cache.get('b') is None and cache.get('a') is not None
+    assert cache.stats()['indexes'] == 2
@@ -0,0 +1,217 @@
+"""SingleFlight and AsyncSingleFlight: coalescing, errors, timeouts and cross-worker locks"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import AsyncSingleFlight, SingleFlight, SingleFlightTimeout
+from summary_store import SummaryStore
+
+KEY = 'dQw4w9WgXcQ'
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SummaryStore(str(tmp_path / 'summaries.db'), start_sweeper=False)
+    yield store
+    store.close()
+
+
+def run_callers(flight, fn, count):
+    """Start count callers of flight.do(KEY, fn); returns (threads, outcomes)"""
+    outcomes = []
+
+    def call():
+        try:
+            outcomes.append(('ok', flight.do(KEY, fn)))
+        except Exception as e:
+            outcomes.append(('error', e))
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(2)
+        return {'summary': 'once'}
+
+    threads, outcomes = run_callers(flight, fn, 10)
+    wait_for(lambda: flight.stats()['coalesced'] == 9)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert outcomes == [('ok', {'summary': 'once'})] * 10
+    assert flight.stats()['inflight'] == 0
+
+
+def test_leader_error_reaches_every_follower():
+    flight = SingleFlight()
+    release = threading.Event()
+    error = RuntimeError('webhook down')
+
+    def fn():
+        release.wait(2)
+        raise error
+
+    threads, outcomes = run_callers(flight, fn, 5)
+    wait_for(lambda: flight.stats()['coalesced'] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert outcomes == [('error', error)] * 5
+    # The key is free again, so the next caller retries
+    assert flight.do(KEY, lambda: 'retried') == 'retried'
+
+
+def test_follower_gives_up_after_wait_timeout():
+    flight = SingleFlight(wait_timeout=0.05)
+    release = threading.Event()
+    threads, outcomes = run_callers(flight, lambda: release.wait(2) and 'late', 1)
+    wait_for(lambda: flight.stats()['inflight'] == 1)
+    with pytest.raises(SingleFlightTimeout):
+        flight.do(KEY, lambda: 'never called')
+    release.set()
+    threads[0].join()
+    assert outcomes == [('ok', 'late')]
+    assert flight.stats()['timeouts'] == 1
+
+
+def test_result_published_by_another_worker_is_used(store):
+    store.acquire_lock(KEY, 'other-worker', 60)
+    flight = SingleFlight(lock_store=store, poll_interval=0.01)
+    published = []
+    threading.Timer(0.05, lambda: published.append({'summary': 'from the other worker'})).start()
+    result = flight.do(KEY, lambda: pytest.fail('must not call upstream'),
+                       lookup=lambda key: published[0] if published else None)
+    assert result == {'summary': 'from the other worker'}
+    assert flight.stats()['remote_coalesced'] == 1
+
+
+def test_stale_lock_of_another_worker_is_taken_over(store):
+    # The other worker died holding the lock; it expires after its TTL
+    assert store.acquire_lock(KEY, 'crashed-worker', 0.1)
+    flight = SingleFlight(lock_store=store, poll_interval=0.01)
+    started = time.monotonic()
+    assert flight.do(KEY, lambda: 'taken over', lookup=lambda key: None) == 'taken over'
+    assert time.monotonic() - started >= 0.1
+    assert flight.stats()['remote_coalesced'] == 1
+    # The new owner released the lock when it finished
+    assert store.acquire_lock(KEY, 'next-worker', 60)
+
+
+def test_lock_held_past_wait_timeout_raises(store):
+    store.acquire_lock(KEY, 'other-worker', 60)
+    flight = SingleFlight(wait_timeout=0.05, lock_store=store, poll_interval=0.01)
+    with pytest.raises(SingleFlightTimeout):
+        flight.do(KEY, lambda: 'never called', lookup=lambda key: None)
+
+
+def test_async_callers_share_one_call():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return 'once'
+
+        results = await asyncio.gather(*(flight.do(KEY, fn) for _ in range(10)))
+        return calls, results, flight.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == ['once'] * 10
+    assert stats['coalesced'] == 9 and stats['inflight'] == 0
+
+
+def test_async_leader_error_and_follower_timeout():
+    async def scenario():
+        flight = AsyncSingleFlight(wait_timeout=0.05)
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('webhook down')
+
+        errors = await asyncio.gather(flight.do(KEY, fail), flight.do(KEY, fail), return_exceptions=True)
+
+        async def slow():
+            await asyncio.sleep(0.2)
+            return 'late'
+
+        leader = asyncio.ensure_future(flight.do(KEY, slow))
+        await asyncio.sleep(0)
+        with pytest.raises(SingleFlightTimeout):
+            await flight.do(KEY, slow)
+        return errors, await leader
+
+    errors, late = asyncio.run(scenario())
+    assert [str(e) for e in errors] == ['webhook down'] * 2
+    assert late == 'late'
+
+
+def test_async_stale_lock_is_taken_over(store):
+    assert store.acquire_lock(KEY, 'crashed-worker', 0.1)
+
+    async def fn():
+        return 'taken over'
+
+    flight = AsyncSingleFlight(lock_store=store, poll_interval=0.01)
+    assert asyncio.run(flight.do(KEY, fn, lookup=lambda key: None)) == 'taken over'
+    assert flight.stats()['remote_coalesced'] == 1
+
+
+class SlowLockStore:
+    """A lock store whose calls block like SQLite waiting out a busy timeout"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def acquire_lock(self, name, owner, ttl):
+        time.sleep(self.delay)
+        return True
+
+    def release_lock(self, name, owner):
+        time.sleep(self.delay)
+
+
+def test_async_lock_store_calls_do_not_block_the_loop():
+    async def scenario():
+        flight = AsyncSingleFlight(lock_store=SlowLockStore(0.1))
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def fn():
+            return 'done'
+
+        task = asyncio.ensure_future(ticker())
+        result = await flight.do(KEY, fn)
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert result == 'done'
+    # The loop kept running while acquire and release each blocked for 0.1 s
+    assert len(ticks) >= 10
+    assert max(later - earlier for earlier, later in zip(ticks, ticks[1:])) < 0.08
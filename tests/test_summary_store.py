@@ -0,0 +1,120 @@
+"""SummaryStore against a real SQLite file in a temporary directory"""
+import sqlite3
+import time
+
+import pytest
+
+from summary_store import SCHEMA_VERSION, SummaryStore
+
+RAW = {'id': 'dQw4w9WgXcQ', 'title': 'Engines explained', 'summary': 'Torque and fuel mixture. ' * 50}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'summaries.db')
+
+
+@pytest.fixture
+def store(db_path):
+    store = SummaryStore(db_path, start_sweeper=False)
+    yield store
+    store.close()
+
+
+def test_round_trip(store):
+    store.put('dQw4w9WgXcQ', RAW)
+    assert store.get('dQw4w9WgXcQ') == RAW
+    assert store.contains('dQw4w9WgXcQ')
+    assert store.get('9bZkp7q19f0') is None
+    assert (store.hits, store.misses, store.writes) == (1, 1, 1)
+
+
+def test_payloads_are_compressed(store):
+    store.put('dQw4w9WgXcQ', RAW)
+    assert store.stats()['compressed_bytes'] < len(RAW['summary'])
+
+
+def test_workers_share_one_file(db_path, store):
+    # A second store on the same path stands in for another gunicorn worker
+    other = SummaryStore(db_path, start_sweeper=False)
+    try:
+        store.put('dQw4w9WgXcQ', RAW)
+        assert other.get('dQw4w9WgXcQ') == RAW
+        other.delete('dQw4w9WgXcQ')
+        assert store.get('dQw4w9WgXcQ') is None
+    finally:
+        other.close()
+
+
+def test_expired_rows_are_hidden_but_kept_for_the_fallback(db_path):
+    store = SummaryStore(db_path, ttl=-1, stale_grace=60, start_sweeper=False)
+    store.put('dQw4w9WgXcQ', RAW)
+    assert store.get('dQw4w9WgXcQ') is None
+    assert not store.contains('dQw4w9WgXcQ')
+    assert list(store.recent(10)) == []
+    assert store.sweep() == 0
+    assert store.get('dQw4w9WgXcQ', include_expired=True) == RAW
+    store.close()
+
+
+def test_sweep_deletes_rows_past_the_grace(db_path):
+    store = SummaryStore(db_path, ttl=-10, stale_grace=5, start_sweeper=False)
+    store.put('dQw4w9WgXcQ', RAW)
+    assert store.sweep() == 1
+    assert store.get('dQw4w9WgXcQ', include_expired=True) is None
+    store.close()
+
+
+def test_sweep_trims_to_max_rows_least_recently_used_first(db_path):
+    store = SummaryStore(db_path, max_rows=2, start_sweeper=False)
+    for video_id in ('aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc'):
+        store.put(video_id, RAW)
+        time.sleep(0.01)
+    assert store.sweep() == 1
+    assert store.get('aaaaaaaaaaa') is None
+    assert store.stats()['rows'] == 2
+    store.close()
+
+
+def test_recent_returns_newest_first_for_warm_start(store):
+    for video_id in ('aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc'):
+        store.put(video_id, {'id': video_id})
+        time.sleep(0.01)
+    assert [video_id for video_id, _ in store.recent(2)] == ['ccccccccccc', 'bbbbbbbbbbb']
+
+
+def test_schema_version_mismatch_rebuilds_the_tables(db_path, store):
+    store.put('dQw4w9WgXcQ', RAW)
+    store.close()
+    conn = sqlite3.connect(db_path)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION - 1}')
+    conn.close()
+    reopened = SummaryStore(db_path, start_sweeper=False)
+    assert reopened.get('dQw4w9WgXcQ') is None
+    assert reopened.stats()['schema_version'] == SCHEMA_VERSION
+    reopened.close()
+
+
+def test_locks_are_exclusive_until_released_or_expired(db_path, store):
+    other = SummaryStore(db_path, start_sweeper=False)
+    try:
+        assert store.acquire_lock('scan', 'worker-1', ttl=60)
+        assert not other.acquire_lock('scan', 'worker-2', ttl=60)
+        other.release_lock('scan', 'worker-2')  # not the owner: no effect
+        assert not other.acquire_lock('scan', 'worker-2', ttl=60)
+        store.release_lock('scan', 'worker-1')
+        assert other.acquire_lock('scan', 'worker-2', ttl=-1)
+        assert store.acquire_lock('scan', 'worker-1', ttl=60)
+    finally:
+        other.close()
+
+
+def test_jobs_are_visible_to_other_workers_until_they_expire(db_path, store):
+    other = SummaryStore(db_path, start_sweeper=False)
+    try:
+        store.save_job('job-1', {'status': 'running'}, time.time() + 60)
+        store.save_job('job-2', {'status': 'done'}, time.time() - 1)
+        assert other.load_job('job-1') == {'status': 'running'}
+        assert other.load_job('job-2') is None
+    finally:
+        other.close()
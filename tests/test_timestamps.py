@@ -0,0 +1,80 @@
+"""Chapter markers and TextTiling segmentation on synthetic transcripts"""
+import random
+
+from timestamps import format_time, generate_timestamps, parse_chapter_markers, parse_time, segment_transcript
+
+TOPICS = [
+    'guitar chord string fret strum tuning pick amp riff melody',
+    'bread flour yeast oven dough knead crust bake rise loaf',
+    'planet orbit star galaxy telescope gravity comet moon nebula light',
+    'engine piston fuel torque gear clutch exhaust brake tire wheel',
+]
+FILLER = 'the a and then so we you it is that this of to in'.split()
+
+
+def transcript(durations, seed=0, segment_seconds=3.0):
+    """Timed segments covering TOPICS[i] for durations[i] seconds each"""
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    for topic, duration in enumerate(durations):
+        vocab = TOPICS[topic % len(TOPICS)].split()
+        end = t + duration
+        while t < end:
+            words = [rng.choice(vocab) if rng.random() < 0.6 else rng.choice(FILLER) for _ in range(9)]
+            segments.append((t, t + segment_seconds, ' '.join(words)))
+            t += segment_seconds
+    return segments
+
+
+def test_time_round_trip():
+    assert parse_time('1:02:03') == 3723
+    assert format_time(3723) == '1:02:03'
+    assert format_time(75) == '1:15'
+
+
+def test_chapter_markers_stop_where_times_go_backwards():
+    description = ('Intro text\n0:00 Intro\n[2:30] - Setup\nTuning the strings | 10:05\n'
+                   'More videos:\n0:45 Another video\n3:00 And another')
+    chapters = parse_chapter_markers(description)
+    assert [(c['seconds'], c['description']) for c in chapters] == [
+        (0, 'Intro'), (150, 'Setup'), (605, 'Tuning the strings')]
+    assert parse_chapter_markers('Only one marker at 0:00 Intro') == []
+
+
+def test_every_topic_change_starts_a_chapter():
+    for seed in range(5):
+        starts = [c['seconds'] for c in segment_transcript(transcript([600, 600, 600], seed=seed))]
+        assert starts[0] == 0
+        for change in (600, 1200):
+            assert any(abs(start - change) <= 60 for start in starts), (seed, starts)
+        # Chapters closer together than min_chapter_seconds are never produced
+        assert all(later - earlier >= 120 for earlier, later in zip(starts, starts[1:]))
+
+
+def test_max_chapters_keeps_the_topic_changes():
+    chapters = segment_transcript(transcript([600, 600, 600]), max_chapters=3)
+    assert len(chapters) == 3
+    for found, expected in zip(chapters, (0, 600, 1200)):
+        assert abs(found['seconds'] - expected) <= 60
+    # Titles are the chapter's most distinctive terms
+    for found, topic in zip(chapters, TOPICS):
+        assert set(found['description'].lower().split(', ')) <= set(topic.split())
+
+
+def test_merge_measures_the_last_chapter_to_the_end_of_the_transcript():
+    # The 30-minute final topic must not count as zero length and be folded into its neighbour
+    starts = [c['seconds'] for c in segment_transcript(transcript([600, 600, 600, 1800]), max_chapters=4)]
+    assert len(starts) == 4
+    for found, expected in zip(starts, (0, 600, 1200, 1800)):
+        assert abs(found - expected) <= 60
+
+
+def test_generate_timestamps_prefers_webhook_then_description_then_transcript():
+    webhook = [{'time': '0:00', 'seconds': 0, 'description': 'From n8n'}]
+    assert generate_timestamps({'timestamps': webhook}) == (webhook, 'webhook')
+    chapters, source = generate_timestamps({'description': '0:00 Intro\n1:00 Main', 'segments': transcript([600])})
+    assert source == 'description' and len(chapters) == 2
+    chapters, source = generate_timestamps({'segments': transcript([600, 600])})
+    assert source == 'transcript' and len(chapters) >= 2
+    assert generate_timestamps({}) == ([], 'none')
@@ -0,0 +1,124 @@
+"""Generated round-trip tests for video_id: every link shape YouTube hands out
+parses back to the ID, playlist and start time it was built from"""
+import random
+
+import pytest
+
+from video_id import ID_CHARS, VideoRef, extract_video_id, is_video_id, parse_many, parse_start, parse_video_url
+
+CASES = 500
+SEEDS = range(4)
+
+
+def random_token(rng, length):
+    return ''.join(rng.choice(ID_CHARS) for _ in range(length))
+
+
+def random_id(rng):
+    video_id = random_token(rng, 11)
+    return video_id if video_id != 'videoseries' else random_id(rng)
+
+
+def start_text(rng, seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    forms = [str(seconds), f'{seconds}s']
+    if hours:
+        forms.append(f'{hours}h{minutes}m{secs}s')
+    elif minutes:
+        forms += [f'{minutes}m{secs}s', f'{minutes}m{secs}']
+    return rng.choice(forms)
+
+
+def random_link(rng, video_id):
+    """(url, playlist, start) in one of the shapes people paste"""
+    playlist = f'PL{random_token(rng, 32)}' if rng.random() < 0.3 else None
+    start = rng.randint(1, 5 * 3600) if rng.random() < 0.3 else None
+    scheme = rng.choice(['https://', 'http://', ''])
+    host = rng.choice(['www.', '', 'm.', 'music.'])
+    shape = rng.choice(['watch', 'youtu.be', 'shorts', 'live', 'embed', 'v'])
+    query = [f'{key}={random_token(rng, 8)}' for key in rng.sample(['si', 'feature', 'pp'], rng.randint(0, 2))]
+    if shape == 'watch':
+        query.insert(rng.randint(0, len(query)), f'v={video_id}')
+        base = f'{scheme}{host}youtube.com/watch'
+    elif shape == 'youtu.be':
+        base = f'{scheme}youtu.be/{video_id}'
+    else:
+        base = f'{scheme}{host}youtube.com/{shape}/{video_id}'
+    if playlist:
+        query.append(f'list={playlist}')
+    if start is not None:
+        query.append(f"{'start' if shape == 'embed' else 't'}={start_text(rng, start)}")
+    return (f"{base}?{'&'.join(query)}" if query else base), playlist, start
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_generated_links_round_trip(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES):
+        video_id = random_id(rng)
+        url, playlist, start = random_link(rng, video_id)
+        assert parse_video_url(url) == (video_id, playlist, start), url
+        assert extract_video_id(url) == video_id, url
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_canonical_url_parses_to_the_same_id(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES):
+        ref = parse_video_url(random_link(rng, random_id(rng))[0])
+        assert parse_video_url(ref.url) == VideoRef(ref.video_id)
+        assert parse_video_url(ref.url).url == ref.url
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_ids_of_the_wrong_length_are_rejected(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES):
+        video_id = random_id(rng)
+        bad = rng.choice([video_id[:rng.randint(1, 10)], video_id + random_token(rng, rng.randint(1, 5))])
+        for url in (f'https://www.youtube.com/watch?v={bad}', f'https://youtu.be/{bad}',
+                    f'https://www.youtube.com/shorts/{bad}'):
+            assert parse_video_url(url) is None, url
+        assert not is_video_id(bad)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_ids_with_characters_outside_the_alphabet_are_rejected(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES):
+        video_id = list(random_id(rng))
+        video_id[rng.randrange(11)] = rng.choice('!$%*+.=~é ')
+        assert not is_video_id(''.join(video_id))
+
+
+@pytest.mark.parametrize('url', [
+    'https://vimeo.com/watch?v=dQw4w9WgXcQ',
+    'https://www.youtube.com.evil.example/watch?v=dQw4w9WgXcQ',
+    'https://www.youtube.com/channel/UCdQw4w9WgXcQdQw4w9WgXcQ',
+    'https://www.youtube.com/playlist?list=PLdQw4w9WgXcQ',
+    'https://www.youtube.com/embed/videoseries?list=PLdQw4w9WgXcQ',
+    'not a url',
+    '',
+])
+def test_non_video_urls_are_rejected(url):
+    assert parse_video_url(url) is None
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_start_times_in_every_notation(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES):
+        seconds = rng.randint(1, 10 * 3600)
+        text = start_text(rng, seconds)
+        assert parse_start(text) == seconds, text
+
+
+@pytest.mark.parametrize('value', ['', 'abc', '1x', 's', '1s2m', '1m1m', '١٢'])
+def test_malformed_start_times(value):
+    assert parse_start(value) is None
+
+
+def test_parse_many_keeps_order_and_rejects_non_strings():
+    urls = ['https://youtu.be/dQw4w9WgXcQ', None, 42, 'https://www.youtube.com/watch?v=9bZkp7q19f0&t=1m']
+    assert parse_many(urls) == [VideoRef('dQw4w9WgXcQ'), None, None, VideoRef('9bZkp7q19f0', None, 60)]
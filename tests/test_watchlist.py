@@ -0,0 +1,37 @@
+"""WatchlistScheduler deferring to interactive work"""
+import threading
+
+from watchlist import WatchlistScheduler
+
+VIDEO = 'dQw4w9WgXcQ'
+
+
+def scheduler(busy, summarized):
+    return WatchlistScheduler(summarize=summarized.append, is_known=lambda video_id: False,
+                              interactive_busy=busy, video_ids=[VIDEO], quota=0, idle_poll=0.01)
+
+
+def test_idle_worker_prefetches_at_once():
+    summarized = []
+    watchlist = scheduler(lambda: False, summarized)
+    assert watchlist.scan(wait=True) == 1
+    assert summarized == [VIDEO]
+    assert watchlist.stats()['deferred_for_traffic'] == 0
+
+
+def test_running_summary_job_defers_the_scheduler(app_module):
+    release = threading.Event()
+    app_module.job_manager.submit(release.wait, 5)
+    summarized = []
+    watchlist = scheduler(app_module.interactive_busy, summarized)
+    scan = threading.Thread(target=watchlist.scan, kwargs={'wait': True})
+    scan.start()
+    try:
+        scan.join(0.2)
+        assert scan.is_alive()
+        assert summarized == []
+        assert watchlist.stats()['deferred_for_traffic'] == 1
+    finally:
+        release.set()
+    scan.join(5)
+    assert summarized == [VIDEO]
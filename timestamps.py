@@ -0,0 +1,219 @@
+import math
+import re
+from collections import Counter, deque
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from retrieval import tokenize
+
+# "0:00 Intro", "[01:02:03] - Topic", "12:30 | Topic", and "Topic - 12:30"
+TIME = r"(?:\d{1,2}:)?\d{1,2}:\d{2}"
+LEADING_RE = re.compile(rf"^\s*[\[(]?({TIME})[\])]?\s*[-–—:|.)]*\s*(.+?)\s*$")
+TRAILING_RE = re.compile(rf"^\s*(.+?)\s*[-–—:|(\[]+\s*({TIME})[\])]?\s*$")
+
+Segment = Tuple[float, float, str]
+
+
+def parse_time(value: str) -> int:
+    """'1:02:03' -> 3723 seconds"""
+    seconds = 0
+    for part in value.split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def format_time(seconds: float) -> str:
+    """3723 -> '1:02:03', 75 -> '1:15'"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def chapter(seconds: float, title: str) -> dict:
+    return {'time': format_time(seconds), 'seconds': int(seconds), 'description': title}
+
+
+def parse_chapter_markers(description: str, min_chapters: int = 2) -> List[dict]:
+    """Creator-supplied chapters from a description, in one pass over its lines
+
+    Markers must be in ascending order; a line that goes backwards ends the
+    block (descriptions often list other videos' timestamps further down).
+    """
+    chapters = []
+    for line in (description or '').splitlines():
+        match = LEADING_RE.match(line)
+        if match:
+            time_text, title = match.groups()
+        else:
+            match = TRAILING_RE.match(line)
+            if not match:
+                continue
+            title, time_text = match.groups()
+        seconds = parse_time(time_text)
+        if chapters and seconds <= chapters[-1]['seconds']:
+            if len(chapters) >= min_chapters:
+                break
+            chapters = []
+        chapters.append(chapter(seconds, title.strip(' -–—|:')))
+    return chapters if len(chapters) >= min_chapters else []
+
+
+class _RunningStats:
+    """Welford mean/variance so depth thresholds need no score history"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.n) if self.n > 1 else 0.0
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    norm = math.sqrt(sum(c * c for c in a.values()) * sum(c * c for c in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def _pseudo_sentences(segments: Iterable[Segment], size: int) -> Iterator[Tuple[float, Counter]]:
+    """Regroup caption segments into fixed-size token sequences (start time, counts)"""
+    tokens = Counter()
+    count = 0
+    start = None
+    for seg_start, _, text in segments:
+        if start is None:
+            start = seg_start
+        for token in tokenize(text):
+            tokens[token] += 1
+            count += 1
+            if count >= size:
+                yield start, tokens
+                tokens, count, start = Counter(), 0, seg_start
+    if count:
+        yield start, tokens
+
+
+def segment_transcript(segments: Iterable[Segment], sentence_size: int = 20, block_size: int = 6,
+                       lookahead: int = 10, min_chapter_seconds: float = 120,
+                       max_chapters: int = 40, title_terms: int = 3) -> List[dict]:
+    """Chapter boundaries and titles from timed transcript segments (TextTiling)
+
+    Segments are consumed as a stream. Lexical similarity is computed
+    between the ``block_size`` pseudo-sentences on each side of every gap;
+    a gap becomes a boundary when it is the lowest score within
+    ``lookahead`` gaps on either side and below mean - std/2 of all scores
+    so far. Memory is bounded by these windows plus the term counts of the
+    open chapter, so multi-hour transcripts need no more memory than short
+    ones.
+    """
+    window = deque(maxlen=2 * block_size)     # (start, counts) of recent pseudo-sentences
+    gaps = deque(maxlen=2 * lookahead + 1)    # (gap start time, score) around the candidate
+    pending = deque()                         # pseudo-sentences not yet assigned to a chapter
+    boundaries = deque()                      # decided boundary times not yet applied
+    stats = _RunningStats()
+    chapters = []                             # (start, term counts)
+    doc_freq = Counter()                      # chapters containing each term
+    state = {'origin': None, 'start': None, 'terms': Counter(), 'last_boundary': None, 'end': None}
+
+    def close_chapter(next_start: Optional[float]) -> None:
+        doc_freq.update(state['terms'].keys())
+        chapters.append((state['start'], state['terms']))
+        state['start'], state['terms'] = next_start, Counter()
+
+    def assign(until: Optional[float]) -> None:
+        # Pseudo-sentences before the earliest undecided gap have a final chapter
+        while pending and (until is None or pending[0][0] < until):
+            start, counts = pending.popleft()
+            while boundaries and boundaries[0] <= start:
+                close_chapter(boundaries.popleft())
+            if state['start'] is None:
+                state['start'] = start
+            state['terms'].update(counts)
+
+    def consider(index: int) -> None:
+        gap_time, score = gaps[index]
+        scores = [s for _, s in gaps]
+        last = state['last_boundary']
+        if (score == min(scores) and score < stats.mean - stats.std / 2
+                and max(scores[:index + 1]) > score and max(scores[index:]) > score
+                and (last is None or gap_time - last >= min_chapter_seconds)
+                and gap_time - state['origin'] >= min_chapter_seconds):
+            boundaries.append(gap_time)
+            state['last_boundary'] = gap_time
+
+    def timed(segments: Iterable[Segment]) -> Iterator[Segment]:
+        for segment in segments:
+            if state['end'] is None or segment[1] > state['end']:
+                state['end'] = segment[1]
+            yield segment
+
+    for start, counts in _pseudo_sentences(timed(segments), sentence_size):
+        if state['origin'] is None:
+            state['origin'] = start
+        pending.append((start, counts))
+        window.append((start, counts))
+        if len(window) < window.maxlen:
+            continue
+        left, right = Counter(), Counter()
+        for position, (_, c) in enumerate(window):
+            (left if position < block_size else right).update(c)
+        score = _cosine(left, right)
+        stats.add(score)
+        gaps.append((window[block_size][0], score))
+        if len(gaps) == gaps.maxlen:
+            consider(lookahead)
+            assign(gaps[lookahead + 1][0])
+
+    # Stream ended: judge the remaining gaps with the context that exists
+    for index in range(lookahead + 1 if len(gaps) == gaps.maxlen else 0, len(gaps)):
+        consider(index)
+    assign(None)
+    if state['start'] is not None:
+        close_chapter(None)
+
+    # Merge down to max_chapters by joining the two adjacent chapters that are shortest together;
+    # the last chapter ends where the stream does
+    end = max(state['end'] or 0, chapters[-1][0] or 0) if chapters else 0
+    while len(chapters) > max_chapters:
+        shortest = min(range(1, len(chapters)), key=lambda i: (
+            (chapters[i + 1][0] if i + 1 < len(chapters) else end) - (chapters[i - 1][0] or 0)))
+        chapters[shortest - 1] = (chapters[shortest - 1][0], chapters[shortest - 1][1] + chapters[shortest][1])
+        del chapters[shortest]
+
+    total = len(chapters)
+    result = []
+    for start, terms in chapters:
+        ranked = sorted(terms.items(),
+                        key=lambda item: item[1] * math.log(1 + total / doc_freq[item[0]]),
+                        reverse=True)
+        title = ', '.join(term for term, _ in ranked[:title_terms]).capitalize() or 'Untitled'
+        result.append(chapter(start or 0, title))
+    return result
+
+
+def generate_timestamps(summary_data: dict) -> Tuple[List[dict], str]:
+    """Chapters for a video and where they came from"""
+    timestamps = summary_data.get('timestamps')
+    if timestamps:
+        return timestamps, 'webhook'
+    chapters = parse_chapter_markers(summary_data.get('description', ''))
+    if chapters:
+        return chapters, 'description'
+    segments = summary_data.get('segments')
+    if segments:
+        chapters = segment_transcript(segments)
+        if chapters:
+            return chapters, 'transcript'
+    return [], 'none'
@@ -0,0 +1,125 @@
+import re
+from typing import Iterable, List, NamedTuple, Optional
+
+ID_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-'
+ID_LENGTH = 11
+PLAYLIST_MAX_LENGTH = 64
+
+# The one pattern: host plus either the ID in the path (youtu.be, shorts,
+# live, embed, /v/) or a watch page, then the query and fragment. The rest
+# is plain string work.
+_URL = re.compile(
+    r'(?:https?://)?(?:(?:www|m|music)\.)?'
+    r'(?:youtu\.be/([^/?#\s]+)/?'
+    r'|youtube(?:-nocookie)?\.com(?:/(?:shorts|live|embed|v|e)/([^/?#\s]+)/?|/watch/?|/)?)'
+    r'(?:\?([^#\s]*))?(?:#(\S*))?',
+    re.IGNORECASE
+)
+_TIME_UNITS = {'h': 3600, 'm': 60, 's': 1}
+
+
+class VideoRef(NamedTuple):
+    """A YouTube URL reduced to the parts that identify what to play"""
+    video_id: str
+    playlist_id: Optional[str] = None
+    start: Optional[int] = None
+
+    @property
+    def url(self) -> str:
+        """Canonical watch URL; the same for every way of linking this video"""
+        return f'https://www.youtube.com/watch?v={self.video_id}'
+
+    def to_dict(self) -> dict:
+        return {'video_id': self.video_id, 'playlist_id': self.playlist_id, 'start': self.start}
+
+
+def is_video_id(value: str) -> bool:
+    """Exactly 11 characters of YouTube's URL-safe base64 alphabet"""
+    return len(value) == ID_LENGTH and not value.strip(ID_CHARS)
+
+
+def _playlist_id(value: Optional[str]) -> Optional[str]:
+    if value and len(value) <= PLAYLIST_MAX_LENGTH and not value.strip(ID_CHARS):
+        return value
+    return None
+
+
+def parse_start(value: Optional[str]) -> Optional[int]:
+    """Seconds from a t/start value: ``90``, ``90s``, ``1m30s`` or ``1h2m3s``"""
+    if not value or not value.isascii():
+        return None
+    if value.isdigit():
+        return int(value)
+    seconds = 0
+    number = ''
+    units = 'hms'
+    for char in value:
+        if char.isdigit():
+            number += char
+            continue
+        # Each unit at most once, in h, m, s order, with a number in front
+        position = units.find(char)
+        if position < 0 or not number:
+            return None
+        seconds += int(number) * _TIME_UNITS[char]
+        number = ''
+        units = units[position + 1:]
+    if number:
+        # A bare trailing number (``1m30``) is seconds
+        if 's' not in units:
+            return None
+        seconds += int(number)
+    return seconds
+
+
+def _param(params: str, key: str) -> Optional[str]:
+    """First ``key=`` value in ``&``-prefixed parameters, as youtube.com reads them"""
+    found = params.find(key)
+    if found < 0:
+        return None
+    found += len(key)
+    end = params.find('&', found)
+    return params[found:] if end < 0 else params[found:end]
+
+
+def parse_video_url(url: str) -> Optional[VideoRef]:
+    """VideoRef for any youtube.com / youtu.be URL that names a video, else None
+
+    Handles watch (``v=`` anywhere in the query), youtu.be, shorts, live,
+    embed and /v/ links on the www, m., music. and nocookie hosts, with or
+    without a scheme. Tracking parameters (``si``, ``feature``, ``pp``) are
+    ignored. The ID must be exactly 11 characters, so a truncated or padded
+    ID is rejected rather than used as a cache key.
+    """
+    if not isinstance(url, str):
+        return None
+    match = _URL.fullmatch(url.strip())
+    if match is None:
+        return None
+    in_path_short, in_path, query, fragment = match.groups()
+    # The query beats the fragment (#t=90)
+    params = f"&{query or ''}&{fragment or ''}" if fragment else f"&{query}" if query else ''
+
+    candidate = in_path_short or in_path or _param(params, '&v=')
+    if not candidate or not is_video_id(candidate) or candidate == 'videoseries':
+        # /embed/videoseries?list=... is a playlist player, not a video
+        return None
+    playlist_id = start = None
+    # Most links carry neither; a substring test is cheaper than the lookups
+    if 'list=' in params:
+        playlist_id = _playlist_id(_param(params, '&list='))
+    if 't=' in params:
+        start = parse_start(_param(params, '&t=') or _param(params, '&start='))
+    return VideoRef(candidate, playlist_id, start)
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """The canonical 11-character ID, the cache and dedup key for a video"""
+    ref = parse_video_url(url)
+    return ref.video_id if ref else None
+
+
+def parse_many(urls: Iterable) -> List[Optional[VideoRef]]:
+    """parse_video_url over a list; entries that aren't strings parse to None"""
+    parse = parse_video_url
+    return [parse(url) for url in urls]
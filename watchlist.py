@@ -0,0 +1,253 @@
+import logging
+import os
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+from video_id import is_video_id, parse_video_url
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'watchlist'
+QUOTA_LOCK_PREFIX = 'watchlist-quota-'
+
+
+def parse_watchlist(entries: Iterable[str]) -> List[str]:
+    """Video IDs from URLs or bare IDs, in order and without repeats
+
+    Blank entries and ``#`` comment lines are skipped; anything after the
+    first whitespace is ignored, so a line may carry a title or comment.
+    """
+    video_ids = []
+    seen = set()
+    for entry in entries:
+        fields = entry.split(None, 1)
+        if not fields or fields[0].startswith('#'):
+            continue
+        token = fields[0]
+        if is_video_id(token):
+            video_id = token
+        else:
+            video = parse_video_url(token)
+            if video is None:
+                logger.warning('watchlist entry ignored', extra={'entry': token[:200]})
+                continue
+            video_id = video.video_id
+        if video_id not in seen:
+            seen.add(video_id)
+            video_ids.append(video_id)
+    return video_ids
+
+
+def read_feed(path: str) -> List[str]:
+    """Video IDs from a local feed file
+
+    Either a text file with one URL or ID per line, or a saved YouTube
+    channel/playlist Atom feed (``<yt:videoId>`` elements, newest first).
+    """
+    with open(path, 'rb') as f:
+        head = f.read(1024).lstrip()
+        f.seek(0)
+        if not head.startswith(b'<'):
+            return parse_watchlist(f.read().decode('utf-8', errors='replace').splitlines())
+        entries = []
+        for _, element in ET.iterparse(f):
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag == 'videoId' and element.text:
+                entries.append(element.text)
+            elif tag == 'link' and element.get('href'):
+                entries.append(element.get('href'))
+            element.clear()
+        return parse_watchlist(entries)
+
+
+class WatchlistScheduler:
+    """Pre-summarizes watchlist videos in the background so first requests hit the cache
+
+    Every ``interval`` seconds the configured IDs plus those in
+    ``feed_path`` are checked with ``is_known``; each unknown video is
+    passed to ``summarize``, which is expected to fill the cache and store.
+    A video is only started while ``interactive_busy()`` is false, so
+    on-demand requests never queue behind the scheduler; it waits instead.
+    At most ``concurrency`` calls run at once, and at most ``quota`` are
+    started per ``quota_window`` seconds.
+
+    With a ``lock_store`` (``SummaryStore``) the scan and the quota are
+    shared by all gunicorn workers: one worker takes a lease for each scan,
+    and every start takes one of ``quota`` expiring lock slots.
+    """
+
+    def __init__(self, summarize: Callable[[str], object], is_known: Callable[[str], bool],
+                 interactive_busy: Callable[[], bool], video_ids: Iterable[str] = (),
+                 feed_path: Optional[str] = None, interval: float = 300, concurrency: int = 1,
+                 quota: int = 60, quota_window: float = 3600, idle_poll: float = 2,
+                 retry_max: float = 24 * 3600, lock_store=None):
+        self.summarize = summarize
+        self.is_known = is_known
+        self.interactive_busy = interactive_busy
+        self.video_ids = parse_watchlist(video_ids)
+        self.feed_path = feed_path
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.quota = quota
+        self.quota_window = quota_window
+        self.idle_poll = idle_poll
+        self.retry_max = retry_max
+        self.lock_store = lock_store
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._feed_ids = []
+        self._feed_mtime = None
+        self._slots = threading.Semaphore(self.concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='watchlist')
+        self._starts = deque()          # start times, when the quota is per process
+        self._quota_slot = 0
+        self._failures = {}             # video_id -> (failures, retry at)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.in_flight = 0
+        self.scans = 0
+        self.scans_skipped = 0
+        self.summarized = 0
+        self.already_known = 0
+        self.failed = 0
+        self.deferred = 0
+        self.quota_exhausted = 0
+        self.last_scan = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='watchlist-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        # A short first delay so a fresh worker serves traffic before prefetching
+        delay = min(self.interval, 10)
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                self.scan()
+            except Exception:
+                logger.exception('watchlist scan failed')
+
+    def watchlist(self) -> List[str]:
+        """Configured IDs followed by the feed's, re-read when the file changes"""
+        if self.feed_path:
+            try:
+                mtime = os.stat(self.feed_path).st_mtime
+                if mtime != self._feed_mtime:
+                    self._feed_ids = read_feed(self.feed_path)
+                    self._feed_mtime = mtime
+            except (OSError, ET.ParseError) as e:
+                logger.warning('watchlist feed unreadable', extra={'path': self.feed_path, 'error': str(e)})
+        if not self._feed_ids:
+            return self.video_ids
+        configured = set(self.video_ids)
+        return self.video_ids + [video_id for video_id in self._feed_ids if video_id not in configured]
+
+    def scan(self, wait: bool = False) -> int:
+        """Start a summary for each unknown watchlist video; returns how many were started"""
+        if self.lock_store is not None and not self.lock_store.acquire_lock(LEASE_NAME, self._owner, self.interval):
+            # Another worker scanned within the last interval
+            self.scans_skipped += 1
+            return 0
+        self.scans += 1
+        self.last_scan = time.time()
+        started = []
+        for video_id in self.watchlist():
+            if self._stop.is_set():
+                break
+            retry = self._failures.get(video_id)
+            if retry is not None and retry[1] > time.monotonic():
+                continue
+            if self.is_known(video_id):
+                self.already_known += 1
+                self._failures.pop(video_id, None)
+                continue
+            self._slots.acquire()
+            # Checked with a slot in hand, right before the upstream call
+            if not self._wait_until_idle() or not self._take_quota():
+                self._slots.release()
+                break
+            with self._lock:
+                self.in_flight += 1
+            started.append(self._executor.submit(self._run, video_id))
+        if wait:
+            for future in started:
+                future.result()
+        return len(started)
+
+    def _wait_until_idle(self) -> bool:
+        if not self.interactive_busy():
+            return True
+        self.deferred += 1
+        while self.interactive_busy():
+            if self._stop.wait(self.idle_poll):
+                return False
+        return True
+
+    def _take_quota(self) -> bool:
+        if self.quota <= 0:
+            return True
+        if self.lock_store is not None:
+            # Each start holds one of ``quota`` slots until quota_window passes
+            for offset in range(self.quota):
+                slot = (self._quota_slot + offset) % self.quota
+                if self.lock_store.acquire_lock(f'{QUOTA_LOCK_PREFIX}{slot}', self._owner, self.quota_window):
+                    self._quota_slot = slot + 1
+                    return True
+        else:
+            now = time.monotonic()
+            while self._starts and self._starts[0] <= now - self.quota_window:
+                self._starts.popleft()
+            if len(self._starts) < self.quota:
+                self._starts.append(now)
+                return True
+        self.quota_exhausted += 1
+        return False
+
+    def _run(self, video_id: str) -> None:
+        try:
+            self.summarize(video_id)
+            self.summarized += 1
+            self._failures.pop(video_id, None)
+        except Exception as e:
+            self.failed += 1
+            # Back off a failing video: one interval, then doubling up to retry_max
+            failures = self._failures.get(video_id, (0, 0))[0] + 1
+            delay = min(self.retry_max, self.interval * 2 ** (failures - 1))
+            self._failures[video_id] = (failures, time.monotonic() + delay)
+            logger.warning('watchlist summary failed', extra={
+                'video_id': video_id, 'error': type(e).__name__, 'retry_in_seconds': round(delay)})
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            'videos': len(self.video_ids),
+            'feed_path': self.feed_path,
+            'feed_videos': len(self._feed_ids),
+            'interval_seconds': self.interval,
+            'concurrency': self.concurrency,
+            'quota': self.quota,
+            'quota_window_seconds': self.quota_window,
+            'in_flight': self.in_flight,
+            'scans': self.scans,
+            'scans_skipped': self.scans_skipped,
+            'summarized': self.summarized,
+            'already_known': self.already_known,
+            'failed': self.failed,
+            'deferred_for_traffic': self.deferred,
+            'quota_exhausted': self.quota_exhausted,
+            'backing_off': len(self._failures),
+            'last_scan': self.last_scan,
+        }